@@ -3,16 +3,18 @@ import { useState, useEffect, useRef } from 'react';
 import { Send, Download, LogOut, Loader, Shield, AlertCircle, MapPin, Clock, HeartHandshake } from 'lucide-react';
 
 export default function ChatPage({ onLogout }: { onLogout: () => void }) {
-  const [messages, setMessages] = useState<{ role: 'user' | 'agent'; content: string; pdfUrl?: string }[]>([]);
+  const [messages, setMessages] = useState<{ role: 'user' | 'agent'; content: string; pdfUrl?: string; streaming?: boolean }[]>([]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [status, setStatus] = useState('');
   const ws = useRef<WebSocket | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const sessionId = `web-${Date.now()}-${Math.random().toString(36).slice(2, 9)}`;
 
   useEffect(() => {
-    ws.current = new WebSocket(`ws://127.0.0.1:8000/ws/${sessionId}`);
+    // ?stream=1 → framed JSON: status updates and plan tokens arrive while the plan is written
+    ws.current = new WebSocket(`ws://127.0.0.1:8000/ws/${sessionId}?stream=1`);
 
     ws.current.onopen = () => {
       console.log('CONNECTED →', sessionId);
@@ -20,15 +22,46 @@ export default function ChatPage({ onLogout }: { onLogout: () => void }) {
     };
 
     ws.current.onmessage = (e) => {
-      const text = e.data.trim();
+      let frame: { type: string; text?: string; stage?: string; pdf_url?: string | null };
+      try {
+        frame = JSON.parse(e.data);
+      } catch {
+        frame = { type: 'final', text: e.data };  // plain-text server
+      }
+
+      if (frame.type === 'status') {
+        setStatus(frame.text || '');
+        return;
+      }
+
+      // Live draft: append tokens to the agent message being written
+      if (frame.type === 'token') {
+        const delta = frame.text || '';
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          if (last && last.role === 'agent' && last.streaming) {
+            return [...prev.slice(0, -1), { ...last, content: last.content + delta }];
+          }
+          return [...prev, { role: 'agent', content: delta, streaming: true }];
+        });
+        return;
+      }
+
+      // final / error → replaces the draft
+      const text = (frame.text || '').trim();
       if (!text) return;
 
       const pdfMatch = text.match(/(https?:\/\/[^\s]+\.pdf)/i);
-      const pdfUrl = pdfMatch ? pdfMatch[0] : undefined;
-      const cleanText = pdfUrl ? text.replace(pdfUrl, '').trim() : text;
-
-      setMessages(prev => [...prev, { role: 'agent', content: cleanText, pdfUrl }]);
+      const pdfUrl = frame.pdf_url || (pdfMatch ? pdfMatch[0] : undefined);
+      const cleanText = pdfMatch ? text.replace(pdfMatch[0], '').trim() : text;
+
+      setMessages(prev => {
+        const last = prev[prev.length - 1];
+        const rest = last && last.streaming ? prev.slice(0, -1) : prev;
+        return [...rest, { role: 'agent', content: cleanText, pdfUrl }];
+      });
       setIsLoading(false);
+      setStatus('');
     };
 
     ws.current.onclose = () => console.log('DISCONNECTED');
@@ -149,7 +182,10 @@ export default function ChatPage({ onLogout }: { onLogout: () => void }) {
           {isLoading && (
             <div className="flex justify-start">
               <div className="bg-white border-2 border-blue-100 rounded-3xl px-6 py-4 shadow-lg">
-                <Loader className="w-6 h-6 animate-spin text-blue-600" />
+                <div className="flex items-center gap-3">
+                  <Loader className="w-6 h-6 animate-spin text-blue-600" />
+                  {status && <span className="text-sm text-gray-600">{status}</span>}
+                </div>
               </div>
             </div>
           )}
@@ -1,12 +1,81 @@
 # backend/agents/booking_helper.py — FINAL: NO LANGUAGE LIST, WORKS FOR EVERY LANGUAGE
-from groq import Groq
-from config import config
+import asyncio
+import hashlib
 import logging
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+from agents.llm import streamed_completion
+from agents.planner import FALLBACK_PLAN, fallback_plan
+from agents.translator import translate_template, translate_to_user_lang
+from config import config
+from tools.response_cache import ResponseCache
 
-client = Groq(api_key=config.GROQ_API_KEY)
 logger = logging.getLogger(__name__)
 
-def get_booking_guidance(city: str, user_language: str, english_survival_plan: str) -> str:
+# Native-language plans are content-addressed: same city + language + English
+# plan → same answer, shared by every worker and kept across restarts.
+booking_cache = ResponseCache(
+    "booking_cache",
+    config.RESPONSE_CACHE_PATH,
+    ttl_seconds=config.BOOKING_CACHE_TTL_SECONDS,
+    max_entries=config.BOOKING_CACHE_MAX_ENTRIES,
+    memory_keys=128,
+)
+
+# Appended to the translated plan when the native LLM answer is unavailable
+ASYLUM_NOTE = """
+ASYLUM REGISTRATION IN {city}
+Go to the nearest police station or UNHCR partner office and say you want to apply for asylum.
+Registration is 100% FREE. Never pay anyone.
+Emergency: 112
+"""
+
+# What to prewarm: (city, language) traffic and each city's most used English plans
+_pair_traffic: Counter = Counter()
+_plan_traffic: Counter = Counter()              # plan hash → uses
+_plans: Dict[str, Tuple[str, str]] = {}         # plan hash → (city, English plan)
+
+
+def _plan_hash(english_survival_plan: str) -> str:
+    return hashlib.sha256(english_survival_plan.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def booking_cache_key(city: str, user_language: str, english_survival_plan: str) -> str:
+    return f"{city.strip().lower()}|{user_language.lower()}|{_plan_hash(english_survival_plan)}"
+
+
+def record_plan_use(city: str, user_language: str, english_survival_plan: str) -> None:
+    """Called for every delivered LLM plan (any language) so prewarm knows what is popular."""
+    if english_survival_plan.strip() == fallback_plan(city).strip():
+        return  # static fallback — already pre-translated, nothing to prewarm
+    city = city.strip().lower()
+    plan_hash = _plan_hash(english_survival_plan)
+    _pair_traffic[(city, user_language.lower())] += 1
+    _plan_traffic[plan_hash] += 1
+    _plans.setdefault(plan_hash, (city, english_survival_plan))
+
+
+async def get_booking_guidance(
+    city: str,
+    user_language: str,
+    english_survival_plan: str,
+    stream_stage: Optional[str] = None,  # set → tokens are streamed to the web client
+    use_llm: bool = True,                # False under overload → cached or translated plan only
+) -> str:
+    cache_key = booking_cache_key(city, user_language, english_survival_plan)
+    try:
+        cached = await asyncio.to_thread(booking_cache.get, cache_key)
+        if cached:
+            logger.info(f"Native plan cache hit → {cache_key}")
+            return cached
+    except Exception as e:
+        logger.warning(f"Native plan cache lookup failed: {e}")
+
+    if not use_llm:
+        return await _translated_plan(city, user_language, english_survival_plan)
+
+    city_key = city
     city = city.strip().title()
 
     prompt = f"""
@@ -39,29 +108,81 @@ Reply ENTIRELY in the user's native language. No English. No exceptions.
 """
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",   # 8b can't do this. 70b can.
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.4,
-            max_tokens=1400
-        )
-        native_reply = response.choices[0].message.content.strip()
+        native_reply = await streamed_completion(prompt, max_tokens=1400, temperature=0.4, stage=stream_stage)
         logger.info(f"Native plan generated for {city} in language '{user_language}'")
+        try:
+            await asyncio.to_thread(booking_cache.put, cache_key, native_reply)
+        except Exception as e:
+            logger.warning(f"Native plan cache store failed: {e}")
         return native_reply
 
     except Exception as e:
         logger.error(f"Native generation failed: {e}")
         # Absolute fallback — still try to translate English version
-        fallback = f"""
-{english_survival_plan.strip()}
+        return await _translated_plan(city_key, user_language, english_survival_plan)
 
-ASYLUM REGISTRATION IN {city.upper()}
-Go to the nearest police station or UNHCR partner office and say you want to apply for asylum.
-Registration is 100% FREE. Never pay anyone.
-Emergency: 112
-"""
+
+async def _translated_plan(city_key: str, user_language: str, english_survival_plan: str) -> str:
+    """English plan through the translation API + the asylum note — no LLM involved."""
+    city = city_key.strip().title()
+    try:
+        if english_survival_plan.strip() == fallback_plan(city_key).strip():
+            # Pre-translated at startup → no API call
+            plan = await asyncio.to_thread(translate_template, FALLBACK_PLAN, user_language, city=city_key)
+        else:
+            plan = await asyncio.to_thread(translate_to_user_lang, english_survival_plan.strip(), user_language)
+        note = await asyncio.to_thread(translate_template, ASYLUM_NOTE, user_language, city=city.upper())
+        return f"\n{plan.strip()}\n{note}"
+    except Exception:
+        fallback = f"\n{english_survival_plan.strip()}\n{ASYLUM_NOTE.format(city=city.upper())}"
+        return fallback + "\n\n[Translation failed – showing in English]"
+
+
+def _in_offpeak_window(hour: int) -> bool:
+    start, _, end = config.BOOKING_PREWARM_HOURS_UTC.partition("-")
+    start, end = int(start), int(end or start)
+    return start <= hour <= end if start <= end else hour >= start or hour <= end
+
+
+async def prewarm_loop():
+    """
+    Off-peak only (BOOKING_PREWARM_HOURS_UTC): for the busiest (city, language)
+    pairs, generate the native plan for each of that city's most used English
+    plans if it isn't cached yet — the next user in that pair gets it instantly.
+    """
+    while True:
+        await asyncio.sleep(config.BOOKING_PREWARM_INTERVAL_SECONDS)
+        if not _in_offpeak_window(time.gmtime().tm_hour):
+            continue
         try:
-            from agents.translator import translate_to_user_lang
-            return translate_to_user_lang(fallback, user_language)
-        except:
-            return fallback + "\n\n[Translation failed – showing in English]"
\ No newline at end of file
+            by_city: Dict[str, list] = {}
+            for plan_hash, _uses in _plan_traffic.most_common():
+                city, plan = _plans[plan_hash]
+                by_city.setdefault(city, [])
+                if len(by_city[city]) < config.BOOKING_PREWARM_PLANS_PER_CITY:
+                    by_city[city].append(plan)
+
+            warmed = 0
+            for (city, language), _hits in _pair_traffic.most_common(config.BOOKING_PREWARM_TOP_PAIRS):
+                if language == "en":
+                    continue
+                for plan in by_city.get(city, []):
+                    if not booking_cache.has(booking_cache_key(city, language, plan)):
+                        await get_booking_guidance(city, language, plan)
+                        warmed += 1
+            if warmed:
+                logger.info(f"Pre-warmed {warmed} native plans")
+
+            # Decay so the top pairs / plans track recent traffic
+            for counter in (_pair_traffic, _plan_traffic):
+                for key in list(counter):
+                    counter[key] //= 2
+                    if not counter[key]:
+                        del counter[key]
+            for plan_hash in list(_plans):
+                if plan_hash not in _plan_traffic:
+                    del _plans[plan_hash]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Native plan prewarm cycle failed: {e}")
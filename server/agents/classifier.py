@@ -1,13 +1,10 @@
 # backend/agents/classifier.py
-from groq import Groq
 from pydantic import BaseModel
 from typing import List, Optional
-from config import config
+from agents.llm import chat_completion
 import json
 import re
 
-client = Groq(api_key=config.GROQ_API_KEY)
-
 class Classification(BaseModel):
     city: str
     language: str
@@ -15,11 +12,30 @@ class Classification(BaseModel):
     needs: List[str]
     city_unknown: Optional[bool] = False  # New flag
 
-def classify_message(message: str) -> Classification:
+LANGUAGE_RULES = """
+2. LANGUAGE (MOST IMPORTANT):
+   - Detect the language the user actually wrote in (ISO 639-1)
+   - Script first, then vocabulary:
+        • Any Devanagari → "hi"
+        • Romanised Hindi ("main", "mein", "hu", "hoon", "mumbai ja raha") → "hi"
+        • Pure English ("i am in mumbai", "help me") → "en"
+        • Arabic script → "ar"
+        • Cyrillic → "uk" or "ru"
+   - City names do NOT affect language detection
+"""
+
+
+async def classify_message(message: str, language_hint: Optional[str] = None) -> Classification:
     """
     Enhanced classifier that detects missing city and asks for it.
     Returns structured output + special flag if city is unknown.
+    If the local language detector is already sure (language_hint), the
+    LLM is not asked about language at all — shorter prompt, same answer.
     """
+    language_rules = (
+        f"\n2. LANGUAGE: already known → always return \"{language_hint}\"\n"
+        if language_hint else LANGUAGE_RULES
+    )
     prompt = CLASSIFIER_PROMPT = f"""
 You are an expert refugee message classifier. Analyze ONLY the current message. Never use history.
 
@@ -33,17 +49,7 @@ RULES (NEVER BREAK):
    - "i am in mumbai" → city = "mumbai"
    - "main mumbai ja raha hun" → city = "mumbai"
    - Only country → "Unknown"
-
-2. LANGUAGE (MOST IMPORTANT):
-   - Detect the language the user actually wrote in (ISO 639-1)
-   - Script first, then vocabulary:
-        • Any Devanagari → "hi"
-        • Romanised Hindi ("main", "mein", "hu", "hoon", "mumbai ja raha") → "hi"
-        • Pure English ("i am in mumbai", "help me") → "en"
-        • Arabic script → "ar"
-        • Cyrillic → "uk" or "ru"
-   - City names do NOT affect language detection
-
+{language_rules}
 3. urgency: low | medium | high | critical
 4. needs: shelter, food, medical, registration, children, elderly, safety
 
@@ -59,14 +65,7 @@ Return ONLY valid JSON:
 """
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
-            max_tokens=180
-        )
-
-        content = response.choices[0].message.content.strip()
+        content = await chat_completion(prompt, max_tokens=180, temperature=0.1)
         json_match = re.search(r'\{.*\}', content, re.DOTALL)
         
         if json_match:
@@ -79,7 +78,7 @@ Return ONLY valid JSON:
             
             return Classification(
                 city=data.get("city", "Unknown"),
-                language=data.get("language", "en"),
+                language=language_hint or data.get("language", "en"),
                 urgency=data.get("urgency", "medium"),
                 needs=data.get("needs", ["shelter"]),
                 city_unknown=city_unknown
@@ -91,7 +90,7 @@ Return ONLY valid JSON:
     # Final fallback
     return Classification(
         city="Unknown",
-        language="en",
+        language=language_hint or "en",
         urgency="medium",
         needs=["shelter"],
         city_unknown=True
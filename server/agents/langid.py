@@ -0,0 +1,225 @@
+# backend/agents/langid.py — local language identification, no network, no model files
+#
+# 1. Unicode-script histogram: Devanagari, Arabic, Cyrillic, Hangul, ... decide
+#    most messages outright, with letter-level tie-breakers (Urdu vs Farsi vs
+#    Arabic, Ukrainian vs Russian, Marathi vs Hindi).
+# 2. Latin-script text goes through a tiny character-trigram model trained at
+#    import on the seed sentences below — enough to tell English from
+#    romanised Hindi ("main mumbai mein hoon") and the main European languages.
+import bisect
+import math
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class LanguageGuess(NamedTuple):
+    language: str       # ISO 639-1
+    confidence: float   # 0..1
+    script: str
+
+
+# (start, end, script) — sorted by start, non-overlapping
+_SCRIPT_RANGES: List[Tuple[int, int, str]] = sorted([
+    (0x0041, 0x005A, "Latin"), (0x0061, 0x007A, "Latin"), (0x00C0, 0x024F, "Latin"),
+    (0x1E00, 0x1EFF, "Latin"),
+    (0x0370, 0x03FF, "Greek"),
+    (0x0400, 0x052F, "Cyrillic"),
+    (0x0530, 0x058F, "Armenian"),
+    (0x0590, 0x05FF, "Hebrew"),
+    (0x0600, 0x06FF, "Arabic"), (0x0750, 0x077F, "Arabic"), (0xFB50, 0xFDFF, "Arabic"),
+    (0xFE70, 0xFEFF, "Arabic"),
+    (0x0900, 0x097F, "Devanagari"),
+    (0x0980, 0x09FF, "Bengali"),
+    (0x0A00, 0x0A7F, "Gurmukhi"),
+    (0x0A80, 0x0AFF, "Gujarati"),
+    (0x0B80, 0x0BFF, "Tamil"),
+    (0x0C00, 0x0C7F, "Telugu"),
+    (0x0C80, 0x0CFF, "Kannada"),
+    (0x0D00, 0x0D7F, "Malayalam"),
+    (0x0D80, 0x0DFF, "Sinhala"),
+    (0x0E00, 0x0E7F, "Thai"),
+    (0x1000, 0x109F, "Myanmar"),
+    (0x10A0, 0x10FF, "Georgian"),
+    (0x1100, 0x11FF, "Hangul"), (0x3130, 0x318F, "Hangul"), (0xAC00, 0xD7AF, "Hangul"),
+    (0x1200, 0x139F, "Ethiopic"),
+    (0x1780, 0x17FF, "Khmer"),
+    (0x3040, 0x309F, "Kana"), (0x30A0, 0x30FF, "Kana"),
+    (0x4E00, 0x9FFF, "Han"), (0x3400, 0x4DBF, "Han"),
+])
+_RANGE_STARTS = [r[0] for r in _SCRIPT_RANGES]
+
+# Scripts that map to exactly one language
+_SCRIPT_LANGUAGE: Dict[str, str] = {
+    "Greek": "el", "Armenian": "hy", "Hebrew": "he", "Bengali": "bn", "Gurmukhi": "pa",
+    "Gujarati": "gu", "Tamil": "ta", "Telugu": "te", "Kannada": "kn", "Malayalam": "ml",
+    "Sinhala": "si", "Thai": "th", "Myanmar": "my", "Georgian": "ka", "Hangul": "ko",
+    "Ethiopic": "am", "Khmer": "km", "Kana": "ja", "Han": "zh",
+}
+
+_URDU_LETTERS = set("ٹڈڑںےھۓ")
+_PERSIAN_LETTERS = set("پچژگکی")
+_ARABIC_ONLY_LETTERS = set("ةىيك")
+_UKRAINIAN_LETTERS = set("іїєґІЇЄҐ")
+_MARATHI_MARKERS = ("आहे", "नाही", "मला", "आम्ही", "आहेत", "कुठे", "पाहिजे", "मध्ये", "ळ")
+
+# Seed text for the Latin-script trigram model. Deliberately short: it only has
+# to separate a handful of languages on short help-seeking messages.
+_LATIN_SEED: Dict[str, str] = {
+    "en": """
+        i am in the city and i need help with food and a place to sleep tonight
+        where is the nearest hospital please help my child is sick
+        we just arrived at the station we have no money and nowhere to go
+        hello can you tell me where to register for asylum
+        i need water shelter and a doctor for my mother thank you
+        is there a safe place for women and children near here
+        what documents do i need and where is the office
+        my family is hungry we walked all night from the border
+    """,
+    "hi": """
+        main mumbai mein hoon mujhe rehne ki jagah chahiye
+        mujhe khana aur paani chahiye kripya madad karo
+        hum abhi station par aaye hain hamare paas paise nahi hai
+        mera bachcha bimar hai aspatal kahan hai jaldi batao
+        main delhi ja raha hoon wahan kahan rukna hai
+        bahut bhookh lagi hai kya yahan koi khana milega
+        humein madad chahiye hum kahan jaayen
+        mere paas kagaz nahi hai kya karun mujhe dar lag raha hai
+        aap kaise ho main theek nahi hoon ghar nahi hai
+    """,
+    "pl": """
+        jestem w krakowie i potrzebuję pomocy gdzie mogę spać
+        gdzie jest najbliższy szpital moje dziecko jest chore
+        potrzebujemy jedzenia i wody nie mamy pieniędzy
+        dzień dobry gdzie mogę się zarejestrować
+        przyjechaliśmy z ukrainy szukamy schronienia dla rodziny
+    """,
+    "fr": """
+        je suis à paris et j'ai besoin d'aide pour manger et dormir
+        où est l'hôpital le plus proche mon enfant est malade
+        nous venons d'arriver à la gare nous n'avons pas d'argent
+        bonjour où puis-je demander l'asile s'il vous plaît
+        il nous faut de l'eau un abri et un médecin
+    """,
+    "de": """
+        ich bin in berlin und brauche hilfe wo kann ich schlafen
+        wo ist das nächste krankenhaus mein kind ist krank
+        wir sind gerade angekommen und haben kein geld
+        guten tag wo kann ich mich für asyl registrieren
+        wir brauchen essen wasser und einen arzt für meine mutter
+    """,
+    "es": """
+        estoy en madrid y necesito ayuda para comer y dormir
+        dónde está el hospital más cercano mi hijo está enfermo
+        acabamos de llegar a la estación no tenemos dinero
+        hola dónde puedo pedir asilo por favor
+        necesitamos agua un refugio y un médico para mi madre
+    """,
+    "pt": """
+        estou em lisboa e preciso de ajuda para comer e dormir
+        onde fica o hospital mais próximo meu filho está doente
+        acabamos de chegar à estação não temos dinheiro
+        olá onde posso pedir asilo por favor obrigado
+        precisamos de água abrigo e um médico para minha mãe
+    """,
+    "tr": """
+        istanbuldayım ve yardıma ihtiyacım var nerede uyuyabilirim
+        en yakın hastane nerede çocuğum hasta
+        istasyona yeni geldik hiç paramız yok
+        merhaba sığınma başvurusu nerede yapılır lütfen
+        yemek su ve annem için bir doktora ihtiyacımız var
+    """,
+    "it": """
+        sono a roma e ho bisogno di aiuto per mangiare e dormire
+        dove si trova l'ospedale più vicino mio figlio è malato
+        siamo appena arrivati alla stazione non abbiamo soldi
+        ciao dove posso chiedere asilo per favore grazie
+        abbiamo bisogno di acqua un rifugio e un medico
+    """,
+}
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def _trigrams(text: str) -> List[str]:
+    grams = []
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _train(seed: Dict[str, str]) -> Tuple[Dict[str, Dict[str, float]], Dict[str, float]]:
+    models, unseen = {}, {}
+    vocab = {g for text in seed.values() for g in _trigrams(text)}
+    for lang, text in seed.items():
+        counts = Counter(_trigrams(text))
+        total = sum(counts.values()) + 0.5 * (len(vocab) + 1)
+        models[lang] = {g: math.log((c + 0.5) / total) for g, c in counts.items()}
+        unseen[lang] = math.log(0.5 / total)
+    return models, unseen
+
+
+_LATIN_MODELS, _LATIN_UNSEEN = _train(_LATIN_SEED)
+
+
+def _script_of(ch: str) -> str:
+    cp = ord(ch)
+    i = bisect.bisect_right(_RANGE_STARTS, cp) - 1
+    if i >= 0 and _SCRIPT_RANGES[i][0] <= cp <= _SCRIPT_RANGES[i][1]:
+        return _SCRIPT_RANGES[i][2]
+    return ""
+
+
+def script_histogram(text: str) -> Counter:
+    return Counter(s for s in map(_script_of, text) if s)
+
+
+def _latin_guess(text: str) -> Tuple[str, float]:
+    grams = _trigrams(text)
+    if not grams:
+        return "en", 0.3
+    scores = {
+        lang: sum(model.get(g, _LATIN_UNSEEN[lang]) for g in grams) / len(grams)
+        for lang, model in _LATIN_MODELS.items()
+    }
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    best, second = ranked[0], ranked[1]
+    # Margin in mean log-prob per trigram → rough confidence; short texts stay unsure
+    margin = best[1] - second[1]
+    confidence = (1 - math.exp(-3 * margin)) * min(1.0, len(grams) / 12)
+    return best[0], round(max(0.0, min(confidence, 0.99)), 3)
+
+
+def detect_language(text: str) -> LanguageGuess:
+    """Best local guess of the ISO 639-1 language of `text` (~tens of µs)."""
+    histogram = script_histogram(text)
+    if not histogram:
+        return LanguageGuess("en", 0.0, "")
+
+    script, count = histogram.most_common(1)[0]
+    # Japanese mixes Kana with Han; any Kana at all means Japanese
+    if "Kana" in histogram and script in ("Han", "Kana"):
+        script, count = "Kana", histogram["Kana"] + histogram.get("Han", 0)
+    dominance = count / sum(histogram.values())
+
+    if script == "Latin":
+        language, confidence = _latin_guess(text)
+        return LanguageGuess(language, round(confidence * dominance, 3), script)
+
+    if script == "Devanagari":
+        language = "mr" if any(m in text for m in _MARATHI_MARKERS) else "hi"
+    elif script == "Arabic":
+        letters = set(text)
+        if letters & _URDU_LETTERS:
+            language = "ur"
+        elif letters & _PERSIAN_LETTERS and not letters & _ARABIC_ONLY_LETTERS:
+            language = "fa"
+        else:
+            language = "ar"
+    elif script == "Cyrillic":
+        language = "uk" if set(text) & _UKRAINIAN_LETTERS else "ru"
+    else:
+        language = _SCRIPT_LANGUAGE.get(script, "en")
+
+    return LanguageGuess(language, round(0.95 * dominance, 3), script)
@@ -0,0 +1,159 @@
+# backend/agents/llm.py — shared async Groq client for every agent
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional, Tuple
+from langchain_core.callbacks.manager import adispatch_custom_event
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# One async client per worker, built on first use so importing the graph
+# stays cheap. Timeouts + retries are handled by the SDK itself
+# (exponential backoff on 429 / 5xx / connection errors).
+client = None
+
+
+def get_client():
+    global client
+    if client is None:
+        from groq import AsyncGroq
+        client = AsyncGroq(
+            api_key=config.GROQ_API_KEY,
+            timeout=config.LLM_TIMEOUT_SECONDS,
+            max_retries=config.LLM_MAX_RETRIES,
+        )
+    return client
+
+
+# Priority of the LLM calls made from the current task (lower = sooner).
+# Set per job by the worker (jobs/worker.py) and refined once urgency is known.
+_priority: ContextVar[int] = ContextVar("llm_priority", default=2)
+
+
+def set_llm_priority(priority: int) -> None:
+    _priority.set(priority)
+
+
+class _PriorityGate:
+    """
+    Like asyncio.Semaphore, but when the slots are full the waiting caller
+    with the lowest priority number gets the next free slot, FIFO within a
+    priority — so a critical message never queues behind a backlog of "hi"s.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self.in_flight < self.capacity and not self.waiting:
+            self.in_flight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut  # release() hands its slot straight to us
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # got the slot just as we were cancelled → pass it on
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire(_priority.get())
+        try:
+            yield
+        finally:
+            self.release()
+
+
+# Caps how many Groq requests this worker has on the wire at once.
+# Extra callers wait here instead of piling up on the rate limit.
+_gate = _PriorityGate(config.LLM_MAX_CONCURRENCY)
+
+
+def llm_load() -> dict:
+    """Calls on the wire / waiting for a slot — read by the admission controller."""
+    return {"in_flight": _gate.in_flight, "waiting": _gate.waiting, "capacity": _gate.capacity}
+
+
+async def chat_completion(
+    prompt: str,
+    max_tokens: int,
+    temperature: float = 0.1,
+    model: str = config.LLM_MODEL,
+) -> str:
+    """
+    Single-turn chat completion that never blocks the event loop.
+    Raises on failure — every agent already has its own fallback text.
+    """
+    async with _gate.slot():
+        response = await get_client().chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+    return response.choices[0].message.content.strip()
+
+
+async def stream_chat(
+    prompt: str,
+    max_tokens: int,
+    temperature: float = 0.1,
+    model: str = config.LLM_MODEL,
+) -> AsyncIterator[str]:
+    """Same call as chat_completion, yielding text deltas as Groq produces them."""
+    async with _gate.slot():
+        stream = await get_client().chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+async def streamed_completion(
+    prompt: str,
+    max_tokens: int,
+    temperature: float = 0.1,
+    stage: Optional[str] = None,
+) -> str:
+    """
+    Full completion text, like chat_completion. With a `stage`, every delta is
+    also dispatched as a "token" custom event, so whoever is consuming the
+    graph's astream_events (the web socket) can forward it immediately.
+    """
+    if stage is None:
+        return await chat_completion(prompt, max_tokens, temperature)
+    parts = []
+    async for delta in stream_chat(prompt, max_tokens, temperature):
+        parts.append(delta)
+        try:
+            await adispatch_custom_event("token", {"stage": stage, "text": delta})
+        except RuntimeError:
+            pass  # not running inside a graph (e.g. prewarm) → nobody to stream to
+    return "".join(parts).strip()
@@ -0,0 +1,258 @@
+# backend/agents/matcher.py — one compiled multi-pattern matcher for cheap routing
+#
+# Greetings, "PDF" requests, emergency / need keywords and city names in every
+# supported language go into a single Aho-Corasick automaton, built once. One
+# linear pass over the message finds every hit, however many patterns there are.
+import threading
+from collections import deque
+from typing import Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# Multilingual greeting words for the greeting fast-path
+GREETINGS: Dict[str, List[str]] = {
+    "en": ["hi", "hello", "hey", "hii", "hiii", "helo", "good morning", "good evening", "gm", "ge"],
+    "hi": ["हाय", "नमस्ते", "हेलो", "हॅलो", "namaste", "namaskar", "हाय्या"],
+    "mr": ["नमस्कार", "हाय", "हॅलो"],
+    "ar": ["مرحبا", "السلام عليكم", "سلام", "هلا", "مرحباً"],
+    "ur": ["ہیلو", "السلام علیکم", "ہائے", "سلام"],
+    "fa": ["سلام", "درود"],
+    "pl": ["cześć", "dzień dobry", "hej", "cześć!"],
+    "uk": ["привіт", "добрий день", "здравствуйте", "привет"],
+    "ru": ["привет", "здравствуйте", "добрый день"],
+}
+
+PDF_WORDS = ["pdf", "पीडीएफ", "بي دي اف", "پی ڈی ایف", "پی دی اف", "пдф"]
+
+# Words that on their own make a message critical ("jaldi" / "quickly" alone is not one)
+EMERGENCY_WORDS = [
+    "emergency", "urgent", "urgently", "dying", "bleeding", "unconscious", "attacked", "not breathing", "sos",
+    "आपातकाल", "इमरजेंसी", "बचाओ", "bachao",
+    "طوارئ", "عاجل", "نجدة", "فوری", "اضطراری",
+    "терміново", "срочно", "допоможіть", "помогите",
+    "pilne", "ratunku", "na pomoc",
+]
+
+# Need keywords → the classifier's need labels
+NEED_WORDS: Dict[str, List[str]] = {
+    "shelter": ["shelter", "sleep", "place to stay", "accommodation", "nowhere to go", "homeless",
+                "rehne", "jagah", "sone ki", "रहने", "जगह", "आश्रय", "राहायला",
+                "مأوى", "سكن", "مكان للنوم", "پناهگاه", "رہنے", "جگہ",
+                "притулок", "ночівля", "ночлег", "жильё", "переночевать",
+                "nocleg", "schronienie", "spać"],
+    "food": ["food", "hungry", "eat", "water", "khana", "bhookh", "paani",
+             "खाना", "भूख", "पानी", "जेवण", "طعام", "ماء", "جوعان", "غذا", "آب", "کھانا", "پانی",
+             "їжа", "вода", "еда", "голодні", "голодны", "jedzenie", "woda"],
+    "medical": ["doctor", "hospital", "clinic", "sick", "fever", "medicine", "injured", "pregnant",
+                "dawai", "aspatal", "bimar", "डॉक्टर", "अस्पताल", "बीमार", "दवा", "दवाखाना",
+                "مستشفى", "طبيب", "مريض", "بیمارستان", "دکتر", "ہسپتال", "بیمار",
+                "лікар", "лікарня", "хворіє", "врач", "больница", "болеет",
+                "lekarz", "szpital", "chory", "chore"],
+    "registration": ["asylum", "register", "registration", "documents", "passport", "visa", "unhcr",
+                     "पंजीकरण", "कागज", "لجوء", "تسجيل", "پناهندگی", "رجسٹریشن",
+                     "реєстрація", "притулку", "убежище", "azyl", "rejestracja"],
+    "children": ["child", "children", "baby", "kids", "son", "daughter", "bachcha", "bachche",
+                 "बच्चा", "बच्चे", "طفل", "أطفال", "ابني", "بچه", "بچہ",
+                 "дитина", "діти", "ребёнок", "дети", "dziecko", "dzieci"],
+    "elderly": ["elderly", "old man", "old woman", "grandmother", "grandfather", "wheelchair",
+                "बुजुर्ग", "दादी", "مسن", "بزرگ", "бабуся", "дідусь", "бабушка", "дедушка"],
+    "safety": ["police", "danger", "unsafe", "violence", "threat", "scared",
+               "पुलिस", "खतरा", "شرطة", "خطر", "پلیس", "поліція", "полиция", "небезпека", "policja"],
+}
+
+class AhoCorasick:
+    """Classic Aho-Corasick automaton over lower-cased text."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]  # (pattern length, payload)
+        for pattern, payload in patterns:
+            self._add(pattern.lower(), payload)
+        self._link()
+
+    def _add(self, pattern: str, payload: str) -> None:
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fallback = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fallback if fallback != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """(start, end, payload) for every pattern occurrence in `text` (already lower-cased)."""
+        hits = []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                hits.append((i - length + 1, i + 1, payload))
+        return hits
+
+
+class MessageIntents(NamedTuple):
+    greeting_language: Optional[str]
+    greeting_chars: int          # characters covered by greeting words
+    pdf: bool
+    emergency: bool
+    needs: List[str]
+    cities: List[str]            # canonical city keys, in order of appearance
+
+    @property
+    def has_request(self) -> bool:
+        """Anything beyond a greeting — a city, a need, an emergency or a PDF ask."""
+        return bool(self.pdf or self.emergency or self.needs or self.cities)
+
+    @property
+    def urgency(self) -> str:
+        """Keyword-level urgency — good enough to order work before the classifier runs."""
+        if self.emergency:
+            return "critical"
+        if {"medical", "safety", "children"} & set(self.needs):
+            return "high"
+        return "medium"
+
+
+# Scripts written without spaces between words (or, for Hangul, with particles
+# glued on: "뭄바이에") — a keyword there may touch other letters on either side.
+_NO_SPACE_RANGES = (
+    (0x0E00, 0x0EFF),  # Thai, Lao
+    (0x1000, 0x109F),  # Myanmar
+    (0x1100, 0x11FF),  # Hangul Jamo
+    (0x1780, 0x17FF),  # Khmer
+    (0x3040, 0x30FF),  # Hiragana, Katakana
+    (0x3130, 0x318F),  # Hangul compatibility Jamo
+    (0x3400, 0x4DBF),  # CJK extension A
+    (0x4E00, 0x9FFF),  # CJK unified ideographs
+    (0xAC00, 0xD7AF),  # Hangul syllables
+    (0xF900, 0xFAFF),  # CJK compatibility ideographs
+)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _no_space_script(ch: str) -> bool:
+    code = ord(ch)
+    return any(low <= code <= high for low, high in _NO_SPACE_RANGES)
+
+
+def _same_word(a: str, b: str) -> bool:
+    """Adjacent characters a, b belong to one word, so no keyword may start or end between them."""
+    if _no_space_script(a) or _no_space_script(b):
+        return False
+    return _is_word_char(a) and _is_word_char(b)
+
+
+class IntentMatcher:
+    def __init__(self, city_aliases: Dict[str, str]):
+        patterns: List[Tuple[str, str]] = []
+        for lang, words in GREETINGS.items():
+            patterns += [(w, f"greeting:{lang}") for w in words]
+        patterns += [(w, "pdf") for w in PDF_WORDS]
+        patterns += [(w, "emergency") for w in EMERGENCY_WORDS]
+        for need, words in NEED_WORDS.items():
+            patterns += [(w, f"need:{need}") for w in words]
+        patterns += [(alias, f"city:{key}") for alias, key in city_aliases.items()]
+        self.pattern_count = len(patterns)
+        self._automaton = AhoCorasick(patterns)
+
+    def analyze(self, message: str) -> MessageIntents:
+        text = message.lower()
+        hits = []
+        for start, end, payload in self._automaton.find_all(text):
+            # Whole words only — "hi" must not fire inside "this", "son" inside "person".
+            # No such check next to CJK / kana / Hangul / Thai: "東京にいます", "뭄바이에 있어요".
+            if start > 0 and _same_word(text[start - 1], text[start]):
+                continue
+            if end < len(text) and _same_word(text[end - 1], text[end]):
+                continue
+            hits.append((start, end, payload))
+
+        greeting_language, greeting_spans = None, []
+        pdf = emergency = False
+        needs: List[str] = []
+        cities: List[str] = []
+        for start, end, payload in sorted(hits):
+            kind, _, value = payload.partition(":")
+            if kind == "greeting":
+                greeting_language = greeting_language or value
+                greeting_spans.append((start, end))
+            elif kind == "pdf":
+                pdf = True
+            elif kind == "emergency":
+                emergency = True
+            elif kind == "need" and value not in needs:
+                needs.append(value)
+            elif kind == "city" and value not in cities:
+                cities.append(value)
+
+        covered: Set[int] = {i for start, end in greeting_spans for i in range(start, end)}
+        return MessageIntents(greeting_language, len(covered), pdf, emergency, needs, cities)
+
+
+def _known_city_aliases() -> Dict[str, str]:
+    """Every gazetteer spelling plus any other city we already have OSM data for."""
+    from tools.gazetteer import gazetteer
+    from tools.osm_utils import cached_city_keys
+    aliases = gazetteer.aliases()
+    for key in cached_city_keys():
+        aliases.setdefault(key.replace("_", " "), key)
+    return aliases
+
+
+def _known_city_aliases_version() -> Hashable:
+    """Changes exactly when _known_city_aliases() would: another gazetteer or new cached cities."""
+    from tools.gazetteer import gazetteer
+    from tools.osm_utils import cached_city_keys
+    return gazetteer, tuple(cached_city_keys())
+
+
+# City spellings the matcher looks for: by default every gazetteer alias plus the
+# cached OSM cities (tools/gazetteer.py). Replace both together to feed it from
+# elsewhere — the version is checked on every message, the aliases only read on a change
+city_alias_source: Callable[[], Dict[str, str]] = _known_city_aliases
+city_alias_version: Callable[[], Hashable] = _known_city_aliases_version
+keyword_version = 0  # bump after editing the word lists above at runtime
+
+_matcher: Optional[IntentMatcher] = None
+_matcher_version: Optional[Hashable] = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> IntentMatcher:
+    """The compiled matcher; rebuilt only when the city aliases or keywords change."""
+    global _matcher, _matcher_version
+    version = (keyword_version, city_alias_source, city_alias_version())
+    if _matcher is None or version != _matcher_version:
+        with _matcher_lock:
+            if _matcher is None or version != _matcher_version:
+                _matcher = IntentMatcher(city_alias_source())
+                _matcher_version = version
+    return _matcher
+
+
+def analyze_message(message: str) -> MessageIntents:
+    return get_matcher().analyze(message)
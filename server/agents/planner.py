@@ -1,19 +1,87 @@
 # backend/agents/planner.py
-from groq import Groq
+from typing import List, Optional
+from agents.llm import streamed_completion
 from config import config
-from typing import List
+from tools.facility_store import Facility
+from tools.response_cache import ResponseCache
 
+# Finished English plans, shared by every worker. Keyed by what actually shapes
+# the plan — see plan_cache_key(); a new OSM version for the city changes the key.
+plan_cache = ResponseCache(
+    "plan_cache",
+    config.RESPONSE_CACHE_PATH,
+    ttl_seconds=config.PLAN_CACHE_TTL_SECONDS,
+    max_entries=config.PLAN_CACHE_MAX_ENTRIES,
+    memory_keys=config.PLAN_CACHE_MEMORY_KEYS,
+)
 
 
-client = Groq(api_key=config.GROQ_API_KEY)
+def plan_cache_key(city: str, urgency: str, needs: List[str], data_version: Optional[str]) -> str:
+    return f"{city}|{urgency}|{','.join(sorted(set(needs or [])))}|{data_version}"
 
-def generate_survival_plan(
+
+# Static plan used when the LLM is unavailable — never cached, pre-translated at startup
+FALLBACK_PLAN = """
+**FIRST 2 HOURS – IMMEDIATE SAFETY**
+Go directly to the main train station in {city}.
+Look for Red Cross, UNHCR, or police — say "I need refugee help".
+
+**NEXT 12 HOURS**
+Ask for emergency shelter — it is free.
+You will get food and a place to sleep.
+
+**NEXT 48 HOURS**
+Go to government asylum office with any ID.
+You are protected. You are not alone.
+"""
+
+
+def fallback_plan(city: str) -> str:
+    return FALLBACK_PLAN.format(city=city)
+
+
+# Which facility types go under which heading of a template plan
+_TEMPLATE_SECTIONS = [
+    ("**FIRST 2 HOURS – IMMEDIATE SAFETY**", ["shelter", "social_facility", "hospital", "clinic"]),
+    ("**NEXT 12 HOURS – REST & FOOD**", ["food_bank", "community_centre", "social_facility"]),
+    ("**NEXT 48 HOURS – REGISTRATION & HELP**", ["ngo", "doctors", "clinic", "community_centre"]),
+]
+
+
+def template_plan(city: str, needs: List[str], facilities: List[Facility]) -> Optional[str]:
+    """
+    Plan without the LLM (used under overload): the usual headings filled in
+    with real facility names and addresses. None if there is nothing to list.
+    """
+    if not facilities:
+        return None
+    medical_first = "medical" in (needs or [])
+    used = set()
+    sections = []
+    for heading, amenities in _TEMPLATE_SECTIONS:
+        if medical_first and heading.startswith("**FIRST"):
+            amenities = ["hospital", "clinic", "doctors"] + amenities
+        picks = []
+        for amenity in amenities:
+            for f in facilities:
+                if f.amenity == amenity and f.osm_id not in used and len(picks) < 2:
+                    used.add(f.osm_id)
+                    picks.append(f"- {f.name}: {f.address}" + (f" (phone {f.phone})" if f.phone else ""))
+        if not picks:
+            picks = [f"- Go to the main train station in {city} and ask for refugee help."]
+        sections.append(heading + "\n" + "\n".join(picks))
+    return "\n\n".join(sections) + "\n\nYou are safe now. Help is real."
+
+
+async def generate_survival_plan(
     city: str,
     language: str,
     urgency: str,
     needs: List[str],
     user_message: str,
-    local_context: str  # ← REAL OSM DATA FROM RAG
+    local_context: str,  # ← REAL OSM DATA FROM RAG
+    facilities: Optional[List[Facility]] = None,  # ← typed records from the facility store
+    stream_stage: Optional[str] = None,  # ← set → tokens are streamed to the web client
 ) -> str:
     """
     THIS VERSION FORCES THE LLM TO USE REAL ADDRESSES.
@@ -21,17 +89,21 @@ def generate_survival_plan(
     """
     needs_str = ", ".join(needs)
 
-    # Extract ONLY the real facilities (filter noise)
-    facilities = []
-    for line in local_context.split("\n"):
-        line = line.strip()
-        if line.startswith("## ") or ("address:" in line.lower()) or ("phone:" in line.lower()):
-            facilities.append(line)
-    
-    if not facilities:
-        facilities = ["No specific addresses found. Go to main train station and ask for refugee help."]
+    if facilities:
+        facility_lines = [line for f in facilities for line in f.to_context_lines()]
+    else:
+        # No structured records (yet) → extract ONLY the real facilities from the RAG text
+        facility_lines = []
+        for line in local_context.split("\n"):
+            line = line.strip()
+            if line.startswith("## ") or ("address:" in line.lower()) or ("phone:" in line.lower()):
+                facility_lines.append(line)
+        facility_lines = facility_lines[:15]  # Top 15 lines max
 
-    facilities_text = "\n".join(facilities[:15])  # Top 15 lines max
+    if not facility_lines:
+        facility_lines = ["No specific addresses found. Go to main train station and ask for refugee help."]
+
+    facilities_text = "\n".join(facility_lines)
 
     prompt = f"""
 YOU ARE A REFUGEE CRISIS RESPONSE COORDINATOR IN {city.upper()}.
@@ -74,13 +146,12 @@ WRITE ONLY THE PLAN. NO INTRODUCTION.
 """
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
+        plan = await streamed_completion(
+            prompt,
+            max_tokens=1800,
             temperature=0.1,      # Lower = more obedient to instructions
-            max_tokens=1800
+            stage=stream_stage,
         )
-        plan = response.choices[0].message.content.strip()
 
         # Final safety check — if it still says "a shelter", override
         if any(phrase in plan.lower() for phrase in ["a shelter", "some shelter", "any shelter", "a clinic"]):
@@ -90,16 +161,4 @@ WRITE ONLY THE PLAN. NO INTRODUCTION.
 
     except Exception as e:
         print(f"Planner failed: {e}")
-        return f"""
-**FIRST 2 HOURS – IMMEDIATE SAFETY**
-Go directly to the main train station in {city}.
-Look for Red Cross, UNHCR, or police — say "I need refugee help".
-
-**NEXT 12 HOURS**
-Ask for emergency shelter — it is free.
-You will get food and a place to sleep.
-
-**NEXT 48 HOURS**
-Go to government asylum office with any ID.
-You are protected. You are not alone.
-"""
\ No newline at end of file
+        return fallback_plan(city)
@@ -1,34 +1,150 @@
 # backend/agents/translator.py
+import asyncio
+import hashlib
+import html
 import logging
-from typing import Optional
+import re
+from typing import Dict, List, Optional
+from config import config
+from tools.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
 translator_client = None
-try:
-    from google.cloud import translate_v2 as translate
-    # NO 'project' arg — uses GOOGLE_APPLICATION_CREDENTIALS env
-    translator_client = translate.Client()
-    logger.info("Google Translate ready")
-except Exception as e:
-    logger.error(f"Translate init failed: {e}")
-    translator_client = None
+_init_attempted = False
+
+
+def _get_client():
+    """Google Translate client, created on first use (its import pulls in gRPC)."""
+    global translator_client, _init_attempted
+    if not _init_attempted:
+        _init_attempted = True
+        try:
+            from google.cloud import translate_v2 as translate
+            # NO 'project' arg — uses GOOGLE_APPLICATION_CREDENTIALS env
+            translator_client = translate.Client()
+            logger.info("Google Translate ready")
+        except Exception as e:
+            logger.error(f"Translate init failed: {e}")
+            translator_client = None
+    return translator_client
+
+
+# Every translation we've paid for, keyed by (source, target, format, text hash).
+# Translations don't go stale, so the TTL is long; LRU keeps the table bounded.
+translation_cache = ResponseCache(
+    "translation_cache",
+    config.RESPONSE_CACHE_PATH,
+    ttl_seconds=config.TRANSLATION_CACHE_TTL_SECONDS,
+    max_entries=config.TRANSLATION_CACHE_MAX_ENTRIES,
+    memory_keys=config.TRANSLATION_CACHE_MEMORY_KEYS,
+)
+
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+def _cache_key(text: str, target: str, source: Optional[str], fmt: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{source or 'auto'}|{target}|{fmt}|{digest}"
+
+
+def translate_many(texts: List[str], target: str = "en", source: Optional[str] = None, fmt: str = "text") -> List[str]:
+    """
+    Translate a list of strings: cached ones come from the cache, the rest are
+    deduplicated and sent in batches (one API call per TRANSLATE_BATCH_SIZE).
+    Blocking — call via asyncio.to_thread (or atranslate_many) from async code.
+    On any failure the untranslated text is returned and nothing is cached.
+    """
+    results: List[Optional[str]] = [None] * len(texts)
+    missing: Dict[str, List[int]] = {}  # text → positions
+    for i, text in enumerate(texts):
+        if not text or not text.strip() or target == source:
+            results[i] = text
+            continue
+        cached = translation_cache.get(_cache_key(text, target, source, fmt))
+        if cached is not None:
+            results[i] = cached
+        else:
+            missing.setdefault(text, []).append(i)
+
+    if missing:
+        client = _get_client()
+        pending = list(missing)
+        for start in range(0, len(pending), config.TRANSLATE_BATCH_SIZE):
+            batch = pending[start:start + config.TRANSLATE_BATCH_SIZE]
+            if client:
+                try:
+                    response = client.translate(
+                        batch, target_language=target, source_language=source, format_=fmt
+                    )
+                    translated = [r["translatedText"].strip() for r in response]
+                    for text, out in zip(batch, translated):
+                        translation_cache.put(_cache_key(text, target, source, fmt), out)
+                except Exception as e:
+                    logger.warning(f"Translate error: {e}")
+                    translated = [text.strip() for text in batch]
+            else:
+                translated = [text.strip() for text in batch]
+            for text, out in zip(batch, translated):
+                for i in missing[text]:
+                    results[i] = out
+        logger.info(f"Translate → {len(texts) - sum(map(len, missing.values()))} cached, {len(missing)} sent ({target})")
+
+    return results
+
+
+async def atranslate_many(texts: List[str], target: str = "en", source: Optional[str] = None) -> List[str]:
+    return await asyncio.to_thread(translate_many, texts, target, source)
+
 
 def translate_text(text: str, target: str = "en", source: Optional[str] = None) -> str:
     if not text or not text.strip():
         return text
-    if not translator_client:
-        return text.strip()
-    try:
-        result = translator_client.translate(
-            text, target_language=target, source_language=source, format_="text"
-        )
-        return result["translatedText"].strip()
-    except Exception as e:
-        logger.warning(f"Translate error: {e}")
-        return text.strip()
+    return translate_many([text], target, source)[0]
+
 
 def translate_to_user_lang(text: str, user_language: str) -> str:
     if user_language == "en":
         return text
-    return translate_text(text, target=user_language)
\ No newline at end of file
+    return translate_text(text, target=user_language)
+
+
+def _template_markup(template: str) -> str:
+    """Fixed string → HTML with {placeholders} as no-translate spans and newlines as <br>."""
+    markup = _PLACEHOLDER_RE.sub(r'<span translate="no">{\1}</span>', html.escape(template, quote=False))
+    return markup.replace("\n", "<br>")
+
+
+def _from_markup(translated: str) -> str:
+    text = re.sub(r"\s*<br\s*/?>\s*", "\n", translated)
+    text = re.sub(r'<span translate="no">\s*(\{\w+\})\s*</span>', r"\1", text)
+    return html.unescape(text)
+
+
+def translate_template(template: str, target: str, **values) -> str:
+    """
+    Translate a fixed string with {placeholders} once per language, then fill
+    it in. Placeholders are shielded from translation, so "{city}" survives
+    in every script.
+    """
+    if target == "en":
+        return template.format(**values)
+    translated = translate_many([_template_markup(template)], target, "en", fmt="html")[0]
+    try:
+        return _from_markup(translated).format(**values)
+    except (KeyError, IndexError, ValueError):
+        # The translation mangled a placeholder → English is better than nothing
+        return template.format(**values)
+
+
+def pretranslate(templates: List[str], languages: List[str]) -> int:
+    """Warm the cache with fixed strings, one batched call per language; returns languages done."""
+    if _get_client() is None:
+        return 0
+    markups = [_template_markup(t) for t in templates]
+    done = 0
+    for language in languages:
+        if language != "en":
+            translate_many(markups, language, "en", fmt="html")
+            done += 1
+    return done
@@ -7,6 +7,7 @@ from typing import Optional
 import os
 import logging
 
+from .store import account_store
 from .utils import create_access_token
 from .models import Token
 
@@ -18,8 +19,7 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")  # e.g. 123456789-xxxx.apps.goo
 
 request_adapter = requests.Request()
 
-# In-memory "DB" — will auto-create user on first login
-fake_users_db: dict = {}
+# Users are created on first login, in the account store ("users") — see auth/store.py
 
 @router.get("/login/google")
 async def login_google():
@@ -58,13 +58,13 @@ async def google_callback(code: str):
         picture = idinfo.get('picture', '')
 
         # Auto-create user if not exists
-        if email not in fake_users_db:
-            fake_users_db[email] = {
+        if account_store.get("users", email) is None:
+            account_store.set("users", email, {
                 "email": email,
                 "name": name,
                 "picture": picture,
                 "is_admin": email.endswith("@refugeefirst.org"),  # optional: admin domain
-            }
+            })
             logger.info(f"New Google user registered: {email}")
 
         # Create our own JWT
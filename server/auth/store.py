@@ -0,0 +1,32 @@
+# backend/auth/store.py — accounts, kept apart from ephemeral session state
+#
+# Same record classes as tools/session_store.py, but their own SQLite file (or
+# Redis prefix / URL): records here have no TTL and are never purged, so a
+# session-store wipe or expiry sweep can't take password hashes with it.
+# One record per email in the "users" namespace.
+import logging
+
+from config import config
+from tools.session_store import make_store
+from .utils import get_password_hash
+
+logger = logging.getLogger(__name__)
+
+account_store = make_store(
+    config.ACCOUNT_BACKEND, config.ACCOUNT_STORE_PATH, config.ACCOUNT_REDIS_URL,
+    prefix="refugee-accounts", purge_every=0,
+)
+
+ADMIN_EMAIL = "admin@refugeefirst.org"
+
+
+def seed_admin() -> None:
+    """Create the admin account if it is missing — called once from the app lifespan."""
+    if account_store.get("users", ADMIN_EMAIL) is None:
+        account_store.set("users", ADMIN_EMAIL, {
+            "email": ADMIN_EMAIL,
+            "hashed_password": get_password_hash("refugee2025!"),
+            "name": "Admin",
+            "is_admin": True,
+        })
+        logger.info("Admin account seeded")
@@ -0,0 +1,6 @@
+# Benchmarks run against fake Overpass / LLM data — never let it land in the
+# shipped OSM cache (knowledge/): every benchmark gets a throwaway one.
+import os
+import tempfile
+
+os.environ.setdefault("KNOWLEDGE_PATH", tempfile.mkdtemp(prefix="bench_knowledge_"))
@@ -0,0 +1,115 @@
+# benchmarks/city_cache_report.py — OSM cache files per city, before vs after the gazetteer
+#
+#   cd server
+#   python -m benchmarks.city_cache_report                 # report only
+#   python -m benchmarks.city_cache_report --merge /tmp/merged   # one canonical file per city, written there
+#   python -m benchmarks.city_cache_report --mentions cities.txt   # replay your own city mentions
+#
+# 1. Groups knowledge/osm_*.md by canonical city id and lists duplicates
+#    (osm_banglore.md + osm_bangalore.md, osm_뭄바이.md + osm_mumbai.md, ...).
+# 2. Replays a stream of city mentions, as users type them, through the old key
+#    scheme (lower().replace(" ", "_")) and through the gazetteer. Every key seen
+#    for the first time is one Overpass fetch + one cache file + one FAISS index;
+#    every repeat is a cache hit.
+import argparse
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from config import config
+from tools.gazetteer import city_key, display_name
+
+SHIPPED_KNOWLEDGE = config.BASE_DIR / "knowledge"  # config.KNOWLEDGE_PATH is a temp dir under benchmarks/
+
+# How people actually write the cities we serve — mixed scripts, old names, typos
+SAMPLE_MENTIONS = [
+    "Mumbai", "mumbai", "Bombay", "मुंबई", "뭄바이", "mumbay", "Mumbai", "मुम्बई",
+    "Bangalore", "bangalore", "Bengaluru", "Banglore", "bengaluru", "बेंगलुरु",
+    "Delhi", "New Delhi", "दिल्ली", "delhi", "Dilli", "دہلی",
+    "Seoul", "서울", "ソウル", "seoul",
+    "Warsaw", "Warszawa", "варшава", "warsaw",
+    "Krakow", "Kraków", "краків", "Cracow",
+    "Kyiv", "Kiev", "київ", "киев",
+    "Lviv", "Lvov", "львів", "Lwów",
+    "Berlin", "berlin", "берлін", "برلين",
+    "Przemyśl", "Przemysl", "перемишль",
+]
+
+
+def _old_key(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+def _replay(mentions: List[str], key_fn: Callable[[str], str]) -> Dict[str, float]:
+    seen = set()
+    hits = 0
+    for mention in mentions:
+        key = key_fn(mention)
+        if key in seen:
+            hits += 1
+        seen.add(key)
+    return {"fetches": len(seen), "hits": hits, "hit_rate": hits / len(mentions)}
+
+
+def _cache_groups(cache_dir: Path) -> Dict[str, List[Path]]:
+    groups: Dict[str, List[Path]] = defaultdict(list)
+    for path in sorted(cache_dir.glob("osm_*.md")):
+        groups[city_key(path.stem[len("osm_"):])].append(path)
+    return groups
+
+
+def _rank(markdown: str) -> tuple:
+    """Real facilities beat the "none found" page, which beats the offline fallback; then the newer fetch."""
+    facilities = markdown.count("\n### ")
+    rendered = markdown.startswith("# Emergency Resources in ")
+    updated = re.search(r"^_Updated: (.+)_$", markdown, re.MULTILINE)
+    return facilities, rendered, updated.group(1) if updated else ""
+
+
+def _merge(groups: Dict[str, List[Path]], out_dir: Path) -> None:
+    """Best file of each group, retitled with the English city name, as out_dir/osm_<key>.md."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for key, paths in groups.items():
+        contents = {path: path.read_text(encoding="utf-8") for path in paths}
+        best = max(paths, key=lambda p: _rank(contents[p]))
+        title, _, body = contents[best].partition("\n")
+        if title.startswith("# Emergency Resources in "):
+            title = f"# Emergency Resources in {display_name(key)}"
+        (out_dir / f"osm_{key}.md").write_text(f"{title}\n{body}", encoding="utf-8")
+        print(f"  {', '.join(p.name for p in paths)} → osm_{key}.md (from {best.name})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSM cache duplication / hit-rate report")
+    parser.add_argument("--cache-dir", type=Path, default=SHIPPED_KNOWLEDGE, help="read only")
+    parser.add_argument("--mentions", type=Path, help="one city mention per line (default: built-in sample)")
+    parser.add_argument("--merge", type=Path, metavar="OUT_DIR", help="write one canonical file per city into OUT_DIR")
+    args = parser.parse_args()
+    if args.merge and args.merge.resolve() in (args.cache_dir.resolve(), SHIPPED_KNOWLEDGE.resolve()):
+        parser.error("--merge writes to a separate directory; review the result, then copy it over by hand")
+
+    groups = _cache_groups(args.cache_dir)
+    files = sum(len(paths) for paths in groups.values())
+    print(f"Cache files in {args.cache_dir}: {files} for {len(groups)} cities")
+    for key, paths in groups.items():
+        if len(paths) > 1 or paths[0].stem != f"osm_{key}":
+            print(f"  {key:<14} ← {', '.join(p.name for p in paths)}")
+
+    if args.merge:
+        _merge(groups, args.merge)
+
+    if args.mentions:
+        mentions = [line.strip() for line in args.mentions.read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        mentions = SAMPLE_MENTIONS
+
+    print(f"\nReplaying {len(mentions)} city mentions")
+    print(f"  {'scheme':<12} {'fetches':>8} {'hits':>6} {'hit rate':>9}")
+    for label, key_fn in (("old", _old_key), ("gazetteer", city_key)):
+        r = _replay(mentions, key_fn)
+        print(f"  {label:<12} {r['fetches']:>8} {r['hits']:>6} {r['hit_rate']:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/langid_eval.py — accuracy + latency of the local language detector
+#
+#   cd server
+#   python -m benchmarks.langid_eval
+#   python -m benchmarks.langid_eval --corpus my_messages.tsv --min-confidence 0.5
+#
+# Corpus format: one "<iso code>\t<message>" per line, "#" lines ignored.
+# Messages must not repeat the detector's seed text (agents/langid.py) — not
+# even as part of a seed line — or the accuracy is measured on training data.
+# "LLM-free" = share of messages confident enough that the classifier prompt
+# skips language detection (LANGID_MIN_CONFIDENCE).
+import argparse
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from agents.langid import _LATIN_SEED, _WORD_RE, detect_language
+from config import config
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "data" / "langid_corpus.tsv"
+
+
+def load_corpus(path: Path):
+    rows = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        language, text = line.split("\t", 1)
+        rows.append((language.strip(), text.strip()))
+    return rows
+
+
+def _words(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def seed_overlap(corpus):
+    """Corpus messages equal to, or contained in, a seed line (or containing one)."""
+    seed = [_words(line) for text in _LATIN_SEED.values() for line in text.splitlines() if line.strip()]
+    overlap = []
+    for language, text in corpus:
+        words = _words(text)
+        if words and any(words in line or line in words for line in seed):
+            overlap.append((language, text))
+    return overlap
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local language-ID benchmark")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--min-confidence", type=float, default=config.LANGID_MIN_CONFIDENCE)
+    parser.add_argument("--repeat", type=int, default=200, help="timing passes over the corpus")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    overlap = seed_overlap(corpus)
+    if overlap:
+        listed = "\n".join(f"  {language}\t{text}" for language, text in overlap)
+        raise SystemExit(f"{len(overlap)} corpus messages repeat the langid seed text:\n{listed}")
+    per_lang = defaultdict(lambda: [0, 0])
+    confusions = Counter()
+    confident = confident_correct = 0
+
+    for language, text in corpus:
+        guess = detect_language(text)
+        per_lang[language][1] += 1
+        if guess.language == language:
+            per_lang[language][0] += 1
+        else:
+            confusions[(language, guess.language)] += 1
+        if guess.confidence >= args.min_confidence:
+            confident += 1
+            confident_correct += guess.language == language
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for _, text in corpus:
+            detect_language(text)
+    per_message_us = (time.perf_counter() - start) / (args.repeat * len(corpus)) * 1e6
+
+    correct = sum(c for c, _ in per_lang.values())
+    print(f"corpus: {args.corpus.name} ({len(corpus)} messages, {len(per_lang)} languages)")
+    print(f"accuracy:          {correct / len(corpus):.1%}")
+    print(f"LLM-free (≥{args.min_confidence}): {confident / len(corpus):.1%} of messages, "
+          f"{(confident_correct / confident if confident else 0):.1%} correct")
+    print(f"latency:           {per_message_us:.1f} µs / message")
+    print("\nper language:")
+    for language, (ok, total) in sorted(per_lang.items()):
+        print(f"  {language:>3}  {ok:>3}/{total:<3} {ok / total:.0%}")
+    if confusions:
+        print("\nconfusions (expected → got):")
+        for (expected, got), n in confusions.most_common():
+            print(f"  {expected} → {got}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/llm_load.py — how many concurrent conversations can one worker sustain?
+#
+#   cd server
+#   python -m benchmarks.llm_load                      # simulated Groq (no API key needed)
+#   python -m benchmarks.llm_load --live --levels 1,8  # real Groq calls
+#
+# Each "conversation" = classify → plan → native guidance, i.e. the three LLM calls
+# a real non-English message makes. While they run, a heartbeat task measures
+# event-loop lag: with the async client it stays ~0 ms no matter how many
+# conversations are waiting on the network.
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from agents import llm
+from agents.classifier import classify_message
+from agents.planner import generate_survival_plan
+from agents.booking_helper import get_booking_guidance
+
+
+class _FakeCompletions:
+    """Stands in for Groq: sleeps for a realistic network time, returns canned text."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, model, messages, temperature, max_tokens, **kwargs):
+        await asyncio.sleep(self.latency * random.uniform(0.7, 1.3))
+        text = '{"city": "Mumbai", "city_unknown": false, "language": "hi", "urgency": "high", "needs": ["shelter"]}'
+        if max_tokens > 180:
+            text = "**FIRST 2 HOURS – IMMEDIATE SAFETY**\nGo to the station.\nYou are safe now. Help is real."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+async def _conversation() -> float:
+    start = time.perf_counter()
+    await classify_message("main mumbai mein hoon, rehne ki jagah chahiye")
+    plan = await generate_survival_plan(
+        city="mumbai", language="en", urgency="high", needs=["shelter"],
+        user_message="I am in Mumbai and need a place to stay",
+        local_context="### Test Shelter\n- **Address:** Station Road 1",
+    )
+    await get_booking_guidance(city="mumbai", user_language="hi", english_survival_plan=plan)
+    return time.perf_counter() - start
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list):
+    interval = 0.01
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - before - interval)
+
+
+async def run_level(conversations: int) -> dict:
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(_heartbeat(stop, lags))
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[_conversation() for _ in range(conversations)])
+    wall = time.perf_counter() - start
+    stop.set()
+    await beat
+    latencies = sorted(latencies)
+    return {
+        "conversations": conversations,
+        "wall_s": wall,
+        "conv_per_s": conversations / wall,
+        "p50_s": statistics.median(latencies),
+        "p95_s": latencies[int(0.95 * (len(latencies) - 1))],
+        "max_loop_lag_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="LLM load test for one worker")
+    parser.add_argument("--levels", default="1,8,32,64,128,256")
+    parser.add_argument("--live", action="store_true", help="hit the real Groq API")
+    parser.add_argument("--latency", type=float, default=0.8, help="simulated seconds per LLM call")
+    parser.add_argument("--p95-budget", type=float, default=10.0, help="seconds a conversation may take")
+    args = parser.parse_args()
+
+    if not args.live:
+        llm.client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(args.latency)))
+
+    print(f"LLM_MAX_CONCURRENCY={llm.config.LLM_MAX_CONCURRENCY}  mode={'live' if args.live else 'simulated'}")
+    print(f"{'conv':>6} {'wall s':>8} {'conv/s':>8} {'p50 s':>7} {'p95 s':>7} {'loop lag ms':>12}")
+    sustained = 0
+    for level in [int(x) for x in args.levels.split(",")]:
+        r = await run_level(level)
+        print(f"{r['conversations']:>6} {r['wall_s']:>8.2f} {r['conv_per_s']:>8.2f} "
+              f"{r['p50_s']:>7.2f} {r['p95_s']:>7.2f} {r['max_loop_lag_ms']:>12.1f}")
+        if r["p95_s"] <= args.p95_budget:
+            sustained = level
+    print(f"\nSustained with p95 ≤ {args.p95_budget:.0f}s: {sustained} concurrent conversations per worker")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+# benchmarks/overload.py — latency per urgency class when the LLM is saturated
+#
+#   cd server
+#   python -m benchmarks.overload                        # simulated Groq, ~1 minute
+#   python -m benchmarks.overload --rate 80 --seconds 15 --latency 0.2
+#
+# Messages arrive (Poisson) faster than the LLM slots can serve them, with a
+# realistic urgency mix. Each one is a job: classify → plan → native answer,
+# three LLM calls at full service. Two runs over the same arrivals:
+#
+#   fifo       every job and LLM call in arrival order, always full service
+#              (what we had before admission control)
+#   admission  the job queue and LLM gate serve critical/high first, medium/low
+#              degrade (cached → template → fallback) or are shed with "busy"
+#
+# Prints p50 / p99 from arrival to answer per urgency class, plus how many
+# messages got which stage or were turned away.
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from agents import llm
+from agents.planner import generate_survival_plan, template_plan
+from benchmarks.llm_load import _FakeCompletions
+from config import config
+from jobs.admission import FULL_SERVICE, AdmissionController
+from jobs.base import ACCEPTED, priority_for
+from jobs.memory import MemoryJobQueue
+from jobs.worker import WorkerPool, register_handler
+from tools.facility_store import Facility
+
+URGENCY_MIX = {"critical": 0.05, "high": 0.15, "medium": 0.6, "low": 0.2}
+
+FACILITIES = [
+    Facility(osm_id="node/1", name="Test Shelter", amenity="shelter", address="Station Road 1"),
+    Facility(osm_id="node/2", name="City Food Bank", amenity="food_bank", address="Market Street 5"),
+    Facility(osm_id="node/3", name="Help NGO", amenity="ngo", address="Main Square 2"),
+]
+
+
+def _arrivals(rate: float, seconds: float, seed: int):
+    rng = random.Random(seed)
+    t, out = 0.0, []
+    classes, weights = zip(*URGENCY_MIX.items())
+    while True:
+        t += rng.expovariate(rate)
+        if t > seconds:
+            return out
+        out.append((t, rng.choices(classes, weights)[0]))
+
+
+async def _run(mode: str, arrivals, args) -> dict:
+    llm._gate = llm._PriorityGate(args.llm_slots)
+    queue = MemoryJobQueue(f"overload_{mode}", max_pending=args.queue_max, max_pending_per_key=1, dedupe_ttl_seconds=60)
+    if mode == "admission":
+        controller = AdmissionController(
+            queue, llm.llm_load,
+            cached_at=config.ADMISSION_CACHED_AT,
+            template_at=config.ADMISSION_TEMPLATE_AT,
+            fallback_at=config.ADMISSION_FALLBACK_AT,
+            shed_at=config.ADMISSION_SHED_AT,
+            reserved_queue=config.ADMISSION_RESERVED_QUEUE,
+        )
+    else:
+        inf = float("inf")
+        controller = AdmissionController(queue, llm.llm_load, inf, inf, inf, inf, reserved_queue=0.0)
+
+    latencies = defaultdict(list)
+    stages: Counter = Counter()
+    shed: Counter = Counter()
+    finished = asyncio.Event()
+    remaining = [0]
+
+    async def conversation(job):
+        urgency = job.payload["urgency"]
+        await llm.chat_completion("classify", max_tokens=150)
+        stage = controller.stage(urgency)
+        if stage == FULL_SERVICE:
+            plan = await generate_survival_plan(
+                city="mumbai", language="en", urgency=urgency, needs=["shelter"],
+                user_message="I need a place to stay", local_context="", facilities=FACILITIES,
+            )
+            await llm.chat_completion(plan, max_tokens=1400)
+        else:
+            template_plan("mumbai", ["shelter"], FACILITIES)
+        stages[f"{urgency}:{stage}"] += 1
+        latencies[urgency].append(time.perf_counter() - job.payload["arrived"])
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            finished.set()
+
+    async def give_up(job, error):
+        remaining[0] -= 1
+
+    register_handler("overload", conversation, give_up)
+    pool = WorkerPool(queue, args.workers)
+    await pool.start()
+
+    start = time.perf_counter()
+    for i, (at, urgency) in enumerate(arrivals):
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if not controller.admit(urgency):
+            shed[urgency] += 1
+            continue
+        # fifo: one priority for all — arrival order decides
+        priority = priority_for(urgency) if mode == "admission" else priority_for("medium")
+        payload = {"urgency": urgency, "arrived": time.perf_counter()}
+        if queue.put("overload", f"user{i}", payload, priority=priority) == ACCEPTED:
+            remaining[0] += 1
+        else:
+            shed[urgency] += 1
+    if remaining[0]:
+        await finished.wait()
+    wall = time.perf_counter() - start
+    await pool.stop()
+    return {"latencies": latencies, "stages": stages, "shed": shed, "wall": wall}
+
+
+def _report(mode: str, r: dict, arrivals) -> None:
+    sent = Counter(u for _, u in arrivals)
+    print(f"\n{mode}  (all answered after {r['wall']:.1f}s)")
+    print(f"  {'urgency':<9} {'sent':>5} {'served':>7} {'shed':>5} {'p50 s':>7} {'p99 s':>7}")
+    for urgency in URGENCY_MIX:
+        lat = sorted(r["latencies"].get(urgency, []))
+        p50 = statistics.median(lat) if lat else 0.0
+        p99 = lat[min(len(lat) - 1, int(0.99 * len(lat)))] if lat else 0.0
+        print(f"  {urgency:<9} {sent[urgency]:>5} {len(lat):>7} {r['shed'][urgency]:>5} {p50:>7.2f} {p99:>7.2f}")
+    mix = ", ".join(f"{k}={v}" for k, v in sorted(r["stages"].items()))
+    print(f"  stages: {mix}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Per-urgency latency under overload")
+    parser.add_argument("--rate", type=float, default=40.0, help="messages per second")
+    parser.add_argument("--seconds", type=float, default=15.0, help="how long messages keep arriving")
+    parser.add_argument("--latency", type=float, default=0.3, help="simulated seconds per LLM call")
+    parser.add_argument("--llm-slots", type=int, default=config.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--workers", type=int, default=128, help="job workers (more than LLM slots → LLM is the bottleneck)")
+    parser.add_argument("--queue-max", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(args.latency)))
+    arrivals = _arrivals(args.rate, args.seconds, args.seed)
+    capacity = args.llm_slots / (3 * args.latency)
+    print(f"{len(arrivals)} messages at {args.rate:.0f}/s for {args.seconds:.0f}s — "
+          f"full-service capacity ≈ {capacity:.1f}/s ({args.llm_slots} LLM slots × {args.latency}s per call, 3 calls)")
+    for mode in ("fifo", "admission"):
+        _report(mode, await _run(mode, arrivals, args), arrivals)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
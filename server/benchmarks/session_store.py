@@ -0,0 +1,109 @@
+# benchmarks/session_store.py — session store read/write latency with concurrent workers
+#
+#   cd server
+#   python -m benchmarks.session_store                          # sqlite (temp file) + memory
+#   python -m benchmarks.session_store --workers 1,4,8,16 --ops 5000
+#   python -m benchmarks.session_store --redis-url redis://localhost:6379/15
+#
+# Each worker is a separate process (like uvicorn --workers N) doing the mix a
+# real message causes: mostly reads (PDF link, location), one merge
+# update per message (city / language / plan) and an occasional full set.
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from tools.session_store import MemorySessionStore, RedisSessionStore, SqliteSessionStore
+
+PLAN = "**FIRST 2 HOURS – IMMEDIATE SAFETY**\n" + "Go to Test Shelter, Station Road 1.\n" * 30
+
+
+def _open(backend: str, target: str):
+    if backend == "sqlite":
+        return SqliteSessionStore(Path(target))
+    if backend == "redis":
+        return RedisSessionStore(target, prefix="bench")
+    return MemorySessionStore()
+
+
+def _work(backend: str, target: str, ops: int, seed: int, users: int, out) -> None:
+    store = _open(backend, target)
+    rng = random.Random(seed)
+    lat: Dict[str, List[float]] = {"get": [], "update": [], "set": []}
+    for _ in range(ops):
+        key = f"wa_+91{rng.randrange(users):07d}"
+        roll = rng.random()
+        start = time.perf_counter()
+        if roll < 0.75:
+            store.get("session", key)
+            op = "get"
+        elif roll < 0.95:
+            store.update("session", key, 3600, city="mumbai", language="hi", last_plan=PLAN, pdf_url=f"/downloads/{key}.pdf")
+            op = "update"
+        else:
+            store.set("location", key, {"lat": 19.07, "lon": 72.87}, 3600)
+            op = "set"
+        lat[op].append(time.perf_counter() - start)
+    out.put(lat)
+
+
+def _pct(samples: List[float], p: float) -> float:
+    return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000 if samples else 0.0
+
+
+def run(backend: str, target: str, workers: int, ops: int, users: int) -> dict:
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_work, args=(backend, target, ops, i, users, out)) for i in range(workers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    merged: Dict[str, List[float]] = {"get": [], "update": [], "set": []}
+    for _ in procs:
+        for op, samples in out.get().items():
+            merged[op] += samples
+    for p in procs:
+        p.join()
+    wall = time.perf_counter() - start
+    result = {"workers": workers, "ops_per_s": workers * ops / wall}
+    for op, samples in merged.items():
+        samples.sort()
+        result[op] = (statistics.median(samples) * 1000 if samples else 0.0, _pct(samples, 0.99))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session store latency under concurrent workers")
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--ops", type=int, default=3000, help="operations per worker")
+    parser.add_argument("--users", type=int, default=2000, help="distinct sessions")
+    parser.add_argument("--redis-url", help="also benchmark a Redis-compatible server")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    backends = [("sqlite", os.path.join(tmp, "sessions.sqlite3"))]
+    if args.redis_url:
+        backends.append(("redis", args.redis_url))
+
+    print(f"{'backend':<8} {'workers':>7} {'ops/s':>9}   {'get p50/p99 ms':>15} {'update p50/p99 ms':>18} {'set p50/p99 ms':>15}")
+    for backend, target in backends:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            r = run(backend, target, workers, args.ops, args.users)
+            print(f"{backend:<8} {workers:>7} {r['ops_per_s']:>9.0f}   "
+                  f"{r['get'][0]:>6.3f}/{r['get'][1]:<8.3f} {r['update'][0]:>8.3f}/{r['update'][1]:<9.3f} "
+                  f"{r['set'][0]:>6.3f}/{r['set'][1]:<8.3f}")
+    # In-process baseline: what a plain dict costs (single worker only — not shared)
+    r = run("memory", "", 1, args.ops, args.users)
+    print(f"{'memory':<8} {1:>7} {r['ops_per_s']:>9.0f}   "
+          f"{r['get'][0]:>6.3f}/{r['get'][1]:<8.3f} {r['update'][0]:>8.3f}/{r['update'][1]:<9.3f} "
+          f"{r['set'][0]:>6.3f}/{r['set'][1]:<8.3f}")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/startup.py — cold-start cost of one worker
+#
+#   cd server
+#   python -m benchmarks.startup              # 5 fresh interpreters, median numbers
+#   python -m benchmarks.startup --top 15     # + slowest imports (python -X importtime)
+#
+# Reports, per fresh process: time to `import main` (what uvicorn does), time to
+# compile the shared graph, and resident memory after each step. No API keys or
+# cloud credentials are needed — every external client is built lazily.
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+_PROBE = r"""
+import json, resource, time
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+base = rss_mb()
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+after_import = rss_mb()
+main.get_graph()
+main.get_graph()
+t2 = time.perf_counter()
+import graph
+print(json.dumps({
+    "import_s": t1 - t0,
+    "graph_s": t2 - t1,
+    "rss_base_mb": base,
+    "rss_import_mb": after_import,
+    "rss_graph_mb": rss_mb(),
+    "same_graph": graph.get_graph() is main.get_graph(),
+}))
+"""
+
+
+def _run_once() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _top_imports(n: int):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    print("\nSlowest imports (cumulative):")
+    for cumulative_us, name in sorted(rows, reverse=True)[:n]:
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    args = parser.parse_args()
+
+    runs = [_run_once() for _ in range(args.runs)]
+    med = lambda key: statistics.median(r[key] for r in runs)
+
+    print(f"runs: {args.runs} (median)")
+    print(f"  import main        {med('import_s') * 1000:>8.0f} ms")
+    print(f"  compile graph      {med('graph_s') * 1000:>8.0f} ms")
+    print(f"  RSS interpreter    {med('rss_base_mb'):>8.1f} MB")
+    print(f"  RSS after import   {med('rss_import_mb'):>8.1f} MB")
+    print(f"  RSS after graph    {med('rss_graph_mb'):>8.1f} MB")
+    print(f"  one shared graph   {all(r['same_graph'] for r in runs)}")
+
+    if args.top:
+        _top_imports(args.top)
+
+
+if __name__ == "__main__":
+    main()
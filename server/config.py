@@ -11,6 +11,10 @@ class Config:
 
     # GroQ (you installed it → we use it)
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # REQUIRED
+    LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # in-flight Groq calls per worker
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
     PUBLIC_URL = os.getenv("PUBLIC_URL")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "refugee_first_2025_k9x!mPvL2qW8zR4tY6uIoP0aSdF3gH5jK7lZxC1vB9nM8eU2wQ6rT4yI")
 
@@ -19,22 +23,127 @@ class Config:
     VERTEX_AI_LOCATION = os.getenv("VERTEX_AI_LOCATION", "us-central1")
     VERTEX_AI_EMBEDDING_MODEL = "text-embedding-004"
 
+    # Loaded FAISS indexes kept in memory per worker (LRU, evicted by estimated size)
+    VECTORSTORE_CACHE_MAX_BYTES = int(os.getenv("VECTORSTORE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    VECTORSTORE_CACHE_MAX_ENTRIES = int(os.getenv("VECTORSTORE_CACHE_MAX_ENTRIES", "64"))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))  # texts per Vertex call on cache miss
+
+    # Graph: run classifier, translation and OSM/index warmup in parallel before planning
+    GRAPH_PARALLEL_BRANCHES = os.getenv("GRAPH_PARALLEL_BRANCHES", "true").lower() == "true"
+
+    # Local language detector: below this confidence the LLM / Google decide instead
+    LANGID_MIN_CONFIDENCE = float(os.getenv("LANGID_MIN_CONFIDENCE", "0.6"))
+
+    # Survival-plan cache: (city, urgency, needs, OSM data version) → finished English plan
+    PLAN_CACHE_TTL_SECONDS = int(os.getenv("PLAN_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+    PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "5000"))    # on disk, LRU beyond this
+    PLAN_CACHE_MEMORY_KEYS = int(os.getenv("PLAN_CACHE_MEMORY_KEYS", "256"))     # per worker
+    # > 0 → also require the cached plan's message to be this similar (cosine of embeddings)
+    PLAN_CACHE_MIN_SIMILARITY = float(os.getenv("PLAN_CACHE_MIN_SIMILARITY", "0"))
+
+    # Native-language plans: (city, language, hash of English plan) → get_booking_guidance answer
+    BOOKING_CACHE_TTL_SECONDS = int(os.getenv("BOOKING_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+    BOOKING_CACHE_MAX_ENTRIES = int(os.getenv("BOOKING_CACHE_MAX_ENTRIES", "5000"))
+    # Off-peak prewarm of the busiest (city, language) pairs for each city's most used plans
+    BOOKING_PREWARM_TOP_PAIRS = int(os.getenv("BOOKING_PREWARM_TOP_PAIRS", "20"))
+    BOOKING_PREWARM_PLANS_PER_CITY = int(os.getenv("BOOKING_PREWARM_PLANS_PER_CITY", "3"))
+    BOOKING_PREWARM_INTERVAL_SECONDS = int(os.getenv("BOOKING_PREWARM_INTERVAL_SECONDS", "3600"))
+    BOOKING_PREWARM_HOURS_UTC = os.getenv("BOOKING_PREWARM_HOURS_UTC", "1-5")  # inclusive range
+
+    # Google Translate: batched calls + persistent cache; fixed strings pre-translated at startup
+    TRANSLATE_BATCH_SIZE = int(os.getenv("TRANSLATE_BATCH_SIZE", "100"))  # API allows 128 segments
+    TRANSLATION_CACHE_TTL_SECONDS = int(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "50000"))
+    TRANSLATION_CACHE_MEMORY_KEYS = int(os.getenv("TRANSLATION_CACHE_MEMORY_KEYS", "2048"))
+    SUPPORTED_LANGUAGES = os.getenv("SUPPORTED_LANGUAGES", "hi,mr,ar,ur,fa,pl,uk,ru,fr,de,es,pt,tr,it").split(",")
+
     # Twilio WhatsApp
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
 
+    # Graph job queue (web + WhatsApp messages) — see jobs/queue.py
+    JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory")  # memory | sqlite
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))  # in the web process; 0 → only `python -m jobs.worker`
+    JOB_QUEUE_MAX_PENDING = int(os.getenv("JOB_QUEUE_MAX_PENDING", "500"))
+    JOB_QUEUE_MAX_PER_KEY = int(os.getenv("JOB_QUEUE_MAX_PER_KEY", "5"))   # per session / phone number
+    JOB_DEDUPE_TTL_SECONDS = int(os.getenv("JOB_DEDUPE_TTL_SECONDS", str(24 * 60 * 60)))  # e.g. Twilio MessageSid
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2"))  # doubles per attempt
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))  # sqlite: a dead worker's job runs again after this
+    JOB_RESULT_TIMEOUT_SECONDS = int(os.getenv("JOB_RESULT_TIMEOUT_SECONDS", "300"))  # web waits this long for a worker
+
+    # Session state shared by all workers — see tools/session_store.py
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")  # sqlite | redis | memory
+    SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+    SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(72 * 60 * 60)))  # the 72 hours we plan for
+
+    # Accounts (password hashes) — own store, no TTL, never purged — see auth/store.py
+    ACCOUNT_BACKEND = os.getenv("ACCOUNT_BACKEND", "sqlite")  # sqlite | redis | memory
+    ACCOUNT_REDIS_URL = os.getenv("ACCOUNT_REDIS_URL", SESSION_REDIS_URL)
+
+    # LangGraph state per session id (conversation memory) — see graph.open_checkpointer()
+    CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")  # sqlite (langgraph-checkpoint-sqlite) | memory
+
+    # PDF rendering (ReportLab) runs in a process pool, see tools/pdf_generator.py
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))          # render processes
+    PDF_MAX_PENDING = int(os.getenv("PDF_MAX_PENDING", "8"))  # renders handed to the pool at once
+
+    # Disk maintenance — expiry + quotas per artifact kind, see tools/maintenance.py
+    # (*_MAX_AGE = seconds since last use; 0 = no limit). Plans, links and
+    # conversations live as long as a session (SESSION_TTL_SECONDS).
+    MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "600"))
+    MAINTENANCE_BATCH = int(os.getenv("MAINTENANCE_BATCH", "500"))  # deletions per kind per sweep
+    PDF_MAX_AGE_SECONDS = int(os.getenv("PDF_MAX_AGE_SECONDS", str(24 * 60 * 60)))  # re-rendered on the next download
+    PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(1024 * 1024 * 1024)))
+    PDF_MAX_FILES = int(os.getenv("PDF_MAX_FILES", "20000"))
+    CITY_INDEX_MAX_AGE_SECONDS = int(os.getenv("CITY_INDEX_MAX_AGE_SECONDS", str(7 * 24 * 60 * 60)))
+    CITY_INDEX_MAX_BYTES = int(os.getenv("CITY_INDEX_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+    CITY_INDEX_MAX_FILES = int(os.getenv("CITY_INDEX_MAX_FILES", "300"))
+    OSM_MAX_AGE_SECONDS = int(os.getenv("OSM_MAX_AGE_SECONDS", str(30 * 24 * 60 * 60)))
+    OSM_MAX_BYTES = int(os.getenv("OSM_MAX_BYTES", str(512 * 1024 * 1024)))
+    OSM_MAX_FILES = int(os.getenv("OSM_MAX_FILES", "1000"))
+
+    # Admission control — load = backlog per LLM slot, see jobs/admission.py
+    ADMISSION_CACHED_AT = float(os.getenv("ADMISSION_CACHED_AT", "2"))      # medium/low: no LLM, cached plan
+    ADMISSION_TEMPLATE_AT = float(os.getenv("ADMISSION_TEMPLATE_AT", "4"))  # medium/low: facility template plan
+    ADMISSION_FALLBACK_AT = float(os.getenv("ADMISSION_FALLBACK_AT", "8"))  # medium/low: static fallback plan
+    ADMISSION_SHED_AT = float(os.getenv("ADMISSION_SHED_AT", "16"))         # medium/low: "busy, resend later"
+    ADMISSION_RESERVED_QUEUE = float(os.getenv("ADMISSION_RESERVED_QUEUE", "0.2"))  # queue share kept for critical/high
+
+    # OpenStreetMap / Overpass
+    OVERPASS_URLS = [u.strip() for u in os.getenv(
+        "OVERPASS_URLS",
+        "https://overpass-api.de/api/interpreter,https://overpass.kumi.systems/api/interpreter",
+    ).split(",") if u.strip()]
+    OVERPASS_MAX_CONCURRENCY = int(os.getenv("OVERPASS_MAX_CONCURRENCY", "2"))  # per endpoint
+    OVERPASS_QUERY_TIMEOUT_SECONDS = int(os.getenv("OVERPASS_QUERY_TIMEOUT_SECONDS", "90"))  # server-side [timeout:]
+    OVERPASS_HTTP_TIMEOUT_SECONDS = float(os.getenv("OVERPASS_HTTP_TIMEOUT_SECONDS", "100"))
+    OSM_RETRY_AFTER_SECONDS = int(os.getenv("OSM_RETRY_AFTER_SECONDS", "300"))  # back off after a failed refresh
+    OSM_PREWARM_TOP_N = int(os.getenv("OSM_PREWARM_TOP_N", "20"))
+    OSM_PREWARM_INTERVAL_SECONDS = int(os.getenv("OSM_PREWARM_INTERVAL_SECONDS", str(30 * 60)))
+
     # Paths
     BASE_DIR = Path(__file__).resolve().parent
     VECTOR_DB_PATH = BASE_DIR / "rag" / "vector_db"
     PDF_OUTPUT_PATH = BASE_DIR / "downloads"
-    KNOWLEDGE_PATH = BASE_DIR / "knowledge"
+    KNOWLEDGE_PATH = Path(os.getenv("KNOWLEDGE_PATH", str(BASE_DIR / "knowledge")))  # benchmarks point this at a temp dir
+    FACILITY_DB_PATH = KNOWLEDGE_PATH / "facilities.sqlite3"  # typed OSM records + R-tree
     SESSION_DB_PATH = VECTOR_DB_PATH / "session_faiss"
+    CITY_DB_PATH = VECTOR_DB_PATH / "city_faiss"     # one shared index per city + content hash
+    EMBEDDING_CACHE_PATH = VECTOR_DB_PATH / "embedding_cache.sqlite3"
+    RESPONSE_CACHE_PATH = VECTOR_DB_PATH / "response_cache.sqlite3"  # cached plans / LLM answers
+    SESSION_STORE_PATH = VECTOR_DB_PATH / "sessions.sqlite3"           # SESSION_BACKEND=sqlite
+    ACCOUNT_STORE_PATH = VECTOR_DB_PATH / "accounts.sqlite3"           # ACCOUNT_BACKEND=sqlite
+    JOB_QUEUE_PATH = VECTOR_DB_PATH / "jobs.sqlite3"                   # JOB_QUEUE_BACKEND=sqlite
+    CHECKPOINT_PATH = VECTOR_DB_PATH / "checkpoints.sqlite3"           # CHECKPOINT_BACKEND=sqlite
+    ARTIFACT_INDEX_PATH = VECTOR_DB_PATH / "artifacts.sqlite3"         # last use of every file we may delete
 
     VECTOR_DB_PATH.mkdir(parents=True, exist_ok=True)
     PDF_OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
     KNOWLEDGE_PATH.mkdir(parents=True, exist_ok=True)
     SESSION_DB_PATH.mkdir(parents=True, exist_ok=True)
+    CITY_DB_PATH.mkdir(parents=True, exist_ok=True)
     # Server
     HOST = "0.0.0.0"
     PORT = 8000
@@ -1,35 +1,107 @@
 # backend/graph.py
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Annotated, List
-import operator
+from langgraph.checkpoint.memory import MemorySaver
+from typing import TypedDict, Annotated, List, Optional, Tuple
+import asyncio
+import threading
 import uuid
 import logging
-from langgraph.graph import StateGraph, END
-from agents.classifier import classify_message
-from agents.translator import translate_text
-from agents.planner import generate_survival_plan
-from agents.booking_helper import get_booking_guidance
-from rag.retrieve import build_session_vectorstore, search_relevant_chunks
+from agents.classifier import Classification, classify_message
+from agents.langid import detect_language
+from agents.matcher import analyze_message
+from agents.translator import pretranslate, translate_template, translate_text
+from agents.llm import set_llm_priority
+from agents.planner import (
+    FALLBACK_PLAN, fallback_plan, generate_survival_plan, plan_cache, plan_cache_key, template_plan,
+)
+from agents.booking_helper import ASYLUM_NOTE, get_booking_guidance, record_plan_use
+from rag.retrieve import build_city_vectorstore, embeddings, index_exists, search_relevant_chunks
 from tools.osm_utils import fetch_city_resources
-from tools.pdf_generator import generate_pdf
+from tools.gazetteer import city_key as canonical_city_key, display_name
+from tools.facility_store import amenities_for_needs, city_near, city_version, query_facilities
+from tools.spatial_index import nearest_facilities
+from tools.session_store import session_store
+from tools.artifact_index import CONVERSATION, artifacts
+from jobs.admission import CACHED, FULL_SERVICE, TEMPLATE
+from jobs.base import priority_for
+from jobs.queue import admission
 from config import config
 
 logger = logging.getLogger(__name__)
 
-# Allow keys to be added gradually
+def _status_log(current: Optional[List[str]], update: Optional[List[str]]) -> List[str]:
+    """Appends like operator.add; None (sent by turn_input) starts the next turn's log."""
+    if update is None:
+        return []
+    return (current or []) + update
+
+
+# Allow keys to be added gradually. State is checkpointed per session id, so
+# city / language / vector_index / urgency / needs carry over to the next message.
 class AgentState(TypedDict, total=False):
     raw_message: str
     session_id: str
+    user_lat: float                 # from a shared WhatsApp location pin, if any
+    user_lon: float
     detected_city: str
     detected_language: str
     urgency: str
     needs: List[str]
     translated_message: str
+    vector_index: str
     rag_context: str
     survival_plan_en: str
     final_response: str
     pdf_url: str
-    status_updates: Annotated[List[str], operator.add]
+    service_level: str              # jobs/admission.py stage the plan was made at
+    status_updates: Annotated[List[str], _status_log]
+
+
+# Answers of the previous turn — cleared by every new message so they never leak into it
+_TURN_KEYS = (
+    "user_lat", "user_lon", "translated_message", "rag_context",
+    "survival_plan_en", "final_response", "pdf_url", "service_level", "status_updates",
+)
+
+
+def turn_input(message: str, session_id: str, location: Optional[Tuple[float, float]] = None) -> dict:
+    """Graph input for one message; pass with run_config(session_id)."""
+    state = dict.fromkeys(_TURN_KEYS)
+    state.update(raw_message=message, session_id=session_id)
+    if location:
+        state["user_lat"], state["user_lon"] = location
+    return state
+
+
+def run_config(session_id: str, **extra) -> dict:
+    """One checkpoint thread per session id (web session / WhatsApp number)."""
+    return {"configurable": {"thread_id": session_id}, **extra}
+
+
+# Asked whenever the city is unknown — pre-translated at startup (see FIXED_STRINGS)
+CITY_QUESTION = "Which city are you in right now?"
+
+# Fixed texts users may get in any language — translated once, served from cache
+FIXED_STRINGS = [CITY_QUESTION, FALLBACK_PLAN, ASYLUM_NOTE]
+
+
+async def pretranslate_fixed_strings():
+    """Startup: every fixed string into every supported language, in batched calls."""
+    try:
+        done = await asyncio.to_thread(pretranslate, FIXED_STRINGS, config.SUPPORTED_LANGUAGES)
+        logger.info(f"Fixed strings pre-translated into {done} languages")
+    except Exception as e:
+        logger.warning(f"Pre-translation failed: {e}")
+
+
+# Non-greeting letters still allowed around a greeting word ("hi how are you")
+_GREETING_SLACK = 12
+
+
+def _local_language(message: str) -> Optional[str]:
+    """Local detector's answer if it is confident enough to skip asking the LLM."""
+    guess = detect_language(message)
+    return guess.language if guess.confidence >= config.LANGID_MIN_CONFIDENCE else None
 
 
 async def greeting_node(state: AgentState) -> dict:
@@ -38,29 +110,18 @@ async def greeting_node(state: AgentState) -> dict:
     Responds to Hi / हाय / سلام etc. with a friendly hello — NO city mention.
     """
     message = state["raw_message"].strip()
-
-    GREETINGS = {
-        "en": ["hi", "hello", "hey", "hii", "hiii", "helo", "good morning", "good evening", "gm", "ge"],
-        "hi": ["हाय", "नमस्ते", "हेलो", "हॅलो", "namaste", "namaskar", "हाय्या"],
-        "mr": ["नमस्कार", "हाय", "हॅलो"],
-        "ar": ["مرحبا", "السلام عليكم", "سلام", "هلا", "مرحباً"],
-        "ur": ["ہیلو", "السلام علیکم", "ہائے", "سلام"],
-        "fa": ["سلام", "درود"],
-        "pl": ["cześć", "dzień dobry", "hej", "cześć!"],
-        "uk": ["привіт", "добрий день", "здравствуйте", "привет"],
-        "ru": ["привет", "здравствуйте", "добрый день"],
-    }
-
-    lower = message.lower()
-    detected_lang = "en"
-    is_greeting = len(message) <= 6
-
-    if not is_greeting:
-        for lang, words in GREETINGS.items():
-            if any(g in lower for g in [w.lower() for w in words]):
-                detected_lang = lang
-                is_greeting = True
-                break
+    intents = analyze_message(message)
+
+    # Anything naming a city, a need, an emergency or a PDF is a real request,
+    # however short ("Mumbai", "SOS"). Otherwise a greeting word with little
+    # else around it ("hi how are you"), or a bare "ok" / "?" / emoji.
+    letters = sum(ch.isalnum() for ch in message)
+    is_greeting = not intents.has_request and (
+        letters <= 6
+        or (intents.greeting_language is not None and letters - intents.greeting_chars <= _GREETING_SLACK)
+    )
+    # "ok" / "?" mid-conversation → keep answering in the language we already know
+    detected_lang = intents.greeting_language or state.get("detected_language") or "en"
 
     if not is_greeting:
         return {}  # Not a greeting → continue to classifier
@@ -78,6 +139,11 @@ async def greeting_node(state: AgentState) -> dict:
         "ru": "Привет! Чем могу помочь?",
     }
 
+    # "سلام" is Arabic, Farsi and Urdu — let the script-aware detector decide
+    local_lang = _local_language(message)
+    if local_lang in simple_greetings:
+        detected_lang = local_lang
+
     reply = simple_greetings.get(detected_lang, simple_greetings["en"])
 
     return {
@@ -86,93 +152,321 @@ async def greeting_node(state: AgentState) -> dict:
         "status_updates": ["Greeting sent"],
     }
 
+def _match_classification(message: str, language: Optional[str], known: Optional[dict] = None) -> Optional[Classification]:
+    """
+    Classification straight from the keyword matcher, no LLM. City and language
+    come from the message (exactly one city, confident local language detector)
+    or carry over from earlier turns (`known`); needs come from the message or
+    carry over too. None → not enough to go on, ask the classifier.
+    """
+    known = known or {}
+    intents = analyze_message(message)
+    if len(intents.cities) > 1:
+        return None
+    city_key = intents.cities[0] if intents.cities else known.get("detected_city")
+    language = language or known.get("detected_language")
+    if not city_key or not language:
+        return None
+    if intents.needs or intents.emergency:
+        needs, urgency = intents.needs, intents.urgency
+    elif known.get("needs"):
+        needs, urgency = known["needs"], known.get("urgency") or "medium"  # "and for tomorrow?"
+    else:
+        return None
+    return Classification(
+        city=display_name(city_key),
+        language=language,
+        urgency=urgency,
+        needs=needs,
+        city_unknown=False,
+    )
+
+
+def _store_session(session_id: str, fields: dict) -> None:
+    session_store.update("session", session_id, config.SESSION_TTL_SECONDS, **fields)
+    artifacts.touch(CONVERSATION, session_id)  # its checkpoints expire with the session
+
+
+async def _remember_session(session_id: str, **fields):
+    """Session record every worker can read (city, language, index, last plan, PDF)."""
+    try:
+        await asyncio.to_thread(_store_session, session_id, fields)
+    except Exception as e:
+        logger.warning(f"Session store update failed for {session_id[:8]}: {e}")
+
+
+async def _known_context(state: AgentState, session_id: str) -> dict:
+    """
+    What earlier turns found out: the checkpointed state, or — when this
+    worker has no checkpoint for the session (in-memory checkpointer) — the
+    shared session record.
+    """
+    if state.get("detected_language"):
+        return {key: state.get(key) for key in ("detected_city", "detected_language", "vector_index", "urgency", "needs")}
+    try:
+        record = await asyncio.to_thread(session_store.get, "session", session_id) or {}
+    except Exception as e:
+        logger.warning(f"Session store lookup failed for {session_id[:8]}: {e}")
+        record = {}
+    return {
+        "detected_city": record.get("city"),
+        "detected_language": record.get("language"),
+        "vector_index": record.get("vector_index"),
+        "urgency": record.get("urgency"),
+        "needs": record.get("needs"),
+    }
+
+
 async def classifier_node(state: AgentState) -> dict:
     raw = state["raw_message"]
-    classification = classify_message(raw)  # ← uses the bullet-proof prompt
     session_id = state.get("session_id") or str(uuid.uuid4())
+    language_hint = _local_language(raw)
+    known = await _known_context(state, session_id)
+    classification = _match_classification(raw, language_hint, known)
+    if classification is None:
+        classification = await classify_message(raw, language_hint=language_hint)
+        # Follow-up without a city ("is it open at night?") → the city we already know
+        if classification.city_unknown and known.get("detected_city"):
+            classification.city = display_name(known["detected_city"])
+            classification.city_unknown = False
+    else:
+        logger.info(f"Classified without LLM → {classification.city} / {classification.needs}")
 
 
     detected_lang = classification.language.lower()  # ← "en", "hi", "ar", etc.
     city_raw = classification.city if not classification.city_unknown else "Unknown"
 
+    # No city in the text, but the user shared a location pin → use the city around it
+    if classification.city_unknown and state.get("user_lat") is not None:
+        nearby_city = await asyncio.to_thread(city_near, state["user_lat"], state["user_lon"])
+        if nearby_city:
+            city_raw = display_name(nearby_city)
+            classification.city_unknown = False
+
     # Log clearly what we detected
     logger.info(f"Session {session_id[:8]} → City: '{city_raw}' | Language: '{detected_lang}' | Unknown: {classification.city_unknown}")
 
-    # 1. City is unknown → ask for it (in user's actual language later)
+    # 1. City is unknown → ask for it in the user's language (needs are kept for the answer)
     if classification.city_unknown:
+        await _remember_session(session_id, language=detected_lang, urgency=classification.urgency, needs=classification.needs or [])
         return {
             "session_id": session_id,
             "detected_language": detected_lang,
-            "final_response": "Which city are you in right now?",
+            "urgency": classification.urgency,
+            "needs": classification.needs or [],
+            "final_response": await asyncio.to_thread(translate_template, CITY_QUESTION, detected_lang),
             "status_updates": ["City needed"],
         }
 
-    # 2. City found → normalize for OSM lookup only
-    city_key = city_raw.strip().lower().replace(" ", "_")
-    
-    # Fetch local resources
-    markdown = fetch_city_resources(city_key)
-    if not markdown.strip():
-        return {
-            "session_id": session_id,
-            "detected_city": city_key,
-            "detected_language": detected_lang,
-            "final_response": f"I found {city_raw}, but no local data yet. Try asking general questions.",
-            "status_updates": ["No OSM data"],
-        }
+    # 2. City found → one canonical key for every spelling ("Bombay", "मुंबई", "mumbay")
+    city_key = canonical_city_key(city_raw)
+    city_raw = display_name(city_key)
 
-    # Build RAG index for this city
-    build_session_vectorstore(session_id, markdown)
+    vector_index = known.get("vector_index")
+    if city_key == known.get("detected_city") and vector_index and await asyncio.to_thread(index_exists, vector_index):
+        # Same city as last turn → its index is still there, skip the OSM + index steps
+        logger.info(f"Session {session_id[:8]} → reusing {vector_index}")
+    else:
+        # Fetch local resources
+        markdown = await fetch_city_resources(city_key)
+        if not markdown.strip():
+            return {
+                "session_id": session_id,
+                "detected_city": city_key,
+                "detected_language": detected_lang,
+                "final_response": f"I found {city_raw}, but no local data yet. Try asking general questions.",
+                "status_updates": ["No OSM data"],
+            }
+
+        # Shared RAG index for this city (built once per OSM content version)
+        vector_index = await asyncio.to_thread(build_city_vectorstore, city_key, markdown)
+    await _remember_session(
+        session_id, city=city_key, language=detected_lang, vector_index=vector_index,
+        urgency=classification.urgency, needs=classification.needs or [],
+    )
 
- 
     return {
         "session_id": session_id,
         "detected_city": city_key,
-        "detected_language": detected_lang,         
+        "detected_language": detected_lang,
+        "vector_index": vector_index,
         "urgency": classification.urgency,
         "needs": classification.needs or [],
         "status_updates": [f"You're in {city_raw} ({detected_lang})"]
     }
 
+def _guess_language(message: str) -> str:
+    """Local guess used before the classifier has answered; "auto" lets Google detect it."""
+    return _local_language(message) or "auto"
+
+
+async def _translate_to_english(message: str) -> str:
+    try:
+        return await asyncio.to_thread(translate_text, message, "en")
+    except Exception as e:
+        logger.warning(f"Translation failed: {e}")
+        return message
+
+
 async def translator_node(state: AgentState) -> dict:
-    if state["detected_language"] == "en":
+    # In parallel mode the classifier hasn't answered yet and detected_language is
+    # still last turn's (checkpointed) → guess from this message, join_node corrects it
+    if config.GRAPH_PARALLEL_BRANCHES:
+        language = _guess_language(state["raw_message"])
+    else:
+        language = state.get("detected_language") or _guess_language(state["raw_message"])
+    if language == "en":
         translated = state["raw_message"]
     else:
+        translated = await _translate_to_english(state["raw_message"])  # source auto-detected
+    return {"translated_message": translated, "status_updates": ["Translating..."]}
+
+
+async def warmup_node(state: AgentState) -> dict:
+    """
+    Parallel branch: if the message names a city we already know, start its OSM
+    fetch and index build now. classifier_node later hits the same single-flight
+    fetch / build lock, so this work is never done twice.
+    """
+    guesses = analyze_message(state["raw_message"]).cities
+    if len(guesses) == 1:
         try:
-            translated = translate_text(state["raw_message"], target="en")
+            markdown = await fetch_city_resources(guesses[0])
+            if markdown.strip():
+                await asyncio.to_thread(build_city_vectorstore, guesses[0], markdown)
         except Exception as e:
-            logger.warning(f"Translation failed: {e}")
-            translated = state["raw_message"]
-    return {"translated_message": translated, "status_updates": ["Translating..."]}
+            logger.warning(f"Warmup for {guesses[0]} failed: {e}")
+    return {}
+
+
+async def join_node(state: AgentState) -> dict:
+    """Fan-in of classifier / translator / warmup. Fixes a wrong speculative language guess."""
+    if state.get("final_response") or state.get("detected_language", "en") == "en":
+        return {}
+    if state.get("translated_message", state["raw_message"]) == state["raw_message"]:
+        # Guessed English (e.g. romanised Hindi) but the classifier says otherwise
+        return {"translated_message": await _translate_to_english(state["raw_message"])}
+    return {}
+
+
+async def _cached_plan(state: AgentState) -> tuple:
+    """(plan or None, cache key, message vector) — personalised (location) plans are never cached."""
+    if state.get("user_lat") is not None:
+        return None, None, None
+    version = await asyncio.to_thread(city_version, state["detected_city"])
+    key = plan_cache_key(state["detected_city"], state.get("urgency", "medium"), state.get("needs"), version)
+    vector = None
+    if config.PLAN_CACHE_MIN_SIMILARITY > 0:
+        vector = await asyncio.to_thread(embeddings.embed_query, state["translated_message"])
+    plan = await asyncio.to_thread(plan_cache.get, key, vector, config.PLAN_CACHE_MIN_SIMILARITY)
+    return plan, key, vector
+
+
+async def _degraded_plan(state: AgentState, stage: str) -> str:
+    """Overload: cached plan → facility template plan → static fallback, no LLM."""
+    city = state["detected_city"]
+    if stage == CACHED:
+        try:
+            version = await asyncio.to_thread(city_version, city)
+            key = plan_cache_key(city, state.get("urgency", "medium"), state.get("needs"), version)
+            plan = await asyncio.to_thread(plan_cache.get, key)  # any plan for the key, no similarity check
+            if plan:
+                return plan
+        except Exception as e:
+            logger.warning(f"Plan cache lookup failed: {e}")
+    if stage in (CACHED, TEMPLATE):
+        try:
+            facilities = await asyncio.to_thread(query_facilities, city, amenities_for_needs(state.get("needs")) or None)
+            plan = template_plan(city, state.get("needs"), facilities)
+            if plan:
+                return plan
+        except Exception as e:
+            logger.warning(f"Template plan failed: {e}")
+    return fallback_plan(city)
 
 
 async def planner_node(state: AgentState) -> dict:
-    session_id = state["session_id"]
     query = state["translated_message"]
+    urgency = state.get("urgency", "medium")
+    set_llm_priority(priority_for(urgency))  # from here on we know the real urgency
+    stage = admission.stage(urgency)
+
+    if stage != FULL_SERVICE:
+        logger.info(f"Overload → {urgency} message gets a {stage} plan")
+        return {
+            "survival_plan_en": await _degraded_plan(state, stage),
+            "rag_context": "",
+            "service_level": stage,
+            "status_updates": ["Creating your plan..."],
+        }
 
     try:
-        docs = search_relevant_chunks(session_id, query, k=8)
+        cached_plan, cache_key, query_vector = await _cached_plan(state)
+    except Exception as e:
+        logger.warning(f"Plan cache lookup failed: {e}")
+        cached_plan = cache_key = query_vector = None
+    if cached_plan:
+        logger.info(f"Plan cache hit → {cache_key}")
+        return {
+            "survival_plan_en": cached_plan,
+            "rag_context": "",
+            "service_level": FULL_SERVICE,
+            "status_updates": ["Creating your plan..."],
+        }
+
+    try:
+        docs = await asyncio.to_thread(search_relevant_chunks, state.get("vector_index"), query, 8)
         context = "\n\n".join([doc.page_content for doc in docs])
     except Exception as e:
         logger.error(f"RAG failed: {e}")
         context = "No local information available."
 
-    plan_en = generate_survival_plan(
+    # Typed facilities matching the user's needs — nearest first if we know where they are
+    amenities = amenities_for_needs(state.get("needs")) or None
+    try:
+        if state.get("user_lat") is not None:
+            facilities = await asyncio.to_thread(
+                nearest_facilities,
+                state["detected_city"],
+                state["user_lat"],
+                state["user_lon"],
+                15,
+                amenities,
+            )
+        else:
+            facilities = []
+        if not facilities:
+            facilities = await asyncio.to_thread(query_facilities, state["detected_city"], amenities)
+    except Exception as e:
+        logger.error(f"Facility lookup failed: {e}")
+        facilities = []
+
+    plan_en = await generate_survival_plan(
         city=state["detected_city"],
         language="en",
         urgency=state["urgency"],
         needs=state["needs"],
         user_message=query,
         local_context=context,
+        facilities=facilities,
+        # English users read this plan as-is → stream it; others get the native one streamed
+        stream_stage="plan" if state.get("detected_language", "en") == "en" else None,
     )
 
+    if cache_key and plan_en != fallback_plan(state["detected_city"]):
+        try:
+            await asyncio.to_thread(plan_cache.put, cache_key, plan_en, query_vector)
+        except Exception as e:
+            logger.warning(f"Plan cache store failed: {e}")
+
     return {
         "survival_plan_en": plan_en,
         "rag_context": context,
+        "service_level": FULL_SERVICE,
         "status_updates": ["Creating your plan..."],
     }
 
-from tools.pdf_generator import generate_pdf   # ← our fixed version
+from tools.pdf_generator import publish_pdf   # ← stored now, rendered on first download
 
 
 async def final_node(state: AgentState) -> dict:
@@ -184,29 +478,36 @@ async def final_node(state: AgentState) -> dict:
     logger.info(f"FINAL_NODE → Language: '{user_lang}' | City: {city} | Session: {session_id}")
 
     # 1. Get the plan in the user's language
+    if state.get("service_level", FULL_SERVICE) == FULL_SERVICE:  # overload plans aren't worth prewarming
+        record_plan_use(city, user_lang, english_plan)
     if user_lang == "en":
         full_plan = english_plan.strip()
     else:
-        full_plan = get_booking_guidance(
+        full_plan = (await get_booking_guidance(
             city=city,
             user_language=user_lang,
             english_survival_plan=english_plan,
-        ).strip()
+            stream_stage="native",
+            # Degraded plan under overload → translate it, don't ask the LLM
+            use_llm=state.get("service_level", FULL_SERVICE) == FULL_SERVICE,
+        )).strip()
 
     # 2. Generate PDF + get the correct public URL path
     pdf_url = None
     try:
-        # This now returns "/downloads/wa_plus919137398912.pdf"
-        relative_pdf_path = generate_pdf(
+        # "/downloads/wa_plus919137398912.pdf" → alias of downloads/plans/<hash>.pdf
+        relative_pdf_path = await publish_pdf(
             content=state["survival_plan_en"],
             city=city,
             session_id=session_id,       # can be phone number with +
         )
         pdf_url = f"{config.PUBLIC_URL}{relative_pdf_path}"
-        logger.info(f"PDF generated successfully → {pdf_url}")
+        logger.info(f"PDF link ready → {pdf_url}")
     except Exception as e:
         logger.error(f"PDF generation failed for {session_id}: {e}", exc_info=True)
 
+    await _remember_session(session_id, last_plan=english_plan, pdf_url=pdf_url)
+
     # 3. Append PDF link at the end (only if generated)
     if pdf_url:
         full_plan += f"\n\nYour Full Survival Guide (PDF with maps):\n{pdf_url}"
@@ -246,25 +547,132 @@ def create_graph():
     workflow.add_node("planner", planner_node)
     workflow.add_node("final", final_node)
 
-    workflow.set_entry_point("greeting")            
+    workflow.set_entry_point("greeting")
 
-   
-    workflow.add_conditional_edges(
-        "greeting",
-        lambda s: bool(s.get("final_response")),
-        {True: END, False: "classifier"}
-    )
+    if config.GRAPH_PARALLEL_BRANCHES:
+        # greeting → (classifier ‖ translator ‖ warmup) → join → planner → final
+        workflow.add_node("warmup", warmup_node)
+        workflow.add_node("join", join_node)
+        workflow.add_conditional_edges(
+            "greeting",
+            lambda s: END if s.get("final_response") else ["classifier", "translator", "warmup"],
+            ["classifier", "translator", "warmup", END],
+        )
+        workflow.add_edge(["classifier", "translator", "warmup"], "join")
+        workflow.add_conditional_edges(
+            "join",
+            lambda s: bool(s.get("final_response")),
+            {True: END, False: "planner"},
+        )
+    else:
+        # greeting → classifier → translator → planner → final
+        workflow.add_conditional_edges(
+            "greeting",
+            lambda s: bool(s.get("final_response")),
+            {True: END, False: "classifier"}
+        )
+        workflow.add_conditional_edges(
+            "classifier",
+            lambda s: bool(s.get("final_response")),
+            {True: END, False: "translator"},
+        )
+        workflow.add_edge("translator", "planner")
 
-    # Rest of your graph stays 100% unchanged
-    workflow.add_edge("classifier", "translator")
-    workflow.add_edge("translator", "planner")
     workflow.add_edge("planner", "final")
     workflow.add_edge("final", END)
 
-    workflow.add_conditional_edges(
-        "classifier",
-        lambda s: bool(s.get("final_response")),
-        {True: END, False: "translator"},
-    )
+    return workflow.compile(checkpointer=_checkpointer or MemorySaver())
 
-    return workflow.compile()
\ No newline at end of file
+
+# Conversation memory — the graph state of each session id, saved after every
+# step. CHECKPOINT_BACKEND=sqlite: one WAL file every worker on the host reads
+# (needs langgraph-checkpoint-sqlite); otherwise per process, and a follow-up
+# landing on another worker falls back to the shared session record.
+_checkpointer = None
+_checkpoint_conn = None
+
+
+async def open_checkpointer():
+    """Startup, before get_graph(): the async SQLite saver is bound to the running loop."""
+    global _checkpointer, _checkpoint_conn
+    if config.CHECKPOINT_BACKEND == "sqlite":
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError:
+            logger.warning("langgraph-checkpoint-sqlite not installed → conversation memory per process")
+        else:
+            _checkpoint_conn = await aiosqlite.connect(str(config.CHECKPOINT_PATH), timeout=30)
+            _checkpointer = AsyncSqliteSaver(_checkpoint_conn)
+            await _checkpointer.setup()
+            logger.info(f"Conversation checkpoints → {config.CHECKPOINT_PATH.name}")
+            return
+    _checkpointer = MemorySaver()
+
+
+_CHECKPOINT_BYTES = "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints WHERE thread_id = ?"
+
+
+async def drop_conversation(session_id: str) -> int:
+    """Maintenance: the session expired → forget its checkpoints; returns bytes freed (sqlite)."""
+    if _checkpoint_conn is None:
+        if isinstance(_checkpointer, MemorySaver):
+            _checkpointer.delete_thread(session_id)  # this worker's copy only
+        return 0
+    async with _checkpointer.lock:
+        async with _checkpoint_conn.execute(_CHECKPOINT_BYTES, (session_id,)) as cur:
+            (freed,) = await cur.fetchone()
+        await _checkpoint_conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (session_id,))
+        await _checkpoint_conn.execute("DELETE FROM writes WHERE thread_id = ?", (session_id,))
+        await _checkpoint_conn.commit()
+    return freed
+
+
+async def trim_conversations(session_ids: List[str]) -> Tuple[int, int]:
+    """
+    Maintenance: keep only the latest checkpoint of each thread (we never go
+    back in time); returns (threads trimmed, bytes freed). Checkpoint ids
+    sort in creation order.
+    """
+    if _checkpoint_conn is None or not session_ids:
+        return 0, 0
+    threads = freed = 0
+    async with _checkpointer.lock:
+        for session_id in session_ids:
+            async with _checkpoint_conn.execute(_CHECKPOINT_BYTES, (session_id,)) as cur:
+                (before,) = await cur.fetchone()
+            latest = "(SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ?)"
+            await _checkpoint_conn.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_id < {latest}", (session_id, session_id)
+            )
+            cur = await _checkpoint_conn.execute(
+                f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id < {latest}", (session_id, session_id)
+            )
+            if cur.rowcount > 0:
+                async with _checkpoint_conn.execute(_CHECKPOINT_BYTES, (session_id,)) as after:
+                    freed += before - (await after.fetchone())[0]
+                threads += 1
+        await _checkpoint_conn.commit()
+    return threads, freed
+
+
+async def close_checkpointer():
+    global _checkpoint_conn
+    if _checkpoint_conn is not None:
+        await _checkpoint_conn.close()
+        _checkpoint_conn = None
+
+
+# One compiled graph per process, shared by the web, WhatsApp and socket entry points
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """Compile the workflow on first use and hand out the same instance afterwards."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = create_graph()
+    return _graph
\ No newline at end of file
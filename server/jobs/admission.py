@@ -0,0 +1,93 @@
+# backend/jobs/admission.py — urgency-aware admission control + load shedding
+#
+# Load = backlog per LLM slot: (LLM calls waiting for a slot + graph jobs
+# waiting in the queue) / LLM_MAX_CONCURRENCY. As it grows, medium/low
+# messages are answered with cheaper and cheaper plans:
+#
+#   full      → LLM plan + native-language LLM answer (normal)
+#   cached    → no LLM: last cached plan for the city/urgency/needs, else ↓
+#   template  → no LLM: plan filled in from the structured facility records, else ↓
+#   fallback  → static fallback plan (pre-translated at startup)
+#
+# critical/high always get the full service; the job queue and the LLM gate
+# already run them ahead of everything else. Past the shed level, new
+# medium/low messages are turned away at the door with a "busy" reply, and
+# the last ADMISSION_RESERVED_QUEUE share of the queue is kept for critical/high.
+import time
+from collections import Counter
+from typing import Callable
+
+from jobs.base import JobQueue
+
+FULL_SERVICE, CACHED, TEMPLATE, FALLBACK = "full", "cached", "template", "fallback"
+PROTECTED = {"critical", "high"}
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        queue: JobQueue,
+        llm_load: Callable[[], dict],
+        cached_at: float,
+        template_at: float,
+        fallback_at: float,
+        shed_at: float,
+        reserved_queue: float,
+    ):
+        self.queue = queue
+        self.llm_load = llm_load
+        self.cached_at = cached_at
+        self.template_at = template_at
+        self.fallback_at = fallback_at
+        self.shed_at = shed_at
+        self.reserved_queue = reserved_queue
+        self.admitted: Counter = Counter()
+        self.shed: Counter = Counter()
+        self.stages: Counter = Counter()
+        self._pressure = (0.0, 0.0)  # (computed_at, value)
+
+    def pressure(self) -> float:
+        """Backlog per LLM slot, recomputed at most every 100 ms (sqlite depth is a query)."""
+        computed_at, value = self._pressure
+        now = time.monotonic()
+        if now - computed_at > 0.1:
+            load = self.llm_load()
+            value = (load["waiting"] + self.queue.depth()) / max(load["capacity"], 1)
+            self._pressure = (now, value)
+        return value
+
+    def admit(self, urgency: str) -> bool:
+        """Entry point check — False → reply "busy" instead of queueing."""
+        if urgency not in PROTECTED:
+            reserved = self.queue.depth() >= self.queue.max_pending * (1 - self.reserved_queue)
+            if reserved or self.pressure() >= self.shed_at:
+                self.shed[urgency] += 1
+                return False
+        self.admitted[urgency] += 1
+        return True
+
+    def stage(self, urgency: str) -> str:
+        """How much work this message's plan may cost right now."""
+        if urgency in PROTECTED:
+            stage = FULL_SERVICE
+        else:
+            load = self.pressure()
+            if load >= self.fallback_at:
+                stage = FALLBACK
+            elif load >= self.template_at:
+                stage = TEMPLATE
+            elif load >= self.cached_at:
+                stage = CACHED
+            else:
+                stage = FULL_SERVICE
+        self.stages[f"{urgency}:{stage}"] += 1
+        return stage
+
+    def stats(self) -> dict:
+        return {
+            "pressure": round(self.pressure(), 2),
+            "llm": self.llm_load(),
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "stages": dict(self.stages),
+        }
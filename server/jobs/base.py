@@ -0,0 +1,123 @@
+# backend/jobs/base.py — what every job queue backend agrees on
+#
+# A job is one unit of graph work (a web message, a WhatsApp message) under a
+# key — the session or phone number. Jobs of different keys run in parallel;
+# jobs of one key run one at a time, oldest first, so a user's answers never
+# overtake each other. Among keys, the most urgent waiting job goes first.
+#
+# put() never waits: it says "accepted", "duplicate" (same job id seen
+# recently — e.g. a Twilio retry) or "full" (backpressure).
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+ACCEPTED, DUPLICATE, FULL = "accepted", "duplicate", "full"
+DONE, DEAD = "done", "dead"
+RETRYING, LOST = "retrying", "lost"  # fail() outcomes besides DEAD
+
+# Lower runs first
+PRIORITY = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+def priority_for(urgency: str) -> int:
+    return PRIORITY.get(urgency, PRIORITY["medium"])
+
+
+class Job(NamedTuple):
+    id: str
+    kind: str                    # which handler runs it — see jobs/worker.py
+    key: str                     # ordering key: session id / phone number
+    payload: Dict[str, Any]
+    priority: int
+    attempts: int                # runs started so far, including the current one
+    enqueued_at: float
+
+
+class _Latencies:
+    """Last N samples (seconds) → avg / p95 in milliseconds."""
+
+    def __init__(self, size: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        if not self._samples:
+            return {"avg_ms": 0.0, "p95_ms": 0.0}
+        ordered = sorted(self._samples)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        }
+
+
+class JobQueue:
+    """Interface shared by MemoryJobQueue and SqliteJobQueue."""
+
+    lease_seconds = 0.0  # 0 → a claimed job holds no lease, nothing to renew
+    blocking = False     # True → complete / fail / renew / checkpoint write to disk: call them via asyncio.to_thread
+
+    def __init__(self, name: str, max_attempts: int, retry_backoff_seconds: float):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+    def put(self, kind: str, key: str, payload: Dict[str, Any], priority: int = PRIORITY["medium"], job_id: str = "") -> str:
+        raise NotImplementedError
+
+    async def claim(self, timeout: float = 1.0) -> Optional[Job]:
+        """Next runnable job (its key is then busy until complete/fail), or None after `timeout`."""
+        raise NotImplementedError
+
+    def renew(self, job: Job) -> bool:
+        """Extend the lease of a running job; False → it was lost (the job runs elsewhere now)."""
+        return True
+
+    def checkpoint(self, job: Job, progress: Dict[str, Any]) -> bool:
+        """
+        Merge `progress` into the running job's payload, so a retry resumes
+        instead of redoing side effects; False → it was lost (the job runs elsewhere now).
+        """
+        job.payload.update(progress)  # in-process: the retry re-queues this very payload
+        return True
+
+    def complete(self, job: Job, result: Optional[Dict[str, Any]] = None) -> None:
+        raise NotImplementedError
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> str:
+        """
+        Record a failed run: RETRYING (queued again after a backoff), DEAD (given
+        up — the caller owes the user an apology) or LOST (this run no longer
+        held the job; whoever took it over decides).
+        """
+        raise NotImplementedError
+
+    def take_expired(self) -> List[Job]:
+        """Jobs given up since the last call because their final lease ran out (worker died)."""
+        return []
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """{"status": "done" | "dead", "result": ..., "error": ...} once finished, else None."""
+        raise NotImplementedError
+
+    def depth(self) -> int:
+        """Jobs waiting to run."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+    def backoff(self, attempts: int) -> float:
+        return self.retry_backoff_seconds * (2 ** (attempts - 1))
+
+    async def wait_result(self, job_id: str, timeout: float, poll_seconds: float = 0.25) -> Optional[Dict[str, Any]]:
+        """Poll until the job finished (on any worker, in any process) or `timeout` passed."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            outcome = await asyncio.to_thread(self.result, job_id)
+            if outcome is not None:
+                return outcome
+            await asyncio.sleep(poll_seconds)
+        return None
@@ -0,0 +1,164 @@
+# backend/jobs/memory.py — in-process job queue (default; lost on restart)
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from jobs.base import ACCEPTED, DEAD, DONE, DUPLICATE, FULL, PRIORITY, RETRYING, Job, JobQueue, _Latencies
+
+
+class MemoryJobQueue(JobQueue):
+    def __init__(
+        self,
+        name: str,
+        max_pending: int,
+        max_pending_per_key: int,
+        dedupe_ttl_seconds: float,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 2.0,
+        dedupe_max_ids: int = 100_000,
+        max_results: int = 1000,
+    ):
+        super().__init__(name, max_attempts, retry_backoff_seconds)
+        self.max_pending = max_pending
+        self.max_pending_per_key = max_pending_per_key
+        self.dedupe_ttl_seconds = dedupe_ttl_seconds
+        self.dedupe_max_ids = dedupe_max_ids
+        self.max_results = max_results
+
+        self._pending: Dict[str, Deque[Tuple[int, Job]]] = {}  # key → (seq, job), oldest first
+        self._ready: List[Tuple[int, int, str]] = []           # heap of (priority, seq, key) — head job of an idle key
+        self._busy: set = set()                                # keys running a job or backing off
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # job id → first seen
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.accepted = self.duplicates = self.rejected = 0
+        self.done = self.retried = self.dead = 0
+        self._wait = _Latencies()
+        self._run = _Latencies()
+        self._started: Dict[str, float] = {}
+
+    # ---- producer side ----------------------------------------------------
+
+    def _seen_recently(self, job_id: str) -> bool:
+        cutoff = time.time() - self.dedupe_ttl_seconds
+        while self._seen and next(iter(self._seen.values())) < cutoff:
+            self._seen.popitem(last=False)
+        return job_id in self._seen
+
+    def _remember(self, job_id: str) -> None:
+        self._seen[job_id] = time.time()
+        while len(self._seen) > self.dedupe_max_ids:
+            self._seen.popitem(last=False)
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+    def put(self, kind: str, key: str, payload: Dict[str, Any], priority: int = PRIORITY["medium"], job_id: str = "") -> str:
+        if job_id and self._seen_recently(job_id):
+            self.duplicates += 1
+            return DUPLICATE
+        queue = self._pending.get(key)
+        if self.depth() >= self.max_pending or (queue and len(queue) >= self.max_pending_per_key):
+            self.rejected += 1
+            return FULL
+        if job_id:
+            self._remember(job_id)
+
+        job = Job(job_id or uuid.uuid4().hex, kind, key, payload, priority, 0, time.time())
+        if queue is None:
+            queue = self._pending[key] = deque()
+        queue.append((next(self._seq), job))
+        self.accepted += 1
+        if key not in self._busy and len(queue) == 1:
+            self._mark_ready(key)
+        return ACCEPTED
+
+    def _mark_ready(self, key: str) -> None:
+        seq, job = self._pending[key][0]
+        heapq.heappush(self._ready, (job.priority, seq, key))
+        self._wakeup.set()
+
+    def _release(self, key: str) -> None:
+        self._busy.discard(key)
+        if self._pending.get(key):
+            self._mark_ready(key)  # next job of the same key, behind more urgent keys
+        else:
+            self._pending.pop(key, None)
+
+    # ---- worker side --------------------------------------------------------
+
+    async def claim(self, timeout: float = 1.0) -> Optional[Job]:
+        deadline = time.time() + timeout
+        while True:
+            while self._ready:
+                _, _, key = heapq.heappop(self._ready)
+                queue = self._pending.get(key)
+                if not queue or key in self._busy:
+                    continue
+                _, job = queue.popleft()
+                job = job._replace(attempts=job.attempts + 1)
+                self._busy.add(key)
+                self._wait.add(time.time() - job.enqueued_at)
+                self._started[job.id] = time.time()
+                return job
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict[str, Any]] = None, error: str = "") -> None:
+        self._run.add(time.time() - self._started.pop(job.id, time.time()))
+        self._results[job.id] = {"status": status, "result": result, "error": error}
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def complete(self, job: Job, result: Optional[Dict[str, Any]] = None) -> None:
+        self.done += 1
+        self._finish(job, DONE, result)
+        self._release(job.key)
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> str:
+        if retry and job.attempts < self.max_attempts:
+            # Back to the front of its key — later messages of that user keep waiting behind it
+            self.retried += 1
+            self._run.add(time.time() - self._started.pop(job.id, time.time()))
+            self._pending.setdefault(job.key, deque()).appendleft((next(self._seq), job))
+            asyncio.get_running_loop().call_later(self.backoff(job.attempts), self._release, job.key)
+            return RETRYING
+        self.dead += 1
+        self._finish(job, DEAD, error=error)
+        self._release(job.key)
+        return DEAD
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._results.get(job_id)
+
+    def stats(self) -> dict:
+        by_priority = {name: 0 for name in PRIORITY}
+        names = {rank: name for name, rank in PRIORITY.items()}
+        for queue in self._pending.values():
+            for _, job in queue:
+                by_priority[names.get(job.priority, "medium")] += 1
+        return {
+            "backend": "memory",
+            "depth": sum(by_priority.values()),
+            "depth_by_priority": by_priority,
+            "running": len(self._started),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "done": self.done,
+            "retried": self.retried,
+            "dead": self.dead,
+            "wait": self._wait.summary(),
+            "run": self._run.summary(),
+        }
@@ -0,0 +1,51 @@
+# backend/jobs/queue.py — the process-wide job queue, picked by JOB_QUEUE_BACKEND
+#
+#   memory → in-process, lost on restart (default; workers run inside the web app)
+#   sqlite → JOB_QUEUE_PATH, survives restarts, shared with `python -m jobs.worker`
+from typing import Any, Dict
+
+from config import config
+from agents.llm import llm_load
+from agents.matcher import analyze_message
+from jobs.admission import AdmissionController
+from jobs.base import FULL, JobQueue, priority_for
+from jobs.memory import MemoryJobQueue
+from jobs.sqlite import SqliteJobQueue
+from jobs.worker import WorkerPool
+
+
+def _make_queue() -> JobQueue:
+    common = dict(
+        max_pending=config.JOB_QUEUE_MAX_PENDING,
+        max_pending_per_key=config.JOB_QUEUE_MAX_PER_KEY,
+        dedupe_ttl_seconds=config.JOB_DEDUPE_TTL_SECONDS,
+        max_attempts=config.JOB_MAX_ATTEMPTS,
+        retry_backoff_seconds=config.JOB_RETRY_BACKOFF_SECONDS,
+    )
+    if config.JOB_QUEUE_BACKEND == "sqlite":
+        return SqliteJobQueue("graph_jobs", config.JOB_QUEUE_PATH, lease_seconds=config.JOB_LEASE_SECONDS, **common)
+    return MemoryJobQueue("graph_jobs", **common)
+
+
+job_queue = _make_queue()
+worker_pool = WorkerPool(job_queue, config.JOB_WORKERS)
+admission = AdmissionController(
+    job_queue,
+    llm_load,
+    cached_at=config.ADMISSION_CACHED_AT,
+    template_at=config.ADMISSION_TEMPLATE_AT,
+    fallback_at=config.ADMISSION_FALLBACK_AT,
+    shed_at=config.ADMISSION_SHED_AT,
+    reserved_queue=config.ADMISSION_RESERVED_QUEUE,
+)
+
+
+def submit_message(kind: str, key: str, message: str, payload: Dict[str, Any], job_id: str = "") -> str:
+    """
+    Queue graph work for one user message, ordered by the keyword matcher's
+    urgency. FULL when the queue is full or the message was shed under overload.
+    """
+    urgency = analyze_message(message).urgency
+    if not admission.admit(urgency):
+        return FULL
+    return job_queue.put(kind, key, {"message": message, **payload}, priority=priority_for(urgency), job_id=job_id)
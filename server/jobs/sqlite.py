@@ -0,0 +1,286 @@
+# backend/jobs/sqlite.py — durable job queue in a local SQLite (WAL) file
+#
+# Survives restarts and is shared by every process on the host, so the web
+# app can only enqueue while `python -m jobs.worker` processes do the work.
+# A claimed job holds a lease, renewed by its worker while the handler runs;
+# if the worker dies, the lease runs out and the job is picked up again
+# (counted as another attempt). Only the run that still holds the lease — same
+# attempt number — may complete or fail it. Finished rows stay for
+# dedupe_ttl_seconds so retried webhooks are still recognised as duplicates.
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from jobs.base import ACCEPTED, DEAD, DONE, DUPLICATE, FULL, LOST, PRIORITY, RETRYING, Job, JobQueue, _Latencies
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING = "queued", "running"
+
+
+class SqliteJobQueue(JobQueue):
+    def __init__(
+        self,
+        name: str,
+        db_path: Path,
+        max_pending: int,
+        max_pending_per_key: int,
+        dedupe_ttl_seconds: float,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 2.0,
+        lease_seconds: float = 300.0,
+        poll_seconds: float = 0.2,
+    ):
+        super().__init__(name, max_attempts, retry_backoff_seconds)
+        self.max_pending = max_pending
+        self.max_pending_per_key = max_pending_per_key
+        self.dedupe_ttl_seconds = dedupe_ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.blocking = True
+        self.poll_seconds = poll_seconds
+        self._expired: List[Job] = []  # dead by lease expiry, give_up not yet called
+        self.duplicates = self.rejected = 0  # this process only; everything else is read from the table
+        self._puts = 0
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {name} (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                started_at REAL,
+                lease_until REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            )
+            """
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_status ON {name} (status, priority, seq)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_key ON {name} (key, status)")
+
+    # ---- producer side ----------------------------------------------------
+
+    def put(self, kind: str, key: str, payload: Dict[str, Any], priority: int = PRIORITY["medium"], job_id: str = "") -> str:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if job_id and self._conn.execute(f"SELECT 1 FROM {self.name} WHERE id = ?", (job_id,)).fetchone():
+                    self._conn.execute("COMMIT")
+                    self.duplicates += 1
+                    return DUPLICATE
+                (total,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM {self.name} WHERE status = ?", (QUEUED,)
+                ).fetchone()
+                (for_key,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM {self.name} WHERE status = ? AND key = ?", (QUEUED, key)
+                ).fetchone()
+                if total >= self.max_pending or for_key >= self.max_pending_per_key:
+                    self._conn.execute("COMMIT")
+                    self.rejected += 1
+                    return FULL
+                self._conn.execute(
+                    f"INSERT INTO {self.name} (id, kind, key, payload, priority, status, enqueued_at, available_at) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id or uuid.uuid4().hex, kind, key, json.dumps(payload, ensure_ascii=False), priority, QUEUED, now, now),
+                )
+                self._puts += 1
+                if self._puts % 100 == 0:
+                    self._purge(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ACCEPTED
+
+    def _purge(self, now: float) -> None:
+        """Finished rows past the dedupe window are no longer needed."""
+        cur = self._conn.execute(
+            f"DELETE FROM {self.name} WHERE status IN (?, ?) AND finished_at < ?",
+            (DONE, DEAD, now - self.dedupe_ttl_seconds),
+        )
+        if cur.rowcount > 0:
+            logger.info(f"Job queue {self.name} → purged {cur.rowcount} finished jobs")
+
+    # ---- worker side --------------------------------------------------------
+
+    def _claim_one(self) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Leases of workers that died mid-job run out → the job is runnable again,
+                # unless that was its last attempt: then it is dead and its give_up is owed
+                expired = self._conn.execute(
+                    f"SELECT seq, id, kind, key, payload, priority, attempts, enqueued_at FROM {self.name} "
+                    f"WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (RUNNING, now, self.max_attempts),
+                ).fetchall()
+                for seq, job_id, kind, key, payload, priority, attempts, enqueued_at in expired:
+                    self._conn.execute(
+                        f"UPDATE {self.name} SET status = ?, finished_at = ?, lease_until = NULL, error = 'lease expired' "
+                        f"WHERE seq = ?",
+                        (DEAD, now, seq),
+                    )
+                    self._expired.append(Job(job_id, kind, key, json.loads(payload), priority, attempts, enqueued_at))
+                self._conn.execute(
+                    f"UPDATE {self.name} SET status = ?, available_at = ? WHERE status = ? AND lease_until < ?",
+                    (QUEUED, now, RUNNING, now),
+                )
+                # Oldest queued job of each idle key; the most urgent of those wins
+                row = self._conn.execute(
+                    f"""
+                    SELECT seq, id, kind, key, payload, priority, attempts, enqueued_at FROM {self.name} AS j
+                    WHERE status = ? AND available_at <= ?
+                      AND NOT EXISTS (SELECT 1 FROM {self.name} r WHERE r.key = j.key AND r.status = ?)
+                      AND NOT EXISTS (SELECT 1 FROM {self.name} e WHERE e.key = j.key AND e.status = ? AND e.seq < j.seq)
+                    ORDER BY priority, seq LIMIT 1
+                    """,
+                    (QUEUED, now, RUNNING, QUEUED),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                seq, job_id, kind, key, payload, priority, attempts, enqueued_at = row
+                self._conn.execute(
+                    f"UPDATE {self.name} SET status = ?, attempts = attempts + 1, started_at = ?, lease_until = ? WHERE seq = ?",
+                    (RUNNING, now, now + self.lease_seconds, seq),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(job_id, kind, key, json.loads(payload), priority, attempts + 1, enqueued_at)
+
+    def take_expired(self) -> List[Job]:
+        with self._lock:
+            expired, self._expired = self._expired, []
+        return expired
+
+    async def claim(self, timeout: float = 1.0) -> Optional[Job]:
+        deadline = time.time() + timeout
+        while True:
+            job = await asyncio.to_thread(self._claim_one)
+            if job is not None or self._expired or time.time() >= deadline:  # expired → give_up now
+                return job
+            await asyncio.sleep(self.poll_seconds)
+
+    # Every write below is conditional on `attempts` still being this run's:
+    # once the lease ran out and another worker took the job, a late result is dropped.
+    _OURS = "id = ? AND attempts = ? AND status IN ('queued', 'running')"
+
+    def renew(self, job: Job) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE {self.name} SET status = ?, lease_until = ? WHERE {self._OURS}",
+                (RUNNING, time.time() + self.lease_seconds, job.id, job.attempts),
+            )
+        return cur.rowcount == 1
+
+    def checkpoint(self, job: Job, progress: Dict[str, Any]) -> bool:
+        job.payload.update(progress)
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE {self.name} SET payload = ? WHERE {self._OURS}",
+                (json.dumps(job.payload, ensure_ascii=False), job.id, job.attempts),
+            )
+        return cur.rowcount == 1
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict[str, Any]], error: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE {self.name} SET status = ?, finished_at = ?, lease_until = NULL, result = ?, error = ? WHERE {self._OURS}",
+                (status, time.time(), json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 job.id, job.attempts),
+            )
+        if cur.rowcount != 1:
+            logger.warning(f"{job.kind} job for {job.key[:12]} lost its lease → {status} result dropped")
+            return False
+        return True
+
+    def complete(self, job: Job, result: Optional[Dict[str, Any]] = None) -> None:
+        self._finish(job, DONE, result, "")
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> str:
+        if not retry or job.attempts >= self.max_attempts:
+            return DEAD if self._finish(job, DEAD, None, error) else LOST
+        # Stays the oldest job of its key, so the user's later messages keep waiting behind it
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE {self.name} SET status = ?, available_at = ?, lease_until = NULL, error = ? WHERE {self._OURS}",
+                (QUEUED, time.time() + self.backoff(job.attempts), error, job.id, job.attempts),
+            )
+        if cur.rowcount != 1:
+            logger.warning(f"{job.kind} job for {job.key[:12]} lost its lease → retry not queued by this run")
+            return LOST
+        return RETRYING
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT status, result, error FROM {self.name} WHERE id = ? AND status IN (?, ?)",
+                (job_id, DONE, DEAD),
+            ).fetchone()
+        if row is None:
+            return None
+        status, result, error = row
+        return {"status": status, "result": json.loads(result) if result else None, "error": error or ""}
+
+    def depth(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.name} WHERE status = ?", (QUEUED,)).fetchone()
+        return count
+
+    def stats(self) -> dict:
+        names = {rank: name for name, rank in PRIORITY.items()}
+        with self._lock:
+            depth = self._conn.execute(
+                f"SELECT priority, COUNT(*) FROM {self.name} WHERE status = ? GROUP BY priority", (QUEUED,)
+            ).fetchall()
+            counts = dict(self._conn.execute(f"SELECT status, COUNT(*) FROM {self.name} GROUP BY status").fetchall())
+            (retried,) = self._conn.execute(
+                f"SELECT COALESCE(SUM(attempts - 1), 0) FROM {self.name} WHERE attempts > 1"
+            ).fetchone()
+            recent = self._conn.execute(
+                f"SELECT started_at - enqueued_at, finished_at - started_at FROM {self.name} "
+                f"WHERE status = ? ORDER BY finished_at DESC LIMIT 1000",
+                (DONE,),
+            ).fetchall()
+        by_priority = {name: 0 for name in PRIORITY}
+        for priority, count in depth:
+            by_priority[names.get(priority, "medium")] += count
+        wait, run = _Latencies(), _Latencies()
+        for waited, ran in recent:
+            wait.add(waited)
+            run.add(ran)
+        return {
+            "backend": "sqlite",
+            "depth": sum(by_priority.values()),
+            "depth_by_priority": by_priority,
+            "running": counts.get(RUNNING, 0),
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "done": counts.get(DONE, 0),
+            "retried": retried,
+            "dead": counts.get(DEAD, 0),
+            "wait": wait.summary(),
+            "run": run.summary(),
+        }
@@ -0,0 +1,146 @@
+# backend/jobs/worker.py — runs queued graph jobs
+#
+# In the web process (JOB_WORKERS > 0) a WorkerPool is started by the app
+# lifespan. For a separate worker process, point the web app and the worker at
+# the same SQLite queue and set JOB_WORKERS=0 in the web app:
+#
+#   cd server
+#   JOB_QUEUE_BACKEND=sqlite python -m jobs.worker --concurrency 8
+import argparse
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from agents.llm import set_llm_priority
+from jobs.base import DEAD, RETRYING, Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class Handler(NamedTuple):
+    run: Callable[[Job], Awaitable[Optional[dict]]]       # → result stored with the job
+    give_up: Callable[[Job, str], Awaitable[None]]        # after the last failed attempt
+
+
+HANDLERS: Dict[str, Handler] = {}
+
+
+def register_handler(kind: str, run, give_up) -> None:
+    HANDLERS[kind] = Handler(run, give_up)
+
+
+class WorkerPool:
+    def __init__(self, queue: JobQueue, concurrency: int):
+        self.queue = queue
+        self.concurrency = concurrency
+        self._tasks: List[asyncio.Task] = []
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Keep renewing the job's lease while its handler runs (a third of the lease apart)."""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.renew, job):
+                logger.warning(f"{job.kind} job for {job.key[:12]} lost its lease → result will be dropped")
+                return
+
+    async def _queue_call(self, method, *args):
+        """Queue bookkeeping — off the event loop when it writes to disk."""
+        if self.queue.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _give_up(self, job: Job, error: str) -> None:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            return
+        try:
+            await handler.give_up(job, error)
+        except Exception as e:
+            logger.error(f"give_up for {job.kind} failed: {e}")
+
+    async def _run_one(self, job: Job) -> None:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            logger.error(f"No handler for job kind {job.kind!r} → dropped")
+            await self._queue_call(self.queue.fail, job, "no handler", False)
+            return
+        set_llm_priority(job.priority)  # LLM calls of this job wait in line by urgency
+        heartbeat = asyncio.create_task(self._heartbeat(job)) if self.queue.lease_seconds else None
+        try:
+            result = await handler.run(job)
+            await self._queue_call(self.queue.complete, job, result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            outcome = await self._queue_call(self.queue.fail, job, str(e))
+            if outcome == RETRYING:
+                logger.warning(f"{job.kind} job for {job.key[:12]} failed (attempt {job.attempts}) → retrying: {e}")
+            elif outcome == DEAD:
+                logger.error(f"{job.kind} job for {job.key[:12]} failed {job.attempts}x → giving up: {e}")
+                await self._give_up(job, str(e))
+        finally:
+            if heartbeat:
+                heartbeat.cancel()
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.claim(timeout=5.0)
+            # Whoever notices a dead worker's last attempt expiring tells the user
+            for expired in self.queue.take_expired():
+                logger.error(f"{expired.kind} job for {expired.key[:12]} lease expired {expired.attempts}x → giving up")
+                await self._give_up(expired, "lease expired")
+            if job is not None:
+                await self._run_one(job)
+
+    async def start(self):
+        if not self._tasks and self.concurrency > 0:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+            logger.info(f"Job queue {self.queue.name} → {self.concurrency} workers started")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+async def _serve(concurrency: int, stats_every: float):
+    from jobs.queue import job_queue
+    from graph import close_checkpointer, get_graph, open_checkpointer
+    import tools.whatsapp  # noqa: F401 — registers the WhatsApp handler
+    import web.sockets  # noqa: F401 — registers the web handler
+
+    await open_checkpointer()
+    get_graph()
+    pool = WorkerPool(job_queue, concurrency)
+    await pool.start()
+    try:
+        while True:
+            await asyncio.sleep(stats_every)
+            logger.info(f"Job queue stats: {job_queue.stats()}")
+    finally:
+        await pool.stop()
+        await close_checkpointer()
+
+
+def main():
+    from config import config
+
+    parser = argparse.ArgumentParser(description="Run queued graph jobs")
+    parser.add_argument("--concurrency", type=int, default=max(config.JOB_WORKERS, 1))
+    parser.add_argument("--stats-every", type=float, default=60.0, help="seconds between stats log lines")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if config.JOB_QUEUE_BACKEND != "sqlite":
+        raise SystemExit("A separate worker needs a shared queue: set JOB_QUEUE_BACKEND=sqlite")
+    started = time.time()
+    try:
+        asyncio.run(_serve(args.concurrency, args.stats_every))
+    except KeyboardInterrupt:
+        logger.info(f"Worker stopped after {time.time() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
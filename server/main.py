@@ -1,19 +1,63 @@
 # backend/main.py
+import asyncio
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse
 
 from config import config
-from graph import create_graph
+from graph import close_checkpointer, get_graph, open_checkpointer, pretranslate_fixed_strings
+from agents.booking_helper import booking_cache, prewarm_loop as prewarm_native_plans
+from agents.planner import plan_cache
+from agents.translator import translation_cache
+from rag.retrieve import vectorstore_cache_stats, embedding_cache_stats
+from tools.osm_utils import prewarm_loop
+from tools.session_store import session_store
+from tools.maintenance import maintenance_loop, maintenance_stats
+from tools.pdf_generator import PLANS_DIR, ensure_pdf, pdf_stats, resolve_download, shutdown_pdf_pool
+from jobs.queue import admission, job_queue, worker_pool
 from tools.whatsapp import router as whatsapp_router
 from web.routes import router as web_router           # ← Clean WebSocket routes
 from auth.routes import router as auth_router         # ← JWT + Google login
+from auth.store import seed_admin
 
 # Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("refugee-agent")
 
+
+# Background jobs live as long as the app
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile the shared LangGraph once per worker, before the first request
+    try:
+        await open_checkpointer()
+        get_graph()
+        logger.info("LangGraph workflow loaded successfully")
+    except Exception as e:
+        logger.critical(f"Failed to initialize LangGraph: {e}")
+        raise
+
+    await asyncio.to_thread(seed_admin)  # bcrypt hash + a disk write → not at import
+    await worker_pool.start()  # web + WhatsApp messages run as queued jobs
+    if config.JOB_WORKERS == 0 and config.JOB_QUEUE_BACKEND != "sqlite":
+        logger.warning("JOB_WORKERS=0 with an in-memory queue → no one will run jobs")
+    background = [
+        asyncio.create_task(prewarm_loop()),   # keeps busy cities' OSM cache warm
+        asyncio.create_task(prewarm_native_plans()),  # off-peak: native plans for busy city/language pairs
+        asyncio.create_task(pretranslate_fixed_strings()),  # city question + fallback plan, every language
+        asyncio.create_task(maintenance_loop()),  # expires old PDFs, indexes, OSM files, conversations
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await worker_pool.stop()
+    await close_checkpointer()
+    shutdown_pdf_pool()
+
+
 # FastAPI App
 app = FastAPI(
     title="Refugee First – 72-Hour Survival Agent",
@@ -21,6 +65,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if config.DEBUG else None,
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 # CORS — dev: allow all, prod: only your real frontend
@@ -36,27 +81,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Serve generated PDFs
-app.mount(
-    "/downloads",
-    StaticFiles(directory=str(config.PDF_OUTPUT_PATH)),
-    name="pdfs"
-)
+# Serve PDFs — rendered on the first download, plain file after that
+@app.get("/downloads/{filename:path}")
+async def download_pdf(filename: str):
+    path, digest = resolve_download(filename)
+    if digest:
+        try:
+            path = await ensure_pdf(digest)
+        except Exception as e:
+            logger.error(f"PDF render failed for {digest}: {e}", exc_info=True)
+            raise HTTPException(status_code=503, detail="PDF not available right now, try again shortly")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    # plans/<hash>.pdf never changes; a session alias moves to the newest plan
+    cache = "public, max-age=31536000, immutable" if filename.startswith(f"{PLANS_DIR}/") else "no-cache"
+    return FileResponse(path, media_type="application/pdf", headers={"Cache-Control": cache})
 
 # === ROUTES ===
 app.include_router(auth_router)        # /auth/login, /auth/signup, /auth/login/google
 app.include_router(whatsapp_router, prefix="/whatsapp")  # Twilio webhook
 app.include_router(web_router)         # /ws/{session_id} ← clean WebSocket
 
-# Load LangGraph once at startup
-try:
-    graph = create_graph()
-    logger.info("LangGraph workflow loaded successfully")
-except Exception as e:
-    logger.critical(f"Failed to initialize LangGraph: {e}")
-    raise
-
-
 # Health check + beautiful root
 @app.get("/")
 async def root():
@@ -80,6 +125,23 @@ async def root():
     }
 
 
+# Cache / load counters for dashboards
+@app.get("/metrics")
+async def metrics():
+    return {
+        "vectorstore_cache": vectorstore_cache_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "plan_cache": plan_cache.stats(),
+        "booking_cache": booking_cache.stats(),
+        "translation_cache": translation_cache.stats(),
+        "jobs": job_queue.stats(),
+        "admission": admission.stats(),
+        "pdf": pdf_stats(),
+        "sessions": session_store.stats(),
+        "maintenance": maintenance_stats(),
+    }
+
+
 # Run server
 if __name__ == "__main__":
     import uvicorn
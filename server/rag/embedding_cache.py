@@ -0,0 +1,125 @@
+# backend/rag/embedding_cache.py
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_SQLITE_MAX_VARS = 500  # stay well under SQLite's bound-parameter limit
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain embedding model with a persistent SQLite cache
+    keyed by (model name, sha256 of text). Only misses go to the real
+    model, deduplicated and in batches. Shared by every worker on the host.
+    `factory` builds the real model lazily, on the first miss.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], model_name: str, db_path: Path, batch_size: int = 100):
+        self._factory = factory
+        self._underlying: Optional[Embeddings] = None
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.hits = self.misses = 0
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    @property
+    def underlying(self) -> Embeddings:
+        if self._underlying is None:
+            with self._lock:
+                if self._underlying is None:
+                    self._underlying = self._factory()
+        return self._underlying
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(hashes), _SQLITE_MAX_VARS):
+                batch = hashes[i:i + _SQLITE_MAX_VARS]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, model: str, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items.items()],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self._hash(t) for t in texts]
+        cached = self._lookup(self.model_name, list(set(hashes)))
+
+        # Dedupe misses, then embed them in batches
+        missing: Dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached:
+                missing.setdefault(text_hash, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            miss_hashes = list(missing)
+            for i in range(0, len(miss_hashes), self.batch_size):
+                batch = miss_hashes[i:i + self.batch_size]
+                vectors = self.underlying.embed_documents([missing[h] for h in batch])
+                fresh = dict(zip(batch, vectors))
+                self._store(self.model_name, fresh)
+                cached.update(fresh)
+            logger.info(f"Embeddings → {len(texts) - len(missing)} cached, {len(missing)} embedded")
+
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Query embeddings use a different task type than documents → separate key space
+        model = f"{self.model_name}:query"
+        text_hash = self._hash(text)
+        cached = self._lookup(model, [text_hash])
+        if text_hash in cached:
+            self.hits += 1
+            return cached[text_hash]
+        self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self._store(model, {text_hash: vector})
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
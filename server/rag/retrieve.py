@@ -1,110 +1,308 @@
 # backend/rag/retrieve.py
+import hashlib
+import re
 import shutil
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import logging
 from langchain_core.documents import Document
-from langchain.schema import Document
-from langchain_google_vertexai import VertexAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from config import config
+from rag.embedding_cache import CachedEmbeddings
+from tools.artifact_index import CITY_INDEX, SESSION_INDEX, touch_quietly
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
 
 logger = logging.getLogger(__name__)
 
-# Shared embedding model (reused across requests)
-embeddings = VertexAIEmbeddings(
+
+def _vertex_embeddings():
+    from langchain_google_vertexai import VertexAIEmbeddings
+    return VertexAIEmbeddings(
+        model_name=config.VERTEX_AI_EMBEDDING_MODEL,
+        project=config.VERTEX_AI_PROJECT,
+        location=config.VERTEX_AI_LOCATION,
+    )
+
+
+# Shared embedding model (reused across requests), behind a persistent
+# per-chunk cache so only never-seen text goes out to Vertex AI.
+# The Vertex client itself is only built on the first cache miss.
+embeddings = CachedEmbeddings(
+    _vertex_embeddings,
     model_name=config.VERTEX_AI_EMBEDDING_MODEL,
-    project=config.VERTEX_AI_PROJECT,
-    location=config.VERTEX_AI_LOCATION,
+    db_path=config.EMBEDDING_CACHE_PATH,
+    batch_size=config.EMBEDDING_BATCH_SIZE,
 )
 
-# Per-session FAISS databases stored on disk
+# Legacy per-session FAISS databases (only cleaned up now, never written)
 SESSION_DB_ROOT = config.SESSION_DB_PATH  # ← from config.py (rag/vector_db/session_faiss)
 SESSION_DB_ROOT.mkdir(parents=True, exist_ok=True)
 
+# Shared per-city FAISS databases: rag/vector_db/city_faiss/<city_key>_<content hash>
+CITY_DB_ROOT = config.CITY_DB_PATH
+CITY_DB_ROOT.mkdir(parents=True, exist_ok=True)
+
+_INDEX_KEY_RE = re.compile(r"^(?P<city>.+)_(?P<digest>[0-9a-f]{16})$")
 
-def _session_db_path(session_id: str) -> str:
-    return str(SESSION_DB_ROOT / f"session_{session_id}")
 
 
-def build_session_vectorstore(session_id: str, markdown_content: str) -> None:
+class VectorStoreCache:
     """
-    Called ONCE per WhatsApp user when they say their city.
-    Builds a private FAISS index just for them.
+    Bounded LRU of loaded FAISS stores, keyed by index path.
+    Index directories are content-addressed and never rewritten in place,
+    so an entry stays valid until it is explicitly invalidated (rebuild/drop)
+    or evicted — a hit never touches the disk.
     """
-    session_path = _session_db_path(session_id)
 
-    # Remove old session if exists (fresh start)
-    if Path(session_path).exists():
-        shutil.rmtree(session_path)
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[FAISS, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _estimate_bytes(db: "FAISS") -> int:
+        vectors = db.index.ntotal * db.index.d * 4  # float32 flat index
+        texts = sum(len(doc.page_content.encode("utf-8")) for doc in db.docstore._dict.values())
+        return vectors + texts
+
+    def get(self, path: str) -> Optional["FAISS"]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, path: str, db: "FAISS") -> None:
+        size = self._estimate_bytes(db)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self._bytes -= old[1]
+            self._entries[path] = (db, size)
+            self._bytes += size
+            # Always keep the newest entry, even if it alone is over budget
+            while len(self._entries) > 1 and (
+                self._bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self._bytes -= old[1]
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            return path in self._entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_store_cache = VectorStoreCache(
+    max_bytes=config.VECTORSTORE_CACHE_MAX_BYTES,
+    max_entries=config.VECTORSTORE_CACHE_MAX_ENTRIES,
+)
+_current_key: Dict[str, str] = {}  # city_key → index_key this worker last built/verified
+_build_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def content_hash(markdown_content: str) -> str:
+    return hashlib.sha256(markdown_content.encode("utf-8")).hexdigest()[:16]
+
+
+def _city_db_path(index_key: str) -> Path:
+    return CITY_DB_ROOT / index_key
+
+
+def _city_of(index_key: str) -> Optional[str]:
+    match = _INDEX_KEY_RE.match(index_key)
+    return match.group("city") if match else None
+
+
+def _build_lock(city_key: str) -> threading.Lock:
+    with _locks_guard:
+        return _build_locks.setdefault(city_key, threading.Lock())
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=600,
-        chunk_overlap=100,
-        separators=["\n### ", "\n## ", "\n- ", "\n\n", "\n"],
-        keep_separator=True,
-    )
 
-    chunks = splitter.split_text(markdown_content)
+def vectorstore_cache_stats() -> dict:
+    return _store_cache.stats()
 
-    documents = [
-        Document(
-            page_content=chunk.strip(),
-            metadata={
-                "source": f"osm_session_{session_id}",
-                "chunk_id": i,
-                "session_id": session_id,
-            },
-        )
-        for i, chunk in enumerate(chunks)
-    ]
 
-    logger.info(f"Building session FAISS index → {session_id[:12]} | {len(documents)} chunks")
+def embedding_cache_stats() -> dict:
+    return embeddings.stats()
 
-    # This one line does everything your old code did manually
-    db = FAISS.from_documents(documents, embeddings)
-    db.save_local(session_path)
 
-    logger.info(f"Session vectorstore ready → {Path(session_path).name}")
+def index_exists(index_key: str) -> bool:
+    """Cheap check before reusing an index key remembered from an earlier turn."""
+    path = _city_db_path(index_key)
+    city_key = _city_of(index_key)
+    if city_key is None or _current_key.get(city_key, index_key) != index_key:
+        return False  # a newer index of this city was built / verified here
+    return str(path) in _store_cache or path.exists()
 
 
-def search_relevant_chunks(session_id: str, query: str, k: int = 6) -> List[Document]:
+def forget_index(index_key: str) -> None:
+    """Maintenance is about to delete this index from disk → stop using it here."""
+    _store_cache.invalidate(str(_city_db_path(index_key)))
+    city_key = _city_of(index_key)
+    if city_key and _current_key.get(city_key) == index_key:
+        del _current_key[city_key]
+
+
+def _load_store(index_key: str) -> Optional["FAISS"]:
+    path = _city_db_path(index_key)
+    db = _store_cache.get(str(path))
+    if db is not None:
+        touch_quietly(CITY_INDEX, path)  # in use → not expired (written at most once a minute)
+        return db
+    if _city_of(index_key) is None or not path.exists():
+        return None
+    from langchain_community.vectorstores import FAISS
+    db = FAISS.load_local(
+        folder_path=str(path),
+        embeddings=embeddings,
+        allow_dangerous_deserialization=True,
+    )
+    _store_cache.put(str(path), db)
+    touch_quietly(CITY_INDEX, path)
+    logger.info(f"Loaded FAISS index from disk → {index_key}")
+    return db
+
+
+def _drop_stale_indexes(city_key: str, keep: str) -> None:
     """
-    Main function used by the graph.
-    Returns top-k relevant chunks for the user's private knowledge base.
+    OSM data for this city changed → stop using its older indexes here.
+    Their directories stay: other workers may still read them until they
+    notice the new data. Unused, they age out in tools/maintenance.py.
     """
-    session_path = _session_db_path(session_id)
+    for cached_path in _store_cache.keys():
+        name = Path(cached_path).name
+        if name != keep and _city_of(name) == city_key:
+            _store_cache.invalidate(cached_path)
+            logger.info(f"Dropped stale city index from memory → {name}")
+
+
+def build_city_vectorstore(city_key: str, markdown_content: str) -> str:
+    """
+    Returns the index key for this city's markdown, building it only if needed.
+    Every session in the same city shares one index; it is rebuilt only when
+    the OSM markdown (and therefore its content hash) changes.
+    """
+    index_key = f"{city_key}_{content_hash(markdown_content)}"
+    # Still on disk? Maintenance (in any worker) may have expired it since
+    if _current_key.get(city_key) == index_key and index_exists(index_key):
+        return index_key
+
+    with _build_lock(city_key):
+        if _current_key.get(city_key) == index_key and index_exists(index_key):
+            return index_key
+
+        # Another worker (or a previous run) may already have it on disk
+        if _load_store(index_key) is None:
+            from langchain_community.vectorstores import FAISS
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=600,
+                chunk_overlap=100,
+                separators=["\n### ", "\n## ", "\n- ", "\n\n", "\n"],
+                keep_separator=True,
+            )
 
-    if not Path(session_path).exists():
-        logger.warning(f"No vectorstore for session {session_id[:12]}")
-        return [
-            Document(page_content="No local information available yet. Go to the main train station or look for Red Cross/UNHCR tents.")
-        ]
+            chunks = splitter.split_text(markdown_content)
 
+            documents = [
+                Document(
+                    page_content=chunk.strip(),
+                    metadata={
+                        "source": f"osm_{city_key}",
+                        "chunk_id": i,
+                        "city": city_key,
+                    },
+                )
+                for i, chunk in enumerate(chunks)
+            ]
+
+            logger.info(f"Building city FAISS index → {index_key} | {len(documents)} chunks")
+
+            db = FAISS.from_documents(documents, embeddings)
+            # Write to a temp dir then rename, so readers never see half an index
+            tmp_path = CITY_DB_ROOT / f".tmp_{index_key}_{threading.get_ident()}"
+            db.save_local(str(tmp_path))
+            final_path = _city_db_path(index_key)
+            try:
+                tmp_path.rename(final_path)
+            except OSError:
+                shutil.rmtree(tmp_path, ignore_errors=True)  # lost the race — same content anyway
+            _store_cache.put(str(final_path), db)
+            touch_quietly(CITY_INDEX, final_path)
+
+        _drop_stale_indexes(city_key, keep=index_key)
+        _current_key[city_key] = index_key
+
+    logger.info(f"City vectorstore ready → {index_key}")
+    return index_key
+
+
+def search_relevant_chunks(index_key: str, query: str, k: int = 6) -> List[Document]:
+    """
+    Main function used by the graph.
+    Returns top-k relevant chunks from the shared index of the user's city.
+    """
     try:
-        db = FAISS.load_local(
-            folder_path=session_path,
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True,
-        )
-        retriever = db.as_retriever(search_kwargs={"k": k})
-        docs = retriever.invoke(query)
-        logger.info(f"RAG → {session_id[:12]} | Retrieved {len(docs)} chunks")
+        db = _load_store(index_key) if index_key else None
+        if db is None:
+            logger.warning(f"No vectorstore for index {index_key}")
+            return [
+                Document(page_content="No local information available yet. Go to the main train station or look for Red Cross/UNHCR tents.")
+            ]
+
+        docs = db.similarity_search(query, k=k)
+        logger.info(f"RAG → {index_key} | Retrieved {len(docs)} chunks")
         return docs
     except Exception as e:
-        logger.error(f"RAG search failed for {session_id[:12]}: {e}")
+        logger.error(f"RAG search failed for {index_key}: {e}")
         return [Document(page_content="Sorry, I couldn't access local information right now.")]
 
 
-def cleanup_old_sessions(max_age_hours: int = 72):
-    """Optional: run daily to clean up old sessions"""
+def cleanup_old_sessions(max_age_hours: int = 72) -> Tuple[int, int]:
+    """
+    Delete legacy session indexes unused for max_age_hours; returns (removed, bytes freed).
+    Reads the artifact index, not the directory — tools/maintenance.py calls
+    this (with SESSION_TTL_SECONDS) on every sweep.
+    """
     import time
-    now = time.time()
-    for session_dir in SESSION_DB_ROOT.iterdir():
-        if session_dir.is_dir() and session_dir.name.startswith("session_"):
-            age = now - session_dir.stat().st_mtime
-            if age > max_age_hours * 3600:
-                shutil.rmtree(session_dir)
-                logger.info(f"Cleaned old session: {session_dir.name}")
\ No newline at end of file
+    from tools.maintenance import Policy, claim_expired, remove_files
+    claimed = claim_expired(Policy(SESSION_INDEX, max_age_hours * 3600), time.time())
+    for key, _ in claimed:
+        logger.info(f"Cleaned old session: {Path(key).name}")
+    return len(claimed), remove_files(SESSION_INDEX, claimed)
@@ -0,0 +1,170 @@
+# backend/tools/artifact_index.py — last access time of everything we keep on disk
+#
+# One row per artifact (a file, an index directory, a conversation thread),
+# touched whenever it is written or used. tools/maintenance.py reads it oldest
+# first, so a sweep costs O(what expires) instead of walking every directory.
+# Per-kind totals are kept by triggers, so quota checks are a single row read.
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Kinds
+PDF = "pdf"                      # downloads/plans/<digest>.pdf — re-rendered from its plan on demand
+PLAN = "plan"                    # downloads/plans/<digest>.json — what a PDF link renders
+ALIAS = "alias"                  # downloads/wa_<session>.pdf — the link handed to the user
+CITY_INDEX = "city_index"        # rag/vector_db/city_faiss/<city>_<hash>/ — rebuilt from OSM markdown
+SESSION_INDEX = "session_index"  # rag/vector_db/session_faiss/session_*/ — legacy, never written now
+OSM = "osm"                      # knowledge/osm_<city>.md — fetched again from Overpass
+CONVERSATION = "conversation"    # checkpoint thread of a session id (key is the session id)
+
+# Repeated touches of the same key within this window are not written again
+TOUCH_INTERVAL_SECONDS = 60
+
+
+def disk_usage(path: Path) -> int:
+    """Bytes of a file, or of every file under a directory (0 if gone)."""
+    try:
+        if path.is_symlink() or path.is_file():
+            return path.lstat().st_size
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    except OSError:
+        return 0
+
+
+class ArtifactIndex:
+    def __init__(self, db_path: Path):
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key → last write from this process
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS artifacts_by_age ON artifacts (kind, accessed_at);
+            CREATE TABLE IF NOT EXISTS totals (
+                kind TEXT PRIMARY KEY,
+                files INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL NOT NULL);
+            CREATE TRIGGER IF NOT EXISTS artifacts_added AFTER INSERT ON artifacts BEGIN
+                INSERT INTO totals (kind, files, bytes) VALUES (new.kind, 1, new.bytes)
+                ON CONFLICT (kind) DO UPDATE SET files = files + 1, bytes = bytes + new.bytes;
+            END;
+            CREATE TRIGGER IF NOT EXISTS artifacts_resized AFTER UPDATE OF bytes ON artifacts BEGIN
+                UPDATE totals SET bytes = bytes - old.bytes + new.bytes WHERE kind = new.kind;
+            END;
+            CREATE TRIGGER IF NOT EXISTS artifacts_removed AFTER DELETE ON artifacts BEGIN
+                UPDATE totals SET files = files - 1, bytes = bytes - old.bytes WHERE kind = old.kind;
+            END;
+            """
+        )
+
+    def touch(self, kind: str, key, size: Optional[int] = None, at: Optional[float] = None) -> None:
+        """
+        Record that `key` (a path, or an id) was written or used just now.
+        size=None → measured from the path on the first touch, kept afterwards.
+        """
+        key = str(key)
+        now = at or time.time()
+        if size is None and at is None and now - self._touched.get(key, 0.0) < TOUCH_INTERVAL_SECONDS:
+            return
+        if len(self._touched) > 10_000:
+            self._touched.clear()
+        self._touched[key] = now
+        with self._lock:
+            if size is None:
+                exists = self._conn.execute("SELECT 1 FROM artifacts WHERE key = ?", (key,)).fetchone()
+                if exists:
+                    self._conn.execute("UPDATE artifacts SET accessed_at = MAX(accessed_at, ?) WHERE key = ?", (now, key))
+                    return
+                size = disk_usage(Path(key)) if kind != CONVERSATION else 0
+            self._conn.execute(
+                """
+                INSERT INTO artifacts (key, kind, bytes, accessed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET bytes = excluded.bytes, accessed_at = MAX(accessed_at, excluded.accessed_at)
+                """,
+                (key, kind, size, now),
+            )
+
+    def forget(self, key) -> None:
+        key = str(key)
+        self._touched.pop(key, None)
+        with self._lock:
+            self._conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+
+    def oldest(self, kind: str, limit: int, before: Optional[float] = None) -> List[Tuple[str, int, float]]:
+        """(key, bytes, accessed_at), least recently used first — only those older than `before` if given."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, bytes, accessed_at FROM artifacts WHERE kind = ? AND accessed_at < ? ORDER BY accessed_at LIMIT ?",
+                (kind, before if before is not None else float("inf"), limit),
+            ).fetchall()
+
+    def used_since(self, kind: str, since: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM artifacts WHERE kind = ? AND accessed_at >= ?", (kind, since)
+            ).fetchall()
+        return [key for (key,) in rows]
+
+    def claim(self, key: str, accessed_at: float) -> bool:
+        """Take the row for deletion unless someone used (or another worker claimed) it since it was read."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM artifacts WHERE key = ? AND accessed_at = ?", (key, accessed_at))
+        if cur.rowcount == 1:
+            self._touched.pop(key, None)
+            return True
+        return False
+
+    def totals(self) -> Dict[str, Tuple[int, int]]:
+        """kind → (files, bytes)"""
+        with self._lock:
+            return {kind: (files, size) for kind, files, size in self._conn.execute("SELECT kind, files, bytes FROM totals")}
+
+    def take_turn(self, name: str, every_seconds: float) -> Optional[float]:
+        """
+        Exactly one worker per `every_seconds` gets the turn (e.g. runs this
+        sweep): it receives when the previous turn was taken (0.0 = never),
+        everyone else None.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES (?, 0)", (name,))
+            (previous,) = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+            if previous > now - every_seconds:
+                return None
+            cur = self._conn.execute("UPDATE meta SET value = ? WHERE name = ? AND value = ?", (now, name, previous))
+        return previous if cur.rowcount == 1 else None
+
+    def mark(self, name: str) -> bool:
+        """Set a one-time flag; True only for the first caller ever."""
+        with self._lock:
+            cur = self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES (?, ?)", (name, time.time()))
+        return cur.rowcount == 1
+
+
+artifacts = ArtifactIndex(config.ARTIFACT_INDEX_PATH)
+
+
+def touch_quietly(kind: str, key, size: Optional[int] = None) -> None:
+    """touch() for hot paths — bookkeeping must never fail a request."""
+    try:
+        artifacts.touch(kind, key, size)
+    except Exception as e:
+        logger.warning(f"Artifact index touch failed for {os.path.basename(str(key))}: {e}")
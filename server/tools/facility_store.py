@@ -0,0 +1,270 @@
+# backend/tools/facility_store.py
+# Typed OSM facility records in SQLite with an R-tree spatial index,
+# so the planner can ask "clinics near X" without re-parsing markdown.
+import hashlib
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import BaseModel
+from config import config
+from tools.gazetteer import timezone_name
+from tools.opening_hours import is_open
+
+logger = logging.getLogger(__name__)
+
+# Which OSM amenity/office values answer which classifier need
+NEED_AMENITIES: Dict[str, List[str]] = {
+    "shelter": ["social_facility", "shelter", "community_centre"],
+    "food": ["food_bank", "social_facility", "community_centre"],
+    "medical": ["clinic", "hospital", "doctors"],
+    "registration": ["ngo", "community_centre", "social_facility"],
+    "children": ["social_facility", "community_centre", "clinic", "hospital"],
+    "elderly": ["social_facility", "clinic", "hospital", "doctors"],
+    "safety": ["shelter", "social_facility", "ngo"],
+}
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class Facility(BaseModel):
+    osm_id: str            # "node/123", "way/456", ...
+    name: str
+    amenity: str
+    operator: str = ""
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    address: str = "Address not listed"
+    phone: str = ""
+    opening_hours: str = ""              # raw OSM tag, e.g. "Mo-Fr 08:00-17:00"
+    distance_km: Optional[float] = None  # only set on nearest-facility results
+    open_now: Optional[bool] = None      # only set by open_first(); None = hours unknown
+
+    def to_context_lines(self) -> List[str]:
+        """Short text block the planner prompt copies names/addresses from."""
+        title = f"## {self.name}" + (f" – {self.operator}" if self.operator else "")
+        lines = [title, f"Type: {self.amenity.replace('_', ' ').title()}", f"Address: {self.address}"]
+        if self.phone:
+            lines.append(f"Phone: {self.phone}")
+        if self.opening_hours:
+            status = {True: " (open now)", False: " (closed now)"}.get(self.open_now, "")
+            lines.append(f"Hours: {self.opening_hours}{status}")
+        if self.distance_km is not None:
+            lines.append(f"Distance: {self.distance_km:.1f} km from the user")
+        return lines
+
+
+_local = threading.local()
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def _conn() -> sqlite3.Connection:
+    """One connection per thread (graph nodes call in via asyncio.to_thread)."""
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(str(config.FACILITY_DB_PATH), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    if not _schema_ready:
+        with _schema_lock:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS facilities (
+                    id INTEGER PRIMARY KEY,
+                    city TEXT NOT NULL,
+                    osm_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    amenity TEXT NOT NULL,
+                    operator TEXT NOT NULL DEFAULT '',
+                    lat REAL,
+                    lon REAL,
+                    address TEXT NOT NULL,
+                    phone TEXT NOT NULL DEFAULT '',
+                    opening_hours TEXT NOT NULL DEFAULT '',
+                    UNIQUE (city, osm_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_facilities_city_amenity ON facilities (city, amenity);
+                CREATE VIRTUAL TABLE IF NOT EXISTS facilities_rtree
+                    USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+                CREATE TABLE IF NOT EXISTS city_versions (
+                    city TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(facilities)")}
+            if "opening_hours" not in columns:  # stores created before opening hours were kept
+                conn.execute("ALTER TABLE facilities ADD COLUMN opening_hours TEXT NOT NULL DEFAULT ''")
+            _schema_ready = True
+    return conn
+
+
+def data_version(facilities: Iterable[Facility]) -> str:
+    """Hash of the facility data itself (not the markdown's timestamp line)."""
+    payload = json.dumps([f.model_dump() for f in facilities], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def replace_city(city_key: str, facilities: List[Facility]) -> str:
+    """Atomically swap a city's facilities for a fresh Overpass result."""
+    version = data_version(facilities)
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "DELETE FROM facilities_rtree WHERE id IN (SELECT id FROM facilities WHERE city = ?)",
+            (city_key,),
+        )
+        conn.execute("DELETE FROM facilities WHERE city = ?", (city_key,))
+        for f in facilities:
+            cur = conn.execute(
+                "INSERT OR REPLACE INTO facilities "
+                "(city, osm_id, name, amenity, operator, lat, lon, address, phone, opening_hours) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (city_key, f.osm_id, f.name, f.amenity, f.operator, f.lat, f.lon, f.address, f.phone, f.opening_hours),
+            )
+            if f.lat is not None and f.lon is not None:
+                conn.execute(
+                    "INSERT INTO facilities_rtree (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)",
+                    (cur.lastrowid, f.lat, f.lat, f.lon, f.lon),
+                )
+        conn.execute(
+            "INSERT OR REPLACE INTO city_versions (city, version, updated_at) VALUES (?, ?, ?)",
+            (city_key, version, time.time()),
+        )
+    logger.info(f"Facility store → {city_key}: {len(facilities)} facilities (v{version})")
+    return version
+
+
+def city_version(city_key: str) -> Optional[str]:
+    row = _conn().execute("SELECT version FROM city_versions WHERE city = ?", (city_key,)).fetchone()
+    return row[0] if row else None
+
+
+def located_facilities(city_key: str) -> List[Facility]:
+    """Every facility in a city that has coordinates (input for the KD-tree)."""
+    rows = _conn().execute(
+        "SELECT osm_id, name, amenity, operator, lat, lon, address, phone, opening_hours FROM facilities "
+        "WHERE city = ? AND lat IS NOT NULL AND lon IS NOT NULL",
+        (city_key,),
+    )
+    return [_row_to_facility(row) for row in rows]
+
+
+def city_near(lat: float, lon: float, radius_km: float = 30.0) -> Optional[str]:
+    """City whose facilities lie closest to a point — resolves a bare location pin."""
+    dlat = radius_km / 111.32
+    dlon = radius_km / max(111.32 * math.cos(math.radians(lat)), 1e-6)
+    rows = _conn().execute(
+        "SELECT f.city, f.lat, f.lon FROM facilities f JOIN facilities_rtree r ON r.id = f.id "
+        "WHERE r.min_lat >= ? AND r.max_lat <= ? AND r.min_lon >= ? AND r.max_lon <= ?",
+        (lat - dlat, lat + dlat, lon - dlon, lon + dlon),
+    ).fetchall()
+    if not rows:
+        return None
+    return min(rows, key=lambda r: haversine_km(lat, lon, r[1], r[2]))[0]
+
+
+def _row_to_facility(row) -> Facility:
+    osm_id, name, amenity, operator, lat, lon, address, phone, opening_hours = row
+    return Facility(osm_id=osm_id, name=name, amenity=amenity, operator=operator,
+                    lat=lat, lon=lon, address=address, phone=phone, opening_hours=opening_hours)
+
+
+def amenities_for_needs(needs: Optional[List[str]]) -> List[str]:
+    wanted: List[str] = []
+    for need in needs or []:
+        for amenity in NEED_AMENITIES.get(need.lower(), []):
+            if amenity not in wanted:
+                wanted.append(amenity)
+    return wanted
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def query_facilities(
+    city_key: str,
+    amenities: Optional[List[str]] = None,
+    near: Optional[tuple] = None,
+    radius_km: float = 10.0,
+    limit: int = 15,
+) -> List[Facility]:
+    """
+    Facilities in a city, optionally filtered by amenity and by distance from
+    `near` = (lat, lon). Distance queries use the R-tree bounding box, then
+    sort the few candidates by great-circle distance. Places open right now
+    come first (see open_first).
+    """
+    sql = ("SELECT f.osm_id, f.name, f.amenity, f.operator, f.lat, f.lon, f.address, f.phone, f.opening_hours "
+           "FROM facilities f")
+    where = ["f.city = ?"]
+    params: list = [city_key]
+
+    if near is not None:
+        lat, lon = near
+        dlat = radius_km / 111.32
+        dlon = radius_km / max(111.32 * math.cos(math.radians(lat)), 1e-6)
+        sql += " JOIN facilities_rtree r ON r.id = f.id"
+        where += ["r.min_lat >= ?", "r.max_lat <= ?", "r.min_lon >= ?", "r.max_lon <= ?"]
+        params += [lat - dlat, lat + dlat, lon - dlon, lon + dlon]
+
+    if amenities:
+        where.append(f"f.amenity IN ({','.join('?' * len(amenities))})")
+        params += amenities
+
+    sql += " WHERE " + " AND ".join(where)
+    if near is None:
+        sql += " ORDER BY f.name COLLATE NOCASE LIMIT ?"
+        params.append(limit * 3)  # room for open places further down the alphabet
+
+    facilities = [_row_to_facility(row) for row in _conn().execute(sql, params)]
+    if near is not None:
+        facilities.sort(key=lambda f: haversine_km(near[0], near[1], f.lat, f.lon))
+    return open_first(city_key, facilities)[:limit]
+
+
+def local_time(city_key: str, facilities: List[Facility]) -> Optional[datetime]:
+    """
+    Wall-clock time in the city: its IANA zone if the gazetteer knows it, else
+    mean solar time from the facilities' longitude (within an hour or two of
+    the legal time). None if neither is available.
+    """
+    zone = timezone_name(city_key)
+    if zone:
+        try:
+            return datetime.now(ZoneInfo(zone))
+        except ZoneInfoNotFoundError:
+            pass  # no tz database on this host
+    lons = [f.lon for f in facilities if f.lon is not None]
+    if not lons:
+        return None
+    return datetime.now(timezone(timedelta(hours=round(sum(lons) / len(lons) / 15))))
+
+
+def open_first(city_key: str, facilities: List[Facility], now: Optional[datetime] = None) -> List[Facility]:
+    """
+    Fill in open_now from each opening_hours tag, then put open places first,
+    unknown hours next and closed ones last — the incoming order (nearest, or
+    by name) is kept within each group. Nothing is dropped.
+    """
+    if not any(f.opening_hours for f in facilities):
+        return facilities
+    now = now or local_time(city_key, facilities)
+    if now is None:
+        return facilities
+    marked = [f.model_copy(update={"open_now": is_open(f.opening_hours, now)}) for f in facilities]
+    rank = {True: 0, None: 1, False: 2}
+    return sorted(marked, key=lambda f: rank[f.open_now])
@@ -0,0 +1,217 @@
+# backend/tools/gazetteer.py — canonical city ids for every spelling users send
+#
+# "Bombay", "मुंबई", "뭄바이" and "mumbay" are all Mumbai. Every place that keys
+# anything by city (OSM cache file, facility store, vector index) goes through
+# city_key() so each city gets exactly one fetch, one cache file, one index.
+#
+# Lookup: exact match on a normalised alias, then a SymSpell-style deletes
+# index for typos (edit distance 1, or 2 for long names; none for short ones).
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+
+class City(NamedTuple):
+    key: str                # canonical id, used for file names and store keys
+    name: str               # English name — display and Overpass `name:en`
+    aliases: tuple          # other spellings, transliterations, scripts
+
+
+CITIES: List[City] = [
+    # India
+    City("mumbai", "Mumbai", ("bombay", "mumbay", "mumbi", "मुंबई", "मुम्बई", "बंबई", "ممبئی", "مومباي", "мумбаи", "мумбаї", "뭄바이", "ムンバイ")),
+    City("delhi", "Delhi", ("new delhi", "dilli", "nai dilli", "दिल्ली", "नई दिल्ली", "دہلی", "دلهی", "دلهي", "дели", "делі", "델리", "デリー")),
+    City("bangalore", "Bangalore", ("bengaluru", "banglore", "bangaluru", "bengalooru", "बेंगलुरु", "बैंगलोर", "ಬೆಂಗಳೂರು", "بنگلور", "бангалор", "방갈로르", "バンガロール")),
+    City("chennai", "Chennai", ("madras", "चेन्नई", "சென்னை", "چنئی", "ченнаи")),
+    City("kolkata", "Kolkata", ("calcutta", "कोलकाता", "কলকাতা", "کولکاتا", "калькутта")),
+    City("hyderabad", "Hyderabad", ("हैदराबाद", "حیدرآباد", "хайдарабад")),
+    City("pune", "Pune", ("poona", "पुणे", "پونے")),
+    # East Asia
+    City("seoul", "Seoul", ("서울", "ソウル", "首尔", "сеул", "سيول", "सियोल")),
+    City("busan", "Busan", ("pusan", "부산", "釜山", "пусан")),
+    City("tokyo", "Tokyo", ("東京", "とうきょう", "도쿄", "токио", "टोक्यो", "طوكيو")),
+    # Europe
+    City("berlin", "Berlin", ("берлін", "берлин", "برلين", "برلین", "बर्लिन", "베를린", "ベルリン")),
+    City("munich", "Munich", ("münchen", "muenchen", "monachium", "мюнхен", "ميونخ", "مونیخ")),
+    City("hamburg", "Hamburg", ("гамбург", "هامبورغ", "هامبورگ")),
+    City("warsaw", "Warsaw", ("warszawa", "warschau", "варшава", "وارسو", "वारसॉ", "바르샤바")),
+    City("krakow", "Krakow", ("kraków", "cracow", "krakau", "краків", "краков", "كراكوف")),
+    City("gdansk", "Gdansk", ("gdańsk", "danzig", "гданськ", "гданьск")),
+    City("wroclaw", "Wroclaw", ("wrocław", "breslau", "вроцлав")),
+    City("przemysl", "Przemysl", ("przemyśl", "перемишль", "перемышль")),
+    City("lviv", "Lviv", ("lvov", "lwów", "lwow", "lemberg", "львів", "львов", "لفيف")),
+    City("kyiv", "Kyiv", ("kiev", "kijów", "kijow", "київ", "киев", "كييف", "کی‌یف", "कीव", "키이우")),
+    City("kharkiv", "Kharkiv", ("kharkov", "charków", "харків", "харьков", "خاركيف")),
+    City("odesa", "Odesa", ("odessa", "одеса", "одесса", "أوديسا")),
+    City("chisinau", "Chisinau", ("chișinău", "kishinev", "кишинів", "кишинёв", "кишинев")),
+    City("prague", "Prague", ("praha", "prag", "прага", "براغ")),
+    City("vienna", "Vienna", ("wien", "wiedeń", "відень", "вена", "فيينا", "وین")),
+    City("budapest", "Budapest", ("будапешт", "بودابست")),
+    City("bucharest", "Bucharest", ("bucurești", "bucuresti", "бухарест", "بوخارست")),
+    City("paris", "Paris", ("париж", "باريس", "پاریس", "पेरिस", "파리", "パリ")),
+    City("london", "London", ("londyn", "лондон", "لندن", "लंदन", "런던", "ロンドン")),
+    City("amsterdam", "Amsterdam", ("амстердам", "أمستردام", "آمستردام")),
+    City("brussels", "Brussels", ("bruxelles", "brussel", "brüssel", "брюссель", "брюсель", "بروكسل")),
+    City("rome", "Rome", ("roma", "rzym", "рим", "روما")),
+    City("madrid", "Madrid", ("мадрид", "مدريد")),
+    City("lisbon", "Lisbon", ("lisboa", "lizbona", "лиссабон", "лісабон", "لشبونة")),
+    City("athens", "Athens", ("athina", "αθήνα", "ateny", "афины", "афіни", "أثينا", "آتن")),
+    City("istanbul", "Istanbul", ("i̇stanbul", "stambuł", "стамбул", "إسطنبول", "استانبول", "استنبول")),
+    City("gaziantep", "Gaziantep", ("antep", "غازي عنتاب", "غازی‌عنتاب")),
+    # Middle East
+    City("amman", "Amman", ("عمّان", "амман")),
+    City("beirut", "Beirut", ("bayrut", "beyrouth", "بيروت", "бейрут")),
+    City("cairo", "Cairo", ("القاهرة", "قاهره", "каир")),
+]
+
+# IANA zone of each known city — "open now" is judged on the city's own clock
+_ZONES = {
+    "Asia/Kolkata": ("mumbai", "delhi", "bangalore", "chennai", "kolkata", "hyderabad", "pune"),
+    "Asia/Seoul": ("seoul", "busan"),
+    "Asia/Tokyo": ("tokyo",),
+    "Europe/Berlin": ("berlin", "munich", "hamburg"),
+    "Europe/Warsaw": ("warsaw", "krakow", "gdansk", "wroclaw", "przemysl"),
+    "Europe/Kyiv": ("lviv", "kyiv", "kharkiv", "odesa"),
+    "Europe/Chisinau": ("chisinau",),
+    "Europe/Prague": ("prague",),
+    "Europe/Vienna": ("vienna",),
+    "Europe/Budapest": ("budapest",),
+    "Europe/Bucharest": ("bucharest",),
+    "Europe/Paris": ("paris",),
+    "Europe/London": ("london",),
+    "Europe/Amsterdam": ("amsterdam",),
+    "Europe/Brussels": ("brussels",),
+    "Europe/Rome": ("rome",),
+    "Europe/Madrid": ("madrid",),
+    "Europe/Lisbon": ("lisbon",),
+    "Europe/Athens": ("athens",),
+    "Europe/Istanbul": ("istanbul", "gaziantep"),
+    "Asia/Amman": ("amman",),
+    "Asia/Beirut": ("beirut",),
+    "Africa/Cairo": ("cairo",),
+}
+TIMEZONES: Dict[str, str] = {key: zone for zone, keys in _ZONES.items() for key in keys}
+
+
+def normalize(name: str) -> str:
+    """
+    Case-folded, whitespace/underscore/hyphen collapsed, Latin diacritics
+    dropped ("Kraków" → "krakow"). Marks on other scripts (Devanagari vowel
+    signs, Arabic harakat) are part of the word and are kept.
+    """
+    decomposed = unicodedata.normalize("NFKD", name.strip().casefold())
+    out = []
+    for ch in decomposed:
+        if unicodedata.combining(ch) and out and out[-1] < "ɐ":
+            continue  # accent on a Latin letter
+        out.append(ch)
+    text = unicodedata.normalize("NFC", "".join(out))
+    for sep in ("_", "-", "‌"):
+        text = text.replace(sep, " ")
+    return " ".join(text.split())
+
+
+def slug(name: str) -> str:
+    """File-name-safe key — only [a-z0-9_] — for a city the gazetteer doesn't know."""
+    text = normalize(name)
+    key = re.sub(r"[^a-z0-9]+", "_", text).strip("_")  # "/", "..", quotes, dots → gone
+    if any(ch.isalnum() and not ch.isascii() for ch in text):
+        # Other scripts don't fit [a-z0-9_] — a short hash keeps "東京" and "大阪" apart
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+        key = f"{key}_{digest}" if key else f"city_{digest}"
+    return key or "unknown"
+
+
+def _max_edits(term: str) -> int:
+    # Short names get no slack: "home" must not become "rome"
+    if len(term) >= 9:
+        return 2
+    return 1 if len(term) >= 5 else 0
+
+
+def _deletes(term: str, distance: int) -> Set[str]:
+    found, frontier = {term}, {term}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (Damerau-Levenshtein), early exit past `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit and min(prev) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class Gazetteer:
+    def __init__(self, cities: Iterable[City]):
+        self.cities: Dict[str, City] = {}
+        self._exact: Dict[str, str] = {}                      # normalised alias → key
+        self._deletes: Dict[str, Set[str]] = defaultdict(set)  # delete variant → aliases
+        for city in cities:
+            self.cities[city.key] = city
+            for alias in (city.key, city.name, *city.aliases):
+                term = normalize(alias)
+                self._exact.setdefault(term, city.key)
+                for variant in _deletes(term, _max_edits(term)):
+                    self._deletes[variant].add(term)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Canonical key for `name`, tolerating small typos; None if unknown or ambiguous."""
+        term = normalize(name)
+        if not term:
+            return None
+        if term in self._exact:
+            return self._exact[term]
+
+        limit = _max_edits(term)
+        best, best_keys = limit + 1, set()
+        for variant in _deletes(term, limit):
+            for alias in self._deletes.get(variant, ()):
+                distance = _edit_distance(term, alias, limit)
+                if distance < best:
+                    best, best_keys = distance, {self._exact[alias]}
+                elif distance == best:
+                    best_keys.add(self._exact[alias])
+        return best_keys.pop() if best <= limit and len(best_keys) == 1 else None
+
+    def aliases(self) -> Dict[str, str]:
+        """Every known spelling, as typed (lower-cased) and normalised → canonical key."""
+        spellings = dict(self._exact)
+        for city in self.cities.values():
+            for alias in (city.name, *city.aliases):
+                spellings.setdefault(alias.lower(), city.key)
+        return spellings
+
+
+gazetteer = Gazetteer(CITIES)
+
+
+def city_key(name: str) -> str:
+    """Canonical key for any spelling; unknown cities fall back to a plain slug."""
+    return gazetteer.resolve(name) or slug(name)
+
+
+def timezone_name(key: str) -> Optional[str]:
+    """IANA time zone of a known city ("kyiv" → "Europe/Kyiv"), None for the rest."""
+    return TIMEZONES.get(key)
+
+
+def display_name(key: str) -> str:
+    """English name for a canonical key ("mumbai" → "Mumbai")."""
+    city = gazetteer.cities.get(key)
+    return city.name if city else key.replace("_", " ").title()
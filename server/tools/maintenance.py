@@ -0,0 +1,200 @@
+# backend/tools/maintenance.py — scheduled, incremental disk garbage collection
+#
+# Every MAINTENANCE_INTERVAL_SECONDS one worker (whichever takes the turn) sweeps:
+#   1. per kind: artifacts unused for longer than the kind's max age
+#   2. per kind: least recently used artifacts while over the byte / file quota
+#   3. expired session store records; checkpoint history of the conversations
+#      active since the last sweep is trimmed to their latest state
+#
+# Candidates come oldest first from the access-time index (tools/artifact_index.py),
+# so a sweep costs O(what expires), not O(files on disk). Each row is claimed
+# before its file goes: anything used since it was read, or already taken by
+# another worker, is left alone. Everything deleted here is rebuilt on demand
+# (PDF from its stored plan, city index from the OSM markdown, OSM from Overpass)
+# except plans, links and conversations, which simply end with the session.
+#
+# The very first sweep registers files that predate the index (one directory walk).
+import asyncio
+import logging
+import os
+import shutil
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from config import config
+from tools.artifact_index import (
+    ALIAS, CITY_INDEX, CONVERSATION, OSM, PDF, PLAN, SESSION_INDEX, artifacts,
+)
+from tools.pdf_generator import PLANS_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class Policy(NamedTuple):
+    kind: str
+    max_age: int        # seconds since last use, 0 = no limit
+    max_bytes: int = 0  # 0 = no quota
+    max_files: int = 0
+
+
+def policies() -> List[Policy]:
+    return [
+        Policy(PDF, config.PDF_MAX_AGE_SECONDS, config.PDF_MAX_BYTES, config.PDF_MAX_FILES),
+        Policy(PLAN, config.SESSION_TTL_SECONDS),
+        Policy(ALIAS, config.SESSION_TTL_SECONDS),
+        Policy(CITY_INDEX, config.CITY_INDEX_MAX_AGE_SECONDS, config.CITY_INDEX_MAX_BYTES, config.CITY_INDEX_MAX_FILES),
+        Policy(OSM, config.OSM_MAX_AGE_SECONDS, config.OSM_MAX_BYTES, config.OSM_MAX_FILES),
+        Policy(CONVERSATION, config.SESSION_TTL_SECONDS),
+    ]
+
+
+def claim_expired(policy: Policy, now: float) -> List[Tuple[str, int]]:
+    """Take up to MAINTENANCE_BATCH rows past the max age, then past the quotas; (key, bytes)."""
+    claimed: List[Tuple[str, int]] = []
+
+    def take(rows) -> int:
+        before = len(claimed)
+        for key, size, accessed_at in rows:
+            if len(claimed) < config.MAINTENANCE_BATCH and artifacts.claim(key, accessed_at):
+                claimed.append((key, size))
+        return len(claimed) - before
+
+    if policy.max_age:
+        take(artifacts.oldest(policy.kind, config.MAINTENANCE_BATCH, before=now - policy.max_age))
+    while len(claimed) < config.MAINTENANCE_BATCH:
+        files, size = artifacts.totals().get(policy.kind, (0, 0))
+        over_files = files - policy.max_files if policy.max_files else 0
+        if over_files <= 0 and not (policy.max_bytes and size > policy.max_bytes):
+            break
+        if not take(artifacts.oldest(policy.kind, min(max(over_files, 1), 50))):
+            break  # everything we read was in use a moment ago — next sweep
+    return claimed
+
+
+def remove_files(kind: str, claimed: List[Tuple[str, int]]) -> int:
+    """Delete claimed files / index directories; returns bytes reclaimed."""
+    if kind == CITY_INDEX:
+        from rag.retrieve import forget_index
+    reclaimed = 0
+    for key, size in claimed:
+        path = Path(key)
+        try:
+            if kind == CITY_INDEX:
+                forget_index(path.name)
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+            reclaimed += size
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Maintenance could not delete {path.name}: {e}")
+    return reclaimed
+
+
+def adopt_existing() -> int:
+    """Once ever: register files written before the index existed, aged by their mtime."""
+    if not artifacts.mark("adopted"):
+        return 0
+    plans_dir = config.PDF_OUTPUT_PATH / PLANS_DIR
+    sources = [
+        (PDF, plans_dir.glob("*.pdf")),
+        (PLAN, plans_dir.glob("*.json")),
+        (ALIAS, config.PDF_OUTPUT_PATH.glob("*.pdf")),
+        (CITY_INDEX, (p for p in config.CITY_DB_PATH.iterdir() if p.is_dir() and not p.name.startswith("."))),
+        (SESSION_INDEX, config.SESSION_DB_PATH.glob("session_*")),
+        (OSM, config.KNOWLEDGE_PATH.glob("osm_*.md")),
+    ]
+    adopted = 0
+    for kind, paths in sources:
+        for path in paths:
+            try:
+                artifacts.touch(kind, path, at=path.lstat().st_mtime)
+                adopted += 1
+            except OSError:
+                pass
+    logger.info(f"Maintenance → now tracking {adopted} existing files")
+    return adopted
+
+
+# ──────────────────────── Scheduler ────────────────────────
+sweeps = 0
+last_sweep: Dict[str, float] = {}
+reclaimed: Counter = Counter()  # kind → bytes, since start
+removed: Counter = Counter()    # kind → files / records, since start
+
+
+async def sweep(previous_sweep: float = 0.0) -> Dict[str, Tuple[int, int]]:
+    """One full pass; returns kind → (files removed, bytes reclaimed)."""
+    global sweeps
+    from graph import drop_conversation, trim_conversations
+    from rag.retrieve import cleanup_old_sessions
+    from tools.session_store import session_store
+
+    started, now = time.perf_counter(), time.time()
+    await asyncio.to_thread(adopt_existing)
+    report: Dict[str, Tuple[int, int]] = {}
+    # Legacy per-session FAISS directories (same index, same claim → delete path)
+    removed_dirs, freed = await asyncio.to_thread(cleanup_old_sessions, config.SESSION_TTL_SECONDS // 3600)
+    if removed_dirs:
+        report[SESSION_INDEX] = (removed_dirs, freed)
+    for policy in policies():
+        claimed = await asyncio.to_thread(claim_expired, policy, now)
+        if not claimed:
+            continue
+        if policy.kind == CONVERSATION:
+            freed = 0
+            for session_id, _ in claimed:
+                freed += await drop_conversation(session_id)
+        else:
+            freed = await asyncio.to_thread(remove_files, policy.kind, claimed)
+        report[policy.kind] = (len(claimed), freed)
+
+    # Conversations still going: only the latest checkpoint is ever read back
+    active = await asyncio.to_thread(artifacts.used_since, CONVERSATION, previous_sweep)
+    threads, freed = await trim_conversations(active)
+    if freed:
+        report["checkpoints"] = (threads, freed)
+    purged = await asyncio.to_thread(session_store.purge_expired)
+    if purged:
+        report["session_records"] = (purged, 0)
+
+    sweeps += 1
+    last_sweep.update(at=now, seconds=round(time.perf_counter() - started, 3))
+    for kind, (files, freed) in report.items():
+        removed[kind] += files
+        reclaimed[kind] += freed
+    total = sum(freed for _, freed in report.values())
+    if report:
+        detail = ", ".join(f"{kind}: {files} / {freed / 1e6:.1f} MB" for kind, (files, freed) in report.items())
+        logger.info(f"Maintenance → reclaimed {total / 1e6:.1f} MB in {last_sweep['seconds']}s ({detail})")
+    return report
+
+
+async def maintenance_loop():
+    """Lifespan task: every MAINTENANCE_INTERVAL_SECONDS, one worker sweeps for all of them."""
+    while True:
+        try:
+            previous = await asyncio.to_thread(artifacts.take_turn, "sweep", config.MAINTENANCE_INTERVAL_SECONDS)
+            if previous is not None:
+                await sweep(previous)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Maintenance sweep failed: {e}")
+        await asyncio.sleep(config.MAINTENANCE_INTERVAL_SECONDS)
+
+
+def maintenance_stats() -> dict:
+    tracked = artifacts.totals()
+    return {
+        "pid": os.getpid(),
+        "sweeps": sweeps,  # by this worker
+        "last_sweep": dict(last_sweep),
+        "reclaimed_bytes": sum(reclaimed.values()),
+        "reclaimed": {kind: {"removed": removed[kind], "bytes": reclaimed[kind]} for kind in removed},
+        "tracked": {kind: {"files": files, "bytes": size} for kind, (files, size) in tracked.items()},
+    }
@@ -0,0 +1,85 @@
+# backend/tools/opening_hours.py — "is it open now?" for OSM opening_hours tags
+#
+# Covers the forms nearly every shelter / clinic tag uses: "24/7",
+# "Mo-Fr 08:00-17:00; Sa 09:00-13:00", day lists ("Mo,We,Fr"), several
+# ranges ("08:00-12:00,13:00-17:00"), ranges past midnight ("22:00-06:00")
+# and "off" / "closed" ("PH off" is skipped). Later rules override earlier
+# ones for their days, days no rule mentions are closed. Anything else
+# (sunrise, months, week numbers, comments, open ends) → None: unknown,
+# never "closed".
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+_DAYS = ["mo", "tu", "we", "th", "fr", "sa", "su"]
+_RANGE = re.compile(r"^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$")
+
+_Ranges = List[Tuple[int, int]]  # (start, end) in minutes after midnight; end <= start → past midnight
+
+
+def _days(selector: str) -> Optional[List[int]]:
+    """'mo-fr,su' → [0, 1, 2, 3, 4, 6]; wraps ('fr-mo'); None if not a weekday selector."""
+    days: List[int] = []
+    for part in selector.split(","):
+        bounds = part.split("-")
+        if len(bounds) > 2 or any(b not in _DAYS for b in bounds):
+            return None
+        start, end = _DAYS.index(bounds[0]), _DAYS.index(bounds[-1])
+        days += [(start + i) % 7 for i in range((end - start) % 7 + 1)]
+    return days
+
+
+def _ranges(selector: str) -> Optional[_Ranges]:
+    if selector in ("off", "closed"):
+        return []
+    ranges: _Ranges = []
+    for part in selector.split(","):
+        match = _RANGE.match(part.strip())
+        if not match:
+            return None
+        h1, m1, h2, m2 = (int(g) for g in match.groups())
+        if h1 > 24 or h2 > 24 or m1 > 59 or m2 > 59:
+            return None
+        ranges.append((h1 * 60 + m1, h2 * 60 + m2))
+    return ranges
+
+
+def parse(spec: str) -> Optional[Dict[int, _Ranges]]:
+    """Weekday (0 = Monday) → open ranges, or None if the tag uses anything we don't read."""
+    schedule: Dict[int, _Ranges] = {}
+    for rule in spec.strip().lower().split(";"):
+        rule = rule.strip()
+        if not rule:
+            continue
+        if rule == "24/7":
+            for day in range(7):
+                schedule[day] = [(0, 24 * 60)]
+            continue
+        head, _, rest = rule.partition(" ")
+        if head in ("ph", "sh") and rest.strip() in ("off", "closed"):
+            continue  # closed on (school) holidays — we assume today isn't one
+        days = _days(head.rstrip(":"))
+        if days is None:
+            if head[:1].isalpha():
+                return None  # a selector we don't handle (PH, Jan, week, "sunrise"...)
+            days, rest = list(range(7)), rule  # times only → every day
+        ranges = _ranges(rest.strip()) if rest.strip() else None
+        if ranges is None:
+            return None
+        for day in days:
+            schedule[day] = ranges
+    return schedule or None
+
+
+def is_open(spec: str, when: datetime) -> Optional[bool]:
+    """Open at local time `when`? None when the tag is empty or not understood."""
+    schedule = parse(spec) if spec else None
+    if schedule is None:
+        return None
+    minute = when.hour * 60 + when.minute
+    today, yesterday = when.weekday(), (when.weekday() - 1) % 7
+    for start, end in schedule.get(today, []):
+        if start <= minute < end or (end <= start and minute >= start):
+            return True
+    # Yesterday's range past midnight ("Fr 22:00-06:00" → Saturday 05:00 is open)
+    return any(end <= start and minute < end for start, end in schedule.get(yesterday, []))
@@ -1,16 +1,51 @@
 # backend/tools/osm_utils.py
+import asyncio
+import httpx
 import overpy
 import time
 import logging
+from collections import Counter
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from config import config
+from tools import facility_store
+from tools.artifact_index import OSM, touch_quietly
+from tools.gazetteer import city_key as canonical_city_key, display_name, gazetteer
+from tools.facility_store import Facility
 
 logger = logging.getLogger(__name__)
 
-# Global Overpass client (reuse connection)
+# overpy is only used to parse Overpass JSON — the HTTP call itself is async
 overpass_api = overpy.Overpass()
 
+# One pooled async HTTP client for every Overpass endpoint (built on first query)
+_http: Optional[httpx.AsyncClient] = None
+
+
+def _get_http() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=httpx.Timeout(config.OVERPASS_HTTP_TIMEOUT_SECONDS, connect=10.0),
+            headers={"User-Agent": "RefugeeFirst/1.0 (+https://refugeefirst.org)"},
+        )
+    return _http
+
+# Public Overpass instances throttle per client — cap our parallel queries per endpoint
+_endpoint_limits: Dict[str, asyncio.Semaphore] = {
+    url: asyncio.Semaphore(config.OVERPASS_MAX_CONCURRENCY) for url in config.OVERPASS_URLS
+}
+
+# Single-flight: city_key → the one in-flight fetch every concurrent caller awaits
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Request counts per city (decayed each prewarm cycle) + the name to query Overpass with
+_traffic: Counter = Counter()
+_city_names: Dict[str, str] = {}
+
+# city_key → time of the last failed refresh, so a dead Overpass isn't hammered
+_failed_at: Dict[str, float] = {}
+
 # Cache file per city (e.g. knowledge/osm_berlin.md)
 CACHE_DIR = config.KNOWLEDGE_PATH
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
@@ -20,54 +55,76 @@ CACHE_TTL_SECONDS = 12 * 60 * 60  # 12 hours
 
 
 def _cache_path(city: str) -> Path:
-    """Standardized cache filename."""
-    city_key = city.lower().replace(" ", "_")
-    return CACHE_DIR / f"osm_{city_key}.md"
+    """Standardized cache filename — one per canonical city, whatever the spelling."""
+    return CACHE_DIR / f"osm_{canonical_city_key(city)}.md"
+
+
+_known_cities: tuple = (0.0, [])  # (listed_at, city keys with a cache file)
+
+
+def cached_city_keys() -> List[str]:
+    """Canonical keys of cities with an OSM cache file (directory listing cached for a minute)."""
+    global _known_cities
+    listed_at, keys = _known_cities
+    if time.time() - listed_at > 60:
+        keys = sorted({canonical_city_key(p.stem[len("osm_"):]) for p in CACHE_DIR.glob("osm_*.md")})
+        _known_cities = (time.time(), keys)
+    return keys
+
+
+def _cache_age(cache_file: Path) -> Optional[float]:
+    """Seconds since the cache file was written, or None if there is none."""
+    try:
+        return time.time() - cache_file.stat().st_mtime
+    except FileNotFoundError:
+        return None
 
 
 def _is_cache_valid(cache_file: Path) -> bool:
     """Check if cached file exists and is fresh."""
-    if not cache_file.exists():
-        return False
-    age = time.time() - cache_file.stat().st_mtime
-    return age < CACHE_TTL_SECONDS
+    age = _cache_age(cache_file)
+    return age is not None and age < CACHE_TTL_SECONDS
 
 
 def _save_cache(city: str, markdown: str):
     cache_file = _cache_path(city)
     try:
-        cache_file.write_text(markdown, encoding="utf-8")
+        # Write-then-rename so concurrent readers never see a half-written file
+        tmp_file = cache_file.with_suffix(f".tmp{id(markdown)}")
+        tmp_file.write_text(markdown, encoding="utf-8")
+        tmp_file.replace(cache_file)
+        touch_quietly(OSM, cache_file, size=len(markdown.encode("utf-8")))
         logger.info(f"OSM data cached → {cache_file.name}")
     except Exception as e:
         logger.warning(f"Failed to write cache {cache_file}: {e}")
 
 
 def _load_cache(city: str) -> str | None:
+    """Returns cached markdown whatever its age — callers decide about staleness."""
     cache_file = _cache_path(city)
-    if _is_cache_valid(cache_file):
-        try:
-            content = cache_file.read_text(encoding="utf-8")
-            logger.info(f"OSM data loaded from cache → {cache_file.name}")
-            return content
-        except Exception as e:
-            logger.warning(f"Failed to read cache {cache_file}: {e}")
+    try:
+        content = cache_file.read_text(encoding="utf-8")
+        touch_quietly(OSM, cache_file)
+        logger.info(f"OSM data loaded from cache → {cache_file.name}")
+        return content
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to read cache {cache_file}: {e}")
     return None
 
-def fetch_city_resources(city: str) -> str:
-    """
-    Returns markdown with emergency facilities for the given city.
-    Uses cached version if fresh, otherwise queries Overpass.
-    """
-    city_key = city.lower().replace(" ", "_")
-
-    # 1. Try cache first
+def _cache_status(city_key: str) -> Tuple[Optional[str], bool]:
+    """(cached markdown or None, whether it needs a background refresh). Blocking."""
     cached = _load_cache(city_key)
-    if cached:
-        return cached
+    if not cached:
+        return None, False
+    # Markdown written before the facility store existed also needs a refresh
+    return cached, not _is_cache_valid(_cache_path(city_key)) or facility_store.city_version(city_key) is None
 
-    # 2. CORRECT Overpass query — NO {{ }} — uses proper union with ()
-    query = f'''
-[out:json][timeout:90];
+def _build_query(city: str) -> str:
+    # CORRECT Overpass query — NO {{ }} — uses proper union with ()
+    return f'''
+[out:json][timeout:{config.OVERPASS_QUERY_TIMEOUT_SECONDS}];
 (
   area["name"="{city}"]["admin_level"="8"];
   area["name:en"="{city}"]["admin_level"="8"];
@@ -89,56 +146,176 @@ out center meta;
 out skel qt;
 '''
 
+
+async def _query_overpass(query: str) -> overpy.Result:
+    """POST the query to each configured endpoint in turn until one answers."""
+    last_error: Exception = RuntimeError("No Overpass endpoints configured")
+    for url in config.OVERPASS_URLS:
+        try:
+            async with _endpoint_limits[url]:
+                response = await _get_http().post(url, data={"data": query})
+            response.raise_for_status()
+            return overpass_api.parse_json(response.content)
+        except Exception as e:
+            logger.warning(f"Overpass endpoint {url} failed: {e}")
+            last_error = e
+    raise last_error
+
+
+def _to_facility(elem) -> Facility:
+    tags = elem.tags
+    kind = type(elem).__name__.lower()  # Node / Way / Relation
+
+    lat = lon = None
+    if getattr(elem, "lat", None) is not None:
+        lat, lon = elem.lat, elem.lon
+    elif getattr(elem, "center_lat", None) is not None:
+        lat, lon = elem.center_lat, elem.center_lon
+
+    address = tags.get("addr:full") or f"{tags.get('addr:street','')} {tags.get('addr:housenumber','')}".strip()
+    amenity = (tags.get("amenity") or tags.get("office")
+               or ("shelter" if tags.get("emergency") == "shelter" else "facility"))
+
+    return Facility(
+        osm_id=f"{kind}/{elem.id}",
+        name=tags.get("name", "Unnamed facility"),
+        amenity=amenity,
+        operator=tags.get("operator", ""),
+        lat=float(lat) if lat is not None else None,
+        lon=float(lon) if lon is not None else None,
+        address=address or "Address not listed",
+        phone=tags.get("phone") or tags.get("contact:phone") or "",
+        opening_hours=tags.get("opening_hours", ""),
+    )
+
+
+def _extract_facilities(result: overpy.Result) -> List[Facility]:
+    # Only tagged elements are facilities; the trailing `>; out skel` adds bare geometry
+    return sorted(
+        (_to_facility(elem) for elem in result.nodes + result.ways + result.relations if elem.tags),
+        key=lambda f: f.name.lower() if f.name != "Unnamed facility" else "zzz",
+    )
+
+
+def _render_markdown(city: str, facilities: List[Facility]) -> str:
+    md = f"# Emergency Resources in {city.title()}\n"
+    md += f"_Updated: {time.strftime('%Y-%m-%d %H:%M UTC')}_\n\n"
+
+    if not facilities:
+        md += ("No specific refugee facilities found in OpenStreetMap yet.\n\n"
+               "**Immediate actions:**\n"
+               "- Go to the main train station (often has help desks)\n"
+               "- Look for Red Cross, UNHCR, or government tents\n"
+               "- Call local emergency services\n")
+        return md
+
+    for f in facilities:
+        md += f"### {f.name}"
+        if f.operator:
+            md += f" – {f.operator}"
+        md += f"\n**Type:** {f.amenity.replace('_', ' ').title()}\n"
+        md += f"- **Address:** {f.address}\n"
+        if f.phone:
+            md += f"- **Phone:** {f.phone}\n"
+        if f.opening_hours:
+            md += f"- **Hours:** {f.opening_hours}\n"
+        if f.lat and f.lon:
+            md += f"- **Map:** https://osm.org/go/{f.lat}/{f.lon}?m=\n"
+        md += "\n"
+    return md
+
+
+def _fallback_markdown(city: str) -> str:
+    return f"# {city.title()} – Limited Data\n\nNo live data available.\n\n**Go to main train station or look for Red Cross / UNHCR tents.**\n"
+
+
+async def _fetch_and_cache(city: str, city_key: str) -> str:
     try:
         logger.info(f"Querying Overpass for city: {city}")
-        result = overpass_api.query(query)
-
-        md = f"# Emergency Resources in {city.title()}\n"
-        md += f"_Updated: {time.strftime('%Y-%m-%d %H:%M UTC')}_\n\n"
-
-        if not (result.nodes or result.ways or result.relations):
-            md += ("No specific refugee facilities found in OpenStreetMap yet.\n\n"
-                   "**Immediate actions:**\n"
-                   "- Go to the main train station (often has help desks)\n"
-                   "- Look for Red Cross, UNHCR, or government tents\n"
-                   "- Call local emergency services\n")
-        else:
-            for elem in sorted(
-                result.nodes + result.ways + result.relations,
-                key=lambda x: x.tags.get("name", "zzz").lower()
-            ):
-                tags = elem.tags
-                name = tags.get("name", "Unnamed facility")
-                operator = tags.get("operator", "")
-                amenity = tags.get("amenity", tags.get("office", "facility"))
-                
-                lat = lon = None
-                if hasattr(elem, "lat"):
-                    lat, lon = elem.lat, elem.lon
-                elif hasattr(elem, "center_lat"):
-                    lat, lon = elem.center_lat, elem.center_lon
-
-                address = tags.get("addr:full") or f"{tags.get('addr:street','')} {tags.get('addr:housenumber','')}".strip()
-                if not address.strip():
-                    address = "Address not listed"
-                phone = tags.get("phone") or tags.get("contact:phone") or "Not listed"
-
-                md += f"### {name}"
-                if operator:
-                    md += f" – {operator}"
-                md += f"\n**Type:** {amenity.replace('_', ' ').title()}\n"
-                md += f"- **Address:** {address}\n"
-                if phone != "Not listed":
-                    md += f"- **Phone:** {phone}\n"
-                if lat and lon:
-                    md += f"- **Map:** https://osm.org/go/{lat}/{lon}?m=\n"
-                md += "\n"
-
+        result = await _query_overpass(_build_query(city))
+        facilities = _extract_facilities(result)
+        await asyncio.to_thread(facility_store.replace_city, city_key, facilities)
+        md = _render_markdown(city, facilities)
         _save_cache(city_key, md)
+        _failed_at.pop(city_key, None)
         return md
 
     except Exception as e:
         logger.error(f"Overpass query failed for {city}: {e}")
-        fallback = f"# {city.title()} – Limited Data\n\nNo live data available.\n\n**Go to main train station or look for Red Cross / UNHCR tents.**\n"
-        _save_cache(city_key, fallback)
-        return fallback
\ No newline at end of file
+        _failed_at[city_key] = time.time()
+        # Never overwrite real (even stale) data with the generic fallback
+        return _load_cache(city_key) or _fallback_markdown(city)
+
+
+def _refresh(city: str, city_key: str) -> asyncio.Task:
+    """Join the in-flight fetch for this city, or start it."""
+    task = _inflight.get(city_key)
+    if task is None:
+        task = asyncio.create_task(_fetch_and_cache(city, city_key))
+        _inflight[city_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(city_key, None))
+    else:
+        logger.info(f"Joining in-flight Overpass fetch for {city_key}")
+    return task
+
+
+def _recently_failed(city_key: str) -> bool:
+    failed = _failed_at.get(city_key)
+    return failed is not None and time.time() - failed < config.OSM_RETRY_AFTER_SECONDS
+
+
+async def fetch_city_resources(city: str) -> str:
+    """
+    Returns markdown with emergency facilities for the given city.
+    Stale-while-revalidate: any cached version is returned immediately and,
+    if older than the TTL, refreshed in the background. Only a city with no
+    cache at all waits for Overpass — concurrent callers share one query.
+    """
+    city_key = canonical_city_key(city)
+    # Known cities are queried (and titled) by their English name, whatever the user typed
+    if city_key in gazetteer.cities:
+        city = display_name(city_key)
+    _traffic[city_key] += 1
+    _city_names.setdefault(city_key, city)
+
+    # 1. Try cache first (fresh or stale) — file read + sqlite, so off the event loop
+    cached, needs_refresh = await asyncio.to_thread(_cache_status, city_key)
+    if cached:
+        if needs_refresh and not _recently_failed(city_key):
+            logger.info(f"Serving cached OSM data for {city_key}, refreshing in background")
+            _refresh(city, city_key)
+        return cached
+
+    if _recently_failed(city_key):
+        return _fallback_markdown(city)
+
+    # 2. Nothing cached → wait for the (shared) fetch.
+    # shield: one caller giving up must not cancel the fetch for everyone else
+    return await asyncio.shield(_refresh(city, city_key))
+
+
+async def prewarm_loop():
+    """
+    Background scheduler: every OSM_PREWARM_INTERVAL_SECONDS, refresh the
+    top OSM_PREWARM_TOP_N cities by recent traffic whose cache will expire
+    before the next cycle, so their users never see stale data at all.
+    """
+    while True:
+        await asyncio.sleep(config.OSM_PREWARM_INTERVAL_SECONDS)
+        try:
+            horizon = CACHE_TTL_SECONDS - config.OSM_PREWARM_INTERVAL_SECONDS
+            for city_key, hits in _traffic.most_common(config.OSM_PREWARM_TOP_N):
+                age = _cache_age(_cache_path(city_key))
+                if (age is None or age >= horizon) and not _recently_failed(city_key):
+                    logger.info(f"Pre-warming OSM cache for {city_key} ({hits} recent requests)")
+                    await _refresh(_city_names.get(city_key, city_key), city_key)
+
+            # Decay so "top N" tracks recent traffic, not all-time totals
+            for city_key in list(_traffic):
+                _traffic[city_key] //= 2
+                if not _traffic[city_key]:
+                    del _traffic[city_key]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"OSM prewarm cycle failed: {e}")
@@ -1,12 +1,31 @@
 # tools/pdf_generator.py
 # FINAL VERSION – ALWAYS ENGLISH PDF (no matter user language) – NO ERRORS
 
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from typing import Dict, Optional, Tuple
+
+from config import config
+from tools import pdf_render
+from tools.artifact_index import ALIAS, PDF, PLAN, artifacts, touch_quietly
+from tools.pdf_render import PDF_TEMPLATE_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Plans live under downloads/plans/<hash>.json, one per distinct (content,
+# city, template version); <hash>.pdf is rendered from it on first download.
+# downloads/wa_<session>.pdf is only an alias (symlink) to the newest plan of
+# that session.
+PLANS_DIR = "plans"
+_DIGEST_RE = re.compile(r"[0-9a-f]{24}")
 
 
 # ──────────────────────── Safe filename ────────────────────────
@@ -15,62 +34,191 @@ def _safe_filename(session_id: str) -> str:
     return f"wa_{safe or 'unknown'}.pdf"
 
 
-# ──────────────────────── Generate PDF (ALWAYS ENGLISH) ────────────────────────
-def generate_pdf(content: str, city: str, session_id: str) -> str:
+def pdf_digest(content: str, city: str) -> str:
+    key = f"{PDF_TEMPLATE_VERSION}\0{city}\0{content}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:24]
+
+
+def _plan_path(digest: str) -> Path:
+    return config.PDF_OUTPUT_PATH / PLANS_DIR / f"{digest}.pdf"
+
+
+def _sidecar_path(digest: str) -> Path:
+    return config.PDF_OUTPUT_PATH / PLANS_DIR / f"{digest}.json"
+
+
+def _store_plan(content: str, city: str) -> str:
+    """Write the plan sidecar (what to render) once per digest; returns the digest."""
+    digest = pdf_digest(content, city)
+    sidecar = _sidecar_path(digest)
+    if not sidecar.exists():
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        tmp = sidecar.with_name(f".{sidecar.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"content": content, "city": city}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, sidecar)
+    touch_quietly(PLAN, sidecar)  # kept for as long as a session keeps publishing it
+    return digest
+
+
+def _alias(session_id: str, digest: str) -> str:
+    """
+    Point downloads/wa_<session>.pdf at the plan file (atomic swap); returns
+    the public path. The link may dangle until the PDF is first downloaded.
+    """
     filename = _safe_filename(session_id)
-    pdf_path = Path("downloads") / filename
-    pdf_path.parent.mkdir(parents=True, exist_ok=True)
-
-    doc = SimpleDocTemplate(str(pdf_path), pagesize=A4,
-                            leftMargin=60, rightMargin=60, topMargin=70, bottomMargin=60)
-
-    # Get base styles and create custom ones WITHOUT 'parent' keyword
-    base_styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        "EngTitle",
-        fontName=base_styles["Title"].fontName,  # Helvetica-Bold
-        fontSize=18,
-        alignment=TA_CENTER,
-        spaceAfter=30,
-        leading=24
-    )
-    body_style = ParagraphStyle(
-        "EngBody",
-        fontName=base_styles["Normal"].fontName,  # Helvetica
-        fontSize=11.5,
-        leading=17,
-        alignment=TA_JUSTIFY,
-        spaceAfter=6
-    )
-
-    story = []
-
-    # Title
-    story.append(Paragraph(f"<b>Refugee First – Survival Plan for {city}</b>", title_style))
-    story.append(Spacer(1, 20))
-
-    # Clean markdown junk (stars, bold, bullets) – ensures clean English
-    text = content
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)   # **bold**
-    text = re.sub(r'\*(.*?)\*', r'\1', text)       # *italic* or bullets
-    text = re.sub(r'__(.*?)__', r'\1', text)       # __bold__
-    text = re.sub(r'_([^_]+)_', r'\1', text)       # _italic_
-    text = re.sub(r'[*\-•►◆⭐★✦]', ' ', text)      # remove stray stars/bullets
-    text = re.sub(r'\s+', ' ', text).strip()       # clean spaces
-
-    for line in text.split("\n"):
-        line = line.strip()
-        if not line:
-            story.append(Spacer(1, 10))
-            continue
-        escaped = line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-        story.append(Paragraph(escaped, body_style))
-        story.append(Spacer(1, 6))
-
-    doc.build(story)
+    alias = config.PDF_OUTPUT_PATH / filename
+    tmp = alias.with_name(f".{filename}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        tmp.symlink_to(Path(PLANS_DIR) / f"{digest}.pdf")
+    except OSError:
+        os.link(_plan_path(digest), tmp)  # no symlinks (e.g. Windows) → hard link, PDF must exist
+    os.replace(tmp, alias)
+    touch_quietly(ALIAS, alias)
     return f"/downloads/{filename}"
 
 
+def generate_pdf(content: str, city: str, session_id: str) -> str:
+    """Synchronous render in this process (CLI / tests). The graph uses publish_pdf()."""
+    digest = _store_plan(content, city)
+    path = _plan_path(digest)
+    if not path.exists():
+        pdf_render.render(content, city, str(path))
+    touch_quietly(PDF, path)
+    return _alias(session_id, digest)
+
+
+# ──────────────────────── Process pool (off the event loop) ────────────────────────
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_inflight: Dict[str, asyncio.Future] = {}  # digest → render in progress (identical plans render once)
+published = renders = reuses = 0
+
+
+def _downloaded(digest: str) -> None:
+    """A download keeps both the rendered PDF and its plan from expiring."""
+    touch_quietly(PDF, _plan_path(digest))
+    touch_quietly(PLAN, _sidecar_path(digest))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the server process has threads + open SQLite handles.
+        # A spawned child re-imports __main__ — the whole app under `python main.py` —
+        # so while the workers start, the renderer stands in as __main__. Each
+        # submit starts one process while none is idle → all start right here.
+        main_module = sys.modules["__main__"]
+        sys.modules["__main__"] = pdf_render
+        try:
+            _pool = ProcessPoolExecutor(max_workers=config.PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(config.PDF_WORKERS):
+                _pool.submit(pdf_render.warm_up)
+        finally:
+            sys.modules["__main__"] = main_module
+    return _pool
+
+
+async def ensure_pdf(digest: str) -> Optional[Path]:
+    """
+    The rendered PDF for a stored plan — rendered now on the process pool if
+    this is the first request (single-flight per digest), None if unknown
+    (or already gone again, e.g. swept by maintenance).
+    At most PDF_MAX_PENDING renders are handed to the pool at once.
+    """
+    global _slots, renders, reuses
+    path = _plan_path(digest)
+    if path.exists():
+        reuses += 1
+        await asyncio.to_thread(_downloaded, digest)
+        return path
+    if digest in _inflight:
+        reuses += 1
+        await asyncio.shield(_inflight[digest])
+        return path if path.exists() else None  # the render found no plan to draw
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[digest] = future
+    try:
+        try:
+            plan = json.loads(await asyncio.to_thread(_sidecar_path(digest).read_text, encoding="utf-8"))
+        except FileNotFoundError:
+            future.set_result(None)
+            return None
+        if _slots is None:
+            _slots = asyncio.Semaphore(config.PDF_MAX_PENDING)
+        async with _slots:
+            await asyncio.get_running_loop().run_in_executor(_get_pool(), pdf_render.render, plan["content"], plan["city"], str(path))
+        renders += 1
+        await asyncio.to_thread(_downloaded, digest)
+        future.set_result(None)
+        return path if path.exists() else None
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # retrieved → no "never retrieved" warning if nobody else waited
+        raise
+    finally:
+        _inflight.pop(digest, None)
+
+
+async def publish_pdf(content: str, city: str, session_id: str) -> str:
+    """
+    Store the plan and hand out its stable URL right away — nothing is
+    rendered until someone opens the link (see ensure_pdf / GET /downloads).
+    """
+    global published
+    digest = await asyncio.to_thread(_store_plan, content, city)
+    published += 1
+    try:
+        return await asyncio.to_thread(_alias, session_id, digest)
+    except OSError:
+        await ensure_pdf(digest)  # hard-link fallback needs the file
+        return await asyncio.to_thread(_alias, session_id, digest)
+
+
+def resolve_download(filename: str) -> Tuple[Optional[Path], Optional[str]]:
+    """
+    /downloads/<filename> → (file path, plan digest). The digest is set for
+    session aliases and plans/<digest>.pdf, so a missing PDF can be rendered.
+    (None, None) for anything outside the downloads folder or not a PDF.
+    """
+    root = config.PDF_OUTPUT_PATH.resolve()
+    path = config.PDF_OUTPUT_PATH / filename
+    if path.suffix != ".pdf" or not os.path.abspath(path).startswith(str(root) + os.sep):
+        return None, None
+    target = Path(os.readlink(path)) if path.is_symlink() else path
+    digest = None
+    if target.parent.name == PLANS_DIR and _DIGEST_RE.fullmatch(target.stem):
+        digest = target.stem
+    if digest:
+        return _plan_path(digest), digest
+    if path.is_file() and os.path.realpath(path).startswith(str(root) + os.sep):
+        return path, None  # older per-session PDFs
+    return None, None
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def pdf_stats() -> dict:
+    tracked = artifacts.totals()  # from the artifact index — no directory listing
+    return {
+        "published": published,  # links handed out
+        "renders": renders,      # PDFs actually rendered (first download)
+        "reuses": reuses,
+        "rendering": len(_inflight),
+        "plan_files": tracked.get(PDF, (0, 0))[0],
+        "stored_plans": tracked.get(PLAN, (0, 0))[0],
+    }
+
+
 # ──────────────────────── Test ────────────────────────
 if __name__ == "__main__":
     test = """**Emergency Survival Guide for Mumbai**
@@ -0,0 +1,74 @@
+# tools/pdf_render.py — ReportLab layout, run inside the PDF process pool
+#
+# Kept apart from tools/pdf_generator.py on purpose: pool processes start with
+# this module as their __main__ and import nothing else — no config, no SQLite
+# handles, no app (see pdf_generator._get_pool).
+import os
+import re
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+# Bump whenever the layout below changes → every plan is rendered afresh
+PDF_TEMPLATE_VERSION = "1"
+
+
+# ──────────────────────── Generate PDF (ALWAYS ENGLISH) ────────────────────────
+def render(content: str, city: str, pdf_path: str) -> None:
+    """ReportLab layout — CPU-bound, runs in a worker process. Written to a temp file, then renamed."""
+    tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    doc = SimpleDocTemplate(tmp_path, pagesize=A4,
+                            leftMargin=60, rightMargin=60, topMargin=70, bottomMargin=60)
+
+    # Get base styles and create custom ones WITHOUT 'parent' keyword
+    base_styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        "EngTitle",
+        fontName=base_styles["Title"].fontName,  # Helvetica-Bold
+        fontSize=18,
+        alignment=TA_CENTER,
+        spaceAfter=30,
+        leading=24
+    )
+    body_style = ParagraphStyle(
+        "EngBody",
+        fontName=base_styles["Normal"].fontName,  # Helvetica
+        fontSize=11.5,
+        leading=17,
+        alignment=TA_JUSTIFY,
+        spaceAfter=6
+    )
+
+    story = []
+
+    # Title
+    story.append(Paragraph(f"<b>Refugee First – Survival Plan for {city}</b>", title_style))
+    story.append(Spacer(1, 20))
+
+    # Clean markdown junk (stars, bold, bullets) – ensures clean English
+    text = content
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)   # **bold**
+    text = re.sub(r'\*(.*?)\*', r'\1', text)       # *italic* or bullets
+    text = re.sub(r'__(.*?)__', r'\1', text)       # __bold__
+    text = re.sub(r'_([^_]+)_', r'\1', text)       # _italic_
+    text = re.sub(r'[*\-•►◆⭐★✦]', ' ', text)      # remove stray stars/bullets
+    text = re.sub(r'\s+', ' ', text).strip()       # clean spaces
+
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            story.append(Spacer(1, 10))
+            continue
+        escaped = line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        story.append(Paragraph(escaped, body_style))
+        story.append(Spacer(1, 6))
+
+    doc.build(story)
+    os.replace(tmp_path, pdf_path)  # readers never see a half-written PDF
+
+
+def warm_up() -> int:
+    """No-op task: makes the pool start a process (and import ReportLab) right away."""
+    return os.getpid()
@@ -0,0 +1,198 @@
+# backend/tools/response_cache.py — TTL + LRU cache for expensive LLM answers
+#
+# Two tiers: a small in-memory LRU in front of a SQLite (WAL) table that every
+# worker on the host shares. Entries live under a key (e.g. city|urgency|needs|
+# data version). A key can optionally hold several entries, each with an
+# embedding of the message it answered — a lookup then only hits if some
+# entry's message is similar enough (cosine) to the new one.
+#
+# The memory tier is per process. Each key remembers the newest row id it was
+# loaded at; a memory hit first checks that id against the table (one
+# index-only lookup), so a put or eviction by another worker is never missed.
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (created_at, unit vector or None, value)
+_Entry = Tuple[float, Optional[np.ndarray], str]
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm else v
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        name: str,
+        db_path: Path,
+        ttl_seconds: float,
+        max_entries: int,
+        memory_keys: int = 256,
+        entries_per_key: int = 8,
+        evict_every: int = 100,
+    ):
+        self.name = name  # also the SQLite table name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_keys = memory_keys
+        self.entries_per_key = entries_per_key
+        self.evict_every = evict_every  # puts between eviction sweeps (the table may overshoot by that much)
+        self._puts = 0
+        self.hits = self.misses = self.memory_hits = self.evictions = 0
+        self._memory: "OrderedDict[str, Tuple[Optional[int], List[_Entry]]]" = OrderedDict()  # key → (newest id, entries)
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                vector BLOB,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_key ON {name} (key)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_used ON {name} (used_at)")
+        self._conn.commit()
+
+    # ---- memory tier -------------------------------------------------------
+
+    def _remember(self, key: str, version: Optional[int], entries: List[_Entry]) -> None:
+        self._memory[key] = (version, entries)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_keys:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> List[_Entry]:
+        """Fresh entries for `key` — from memory, else from disk (then kept in memory)."""
+        cutoff = time.time() - self.ttl_seconds
+        (version,) = self._conn.execute(f"SELECT MAX(id) FROM {self.name} WHERE key = ?", (key,)).fetchone()
+        if key in self._memory:
+            remembered, entries = self._memory[key]
+            if remembered == version:
+                self._memory.move_to_end(key)
+                entries = [e for e in entries if e[0] >= cutoff]
+                if entries:
+                    self.memory_hits += 1
+                return entries
+            del self._memory[key]  # replaced or evicted by another worker
+        rows = self._conn.execute(
+            f"SELECT created_at, vector, value FROM {self.name} "
+            f"WHERE key = ? AND created_at >= ? ORDER BY created_at DESC LIMIT ?",
+            (key, cutoff, self.entries_per_key),
+        ).fetchall()
+        entries = [
+            (created_at, np.frombuffer(blob, dtype=np.float32) if blob is not None else None, value)
+            for created_at, blob, value in rows
+        ]
+        if entries:
+            self._conn.execute(f"UPDATE {self.name} SET used_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._remember(key, version, entries)
+        return entries
+
+    # ---- public API ----------------------------------------------------------
+
+    def get(self, key: str, vector: Optional[Sequence[float]] = None, min_similarity: float = 0.0) -> Optional[str]:
+        """
+        Newest fresh value under `key`. With `vector` and `min_similarity` > 0,
+        only an entry whose stored message vector is at least that similar.
+        """
+        with self._lock:
+            entries = self._load(key)
+            value = None
+            if entries and (vector is None or min_similarity <= 0):
+                value = entries[0][2]
+            elif entries:
+                query = _unit(vector)
+                scored = [(float(np.dot(query, v)), val) for _, v, val in entries if v is not None]
+                best = max(scored, default=(0.0, None), key=lambda s: s[0])
+                if best[0] >= min_similarity:
+                    value = best[1]
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def has(self, key: str) -> bool:
+        """Is there a fresh entry under `key`? Doesn't count as a lookup."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM {self.name} WHERE key = ? AND created_at >= ? LIMIT 1",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+        return row is not None
+
+    def put(self, key: str, value: str, vector: Optional[Sequence[float]] = None) -> None:
+        now = time.time()
+        unit = _unit(vector) if vector is not None else None
+        with self._lock:
+            if unit is None:
+                # Without vectors a key holds exactly one answer
+                self._conn.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+            else:
+                # With vectors, keep the newest entries_per_key answers (incl. this one)
+                self._conn.execute(
+                    f"DELETE FROM {self.name} WHERE key = ? AND id NOT IN "
+                    f"(SELECT id FROM {self.name} WHERE key = ? ORDER BY created_at DESC LIMIT ?)",
+                    (key, key, self.entries_per_key - 1),
+                )
+            self._conn.execute(
+                f"INSERT INTO {self.name} (key, vector, value, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, unit.tobytes() if unit is not None else None, value, now, now),
+            )
+            self._puts += 1
+            if (self._puts - 1) % self.evict_every == 0:  # first put after start, then every evict_every
+                self._evict()
+            self._conn.commit()
+            self._memory.pop(key, None)  # reloaded (with the new entry) on next get
+
+    def _evict(self) -> None:
+        """Drop expired rows, then least-recently-used ones beyond max_entries."""
+        cur = self._conn.execute(
+            f"DELETE FROM {self.name} WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        evicted = cur.rowcount
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()
+        if count > self.max_entries:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.name} WHERE id IN "
+                f"(SELECT id FROM {self.name} ORDER BY used_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            evicted += cur.rowcount
+        if evicted > 0:
+            self.evictions += evicted
+            logger.info(f"Response cache {self.name} → evicted {evicted} entries")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            (entries,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()
+        return {
+            "entries": entries,
+            "memory_keys": len(self._memory),
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
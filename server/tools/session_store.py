@@ -0,0 +1,236 @@
+# backend/tools/session_store.py — session state shared by every worker
+#
+# Small JSON records under (namespace, key) with optional TTL:
+#   "session"  session id → city, language, vector_index, last_plan, pdf_url
+#   "location" phone number → last shared WhatsApp pin
+# Accounts use the same classes but their own file / Redis prefix — see auth/store.py
+#
+# Backends (SESSION_BACKEND):
+#   sqlite  WAL file on local disk — every uvicorn worker on the host sees the same state (default)
+#   redis   any Redis-compatible server at SESSION_REDIS_URL (pip install redis), for several hosts
+#   memory  one process only — tests, or a single worker
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """get / set / update(merge) / delete JSON records; ttl_seconds=None → keep forever."""
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def update(self, namespace: str, key: str, ttl_seconds: Optional[float] = None, **fields) -> None:
+        """Merge `fields` into the record (created if missing or expired) and restart its TTL."""
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def count(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **{ns: self.count(ns) for ns in ("session", "location", "users")}}
+
+
+class MemorySessionStore(SessionStore):
+    backend = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, tuple]] = {}  # namespace → key → (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def _live(self, namespace: str, key: str) -> Optional[tuple]:
+        entry = self._data.get(namespace, {}).get(key)
+        if entry and entry[0] is not None and entry[0] < time.time():
+            del self._data[namespace][key]
+            return None
+        return entry
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._live(namespace, key)
+            return dict(entry[1]) if entry else None
+
+    def set(self, namespace, key, value, ttl_seconds=None):
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = (expires_at, dict(value))
+
+    def update(self, namespace, key, ttl_seconds=None, **fields):
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            entry = self._live(namespace, key)
+            value = {**(entry[1] if entry else {}), **fields}
+            self._data.setdefault(namespace, {})[key] = (expires_at, value)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.get(namespace, {}).pop(key, None)
+
+    def count(self, namespace):
+        with self._lock:
+            now = time.time()
+            return sum(1 for exp, _ in self._data.get(namespace, {}).values() if exp is None or exp >= now)
+
+    def purge_expired(self):
+        now, purged = time.time(), 0
+        with self._lock:
+            for records in self._data.values():
+                for key in [k for k, (exp, _) in records.items() if exp is not None and exp < now]:
+                    del records[key]
+                    purged += 1
+        return purged
+
+
+class SqliteSessionStore(SessionStore):
+    backend = "sqlite"
+
+    def __init__(self, db_path: Path, purge_every: int = 500):
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.purge_every = purge_every  # writes between purges of expired rows; 0 → never
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (expires_at)")
+
+    def get(self, namespace, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sessions WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (namespace, key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self.purge_every and self._writes % self.purge_every == 0:
+            self.purge_expired()
+
+    def set(self, namespace, key, value, ttl_seconds=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, ensure_ascii=False), now + ttl_seconds if ttl_seconds else None, now),
+            )
+        self._wrote()
+
+    def update(self, namespace, key, ttl_seconds=None, **fields):
+        # One statement → atomic across workers; an expired record starts over
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO sessions (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE SET
+                    value = CASE WHEN sessions.expires_at IS NOT NULL AND sessions.expires_at < excluded.updated_at
+                                 THEN excluded.value ELSE json_patch(sessions.value, excluded.value) END,
+                    expires_at = excluded.expires_at,
+                    updated_at = excluded.updated_at
+                """,
+                (namespace, key, json.dumps(fields, ensure_ascii=False), now + ttl_seconds if ttl_seconds else None, now),
+            )
+        self._wrote()
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def count(self, namespace):
+        with self._lock:
+            (n,) = self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (namespace, time.time()),
+            ).fetchone()
+        return n
+
+    def purge_expired(self):
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+        if cur.rowcount > 0:
+            logger.info(f"Session store → purged {cur.rowcount} expired records")
+        return cur.rowcount
+
+
+class RedisSessionStore(SessionStore):
+    """One Redis hash per record (field → JSON value); Redis itself expires keys."""
+
+    backend = "redis"
+
+    def __init__(self, url: str, prefix: str = "refugee"):
+        import redis  # optional dependency, only needed for this backend
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self._prefix}:{namespace}:{key}"
+
+    def get(self, namespace, key):
+        raw = self._redis.hgetall(self._key(namespace, key))
+        return {k.decode(): json.loads(v) for k, v in raw.items()} if raw else None
+
+    def _write(self, namespace, key, fields, ttl_seconds, replace: bool):
+        name = self._key(namespace, key)
+        pipe = self._redis.pipeline(transaction=True)
+        if replace:
+            pipe.delete(name)
+        if fields:
+            pipe.hset(name, mapping={k: json.dumps(v, ensure_ascii=False) for k, v in fields.items()})
+        if ttl_seconds:
+            pipe.expire(name, int(ttl_seconds))
+        else:
+            pipe.persist(name)
+        pipe.execute()
+
+    def set(self, namespace, key, value, ttl_seconds=None):
+        self._write(namespace, key, value, ttl_seconds, replace=True)
+
+    def update(self, namespace, key, ttl_seconds=None, **fields):
+        self._write(namespace, key, fields, ttl_seconds, replace=False)
+
+    def delete(self, namespace, key):
+        self._redis.delete(self._key(namespace, key))
+
+    def count(self, namespace):
+        return sum(1 for _ in self._redis.scan_iter(match=self._key(namespace, "*"), count=1000))
+
+
+def make_store(backend: str, db_path: Path, redis_url: str, prefix: str = "refugee", purge_every: int = 500) -> SessionStore:
+    if backend == "redis":
+        return RedisSessionStore(redis_url, prefix)
+    if backend == "memory":
+        return MemorySessionStore()
+    return SqliteSessionStore(db_path, purge_every)
+
+
+session_store = make_store(config.SESSION_BACKEND, config.SESSION_STORE_PATH, config.SESSION_REDIS_URL)
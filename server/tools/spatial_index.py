@@ -0,0 +1,99 @@
+# backend/tools/spatial_index.py
+# Per-city KD-trees over facility coordinates for "k nearest shelters/clinics".
+# Points are mapped to 3-D unit vectors: straight-line (chord) distance on the
+# unit sphere is monotonic in great-circle distance, so a plain Euclidean
+# KD-tree returns exact haversine neighbours.
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from tools import facility_store
+from tools.facility_store import EARTH_RADIUS_KM, Facility
+
+logger = logging.getLogger(__name__)
+
+
+def _to_unit_xyz(lat, lon) -> np.ndarray:
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+class CityIndex:
+    """One KD-tree over all located facilities of a city, plus one per amenity."""
+
+    def __init__(self, version: str, facilities: List[Facility]):
+        self.version = version
+        self.facilities = facilities
+        self._trees: Dict[Optional[str], Tuple[cKDTree, np.ndarray]] = {}
+        if not facilities:
+            return
+        xyz = _to_unit_xyz([f.lat for f in facilities], [f.lon for f in facilities])
+        amenities = np.array([f.amenity for f in facilities])
+        self._trees[None] = (cKDTree(xyz), np.arange(len(facilities)))
+        for amenity in np.unique(amenities):
+            idx = np.flatnonzero(amenities == amenity)
+            self._trees[str(amenity)] = (cKDTree(xyz[idx]), idx)
+
+    def nearest(self, lat: float, lon: float, k: int = 5,
+                amenities: Optional[List[str]] = None) -> List[Facility]:
+        point = _to_unit_xyz(lat, lon)
+        keys = [a for a in amenities if a in self._trees] if amenities else [None]
+        hits: List[Tuple[float, int]] = []
+        for key in keys:
+            tree, idx = self._trees[key]
+            chords, pos = tree.query(point, k=min(k, len(idx)))
+            for chord, p in zip(np.atleast_1d(chords), np.atleast_1d(pos)):
+                hits.append((float(chord), int(idx[p])))
+
+        seen, results = set(), []
+        for chord, i in sorted(hits):
+            if i in seen:
+                continue
+            seen.add(i)
+            km = float(_chord_to_km(np.float64(chord)))
+            results.append(self.facilities[i].model_copy(update={"distance_km": km}))
+            if len(results) == k:
+                break
+        return results
+
+
+_indexes: Dict[str, CityIndex] = {}
+_lock = threading.Lock()
+
+
+def _city_index(city_key: str) -> Optional[CityIndex]:
+    version = facility_store.city_version(city_key)
+    if version is None:
+        return None
+    index = _indexes.get(city_key)
+    if index is None or index.version != version:
+        with _lock:
+            index = _indexes.get(city_key)
+            if index is None or index.version != version:
+                index = CityIndex(version, facility_store.located_facilities(city_key))
+                _indexes[city_key] = index
+                logger.info(f"Spatial index → {city_key}: {len(index.facilities)} points (v{version})")
+    return index
+
+
+def nearest_facilities(city_key: str, lat: float, lon: float, k: int = 10,
+                       amenities: Optional[List[str]] = None) -> List[Facility]:
+    """
+    k nearest facilities to (lat, lon) with distance_km set — those open right
+    now first, each group closest first (of the 3k nearest, see
+    facility_store.open_first). Rebuilt automatically when the city's
+    facility data version changes.
+    """
+    index = _city_index(city_key)
+    if index is None or not index.facilities:
+        return []
+    candidates = index.nearest(lat, lon, k=k * 3, amenities=amenities)
+    return facility_store.open_first(city_key, candidates)[:k]
@@ -1,43 +1,65 @@
 # tools/whatsapp.py — FINAL FIXED VERSION (Supports split messages + never cuts)
 from fastapi import APIRouter, Request, Response
 from twilio.twiml.messaging_response import MessagingResponse
-from twilio.rest import Client
-from typing import Optional, Dict, List
+from typing import Optional, List, Tuple
+import asyncio
 import logging
-import re
+import time
 
 from config import config
-from graph import create_graph
+from graph import get_graph, run_config, turn_input
+from agents.matcher import analyze_message
+from tools.session_store import session_store
+from jobs.base import DUPLICATE, FULL, Job
+from jobs.queue import job_queue, submit_message
+from jobs.worker import register_handler
 
-graph = create_graph()
 logger = logging.getLogger("whatsapp")
 router = APIRouter()
 
 twilio_client = None
-if config.TWILIO_ACCOUNT_SID and config.TWILIO_AUTH_TOKEN:
-    twilio_client = Client(config.TWILIO_ACCOUNT_SID, config.TWILIO_AUTH_TOKEN)
 
-USER_PDF_STORE: Dict[str, str] = {}
-MAX_CHARS = 1590
 
-async def process_message(session_id: str, message: str) -> tuple[any, Optional[str]]:
-    try:
-        async for event in graph.astream_events(
-            input={"raw_message": message, "session_id": session_id},
-            version="v2",
-            config={"recursion_limit": 50},
-        ):
-            if event["event"] == "on_chain_end":
-                output = event.get("data", {}).get("output", {})
-                if isinstance(output, dict) and "final_response" in output:
-                    response = output["final_response"]
-                    pdf_url = output.get("pdf_url")
-                    logger.info("Graph completed → response ready")
-                    return response, pdf_url
-    except Exception as e:
-        logger.error(f"Graph error: {e}", exc_info=True)
+def _get_twilio():
+    """Twilio REST client, built on first proactive send."""
+    global twilio_client
+    if twilio_client is None and config.TWILIO_ACCOUNT_SID and config.TWILIO_AUTH_TOKEN:
+        from twilio.rest import Client
+        twilio_client = Client(config.TWILIO_ACCOUNT_SID, config.TWILIO_AUTH_TOKEN)
+    return twilio_client
+
+# PDF links and location pins live in the shared session store, so any worker can answer "PDF"
+LOCATION_TTL_SECONDS = 6 * 60 * 60  # people move — forget a pin after 6 hours
+MAX_CHARS = 1590
+WHATSAPP_MESSAGE = "whatsapp_message"  # job kind
+
+
+def _recent_location(from_number: str) -> Optional[Tuple[float, float]]:
+    saved = session_store.get("location", from_number)
+    return (saved["lat"], saved["lon"]) if saved else None
+
+
+async def process_message(
+    session_id: str,
+    message: str,
+    location: Optional[Tuple[float, float]] = None,
+) -> tuple[any, Optional[str]]:
+    """Graph errors propagate so the job is retried (the apology comes from _give_up)."""
+    async for event in get_graph().astream_events(
+        input=turn_input(message, session_id, location),
+        version="v2",
+        config=run_config(session_id, recursion_limit=50),
+    ):
+        if event["event"] == "on_chain_end":
+            output = event.get("data", {}).get("output", {})
+            # turn_input itself carries final_response=None → only a real answer counts
+            if isinstance(output, dict) and output.get("final_response"):
+                response = output["final_response"]
+                pdf_url = output.get("pdf_url")
+                logger.info("Graph completed → response ready")
+                return response, pdf_url
     return "I'm preparing your help plan...", None
-    
+
 
 def make_public_url(url: str) -> str:
     if not getattr(config, "PUBLIC_URL", None):
@@ -48,29 +70,123 @@ def make_public_url(url: str) -> str:
 
 
 def send_proactive(to: str, text: str):
+    """Raises on Twilio errors, so a job's retry can resend."""
+    twilio_client = _get_twilio()
     if not twilio_client:
         return
+    clean = text.encode("utf-8", "ignore").decode("utf-8")[:MAX_CHARS]
+    twilio_client.messages.create(
+        from_=config.TWILIO_WHATSAPP_NUMBER,
+        to=f"whatsapp:{to}",
+        body=clean
+    )
+    logger.info(f"Proactive sent to {to}")
+
+
+def _send_best_effort(to: str, text: str):
+    """One-off replies outside the job queue: nothing retries them, so just log."""
     try:
-        clean = text.encode("utf-8", "ignore").decode("utf-8")[:MAX_CHARS]
-        twilio_client.messages.create(
-            from_=config.TWILIO_WHATSAPP_NUMBER,
-            to=f"whatsapp:{to}",
-            body=clean
-        )
-        logger.info(f"Proactive sent to {to}")
+        send_proactive(to, text)
     except Exception as e:
         logger.error(f"Proactive failed: {e}")
 
 
+def compose_messages(response_obj, public_pdf_url: Optional[str]) -> List[str]:
+    """Graph answer (one string or already split parts) → WhatsApp-sized messages, PDF link in the first."""
+    # Convert to list if single string
+    parts: List[str] = response_obj if isinstance(response_obj, list) else [response_obj]
+    messages = []
+    for i, msg_text in enumerate(parts):
+        clean_msg = str(msg_text).strip().encode("utf-8", "ignore").decode("utf-8")
+
+        # Add PDF link only to first message
+        if i == 0 and public_pdf_url:
+            pdf_line = f"\n\nYour Full Guide (PDF + maps):\n{public_pdf_url}"
+            if len(clean_msg + pdf_line) <= MAX_CHARS:
+                clean_msg += pdf_line
+            else:
+                clean_msg += "\n\nReply “PDF” to get your full guide."
+
+        messages.append(clean_msg)
+    return messages
+
+
+async def deliver_plan(job: Job) -> dict:
+    """
+    Job handler: run the graph for one message and send the answer via the REST API.
+    The composed parts and how many went out are checkpointed into the job, so a
+    retry after a Twilio error resumes at the first unsent part — no re-run, no repeats.
+    """
+    from_number = job.key
+    session_id = f"wa_{from_number}"
+    messages: Optional[List[str]] = job.payload.get("messages")
+    public_pdf_url = job.payload.get("pdf_url")
+    if messages is None:
+        location = job.payload.get("location")
+        response_obj, pdf_url = await process_message(session_id, job.payload["message"], tuple(location) if location else None)
+
+        # Save PDF URL for later
+        if pdf_url:
+            public_pdf_url = make_public_url(pdf_url)
+            await asyncio.to_thread(
+                session_store.update, "session", session_id, config.SESSION_TTL_SECONDS, pdf_url=public_pdf_url
+            )
+        messages = compose_messages(response_obj, public_pdf_url)
+        if not await asyncio.to_thread(job_queue.checkpoint, job, {"messages": messages, "sent": 0, "pdf_url": public_pdf_url}):
+            raise RuntimeError("lease lost before sending")
+
+    # ——— SEND ONE OR MULTIPLE MESSAGES, IN ORDER, FROM THE FIRST UNSENT ———
+    sent = job.payload.get("sent", 0)
+    if sent:
+        logger.info(f"WhatsApp → {from_number}: resuming at part {sent + 1}/{len(messages)}")
+    for index in range(sent, len(messages)):
+        await asyncio.to_thread(send_proactive, from_number, messages[index])
+        if not await asyncio.to_thread(job_queue.checkpoint, job, {"sent": index + 1}):
+            raise RuntimeError(f"lease lost after part {index + 1}")  # the new owner resumes from its checkpoint
+    logger.info(f"WhatsApp → {from_number}: Sent {len(messages)} message(s) "
+                f"{time.time() - job.enqueued_at:.1f}s after receipt")
+    return {"messages": len(messages), "pdf_url": public_pdf_url}
+
+
+async def _give_up(job: Job, error: str):
+    logger.error(f"Graph error for {job.key}: {error}")
+    await asyncio.to_thread(send_proactive, job.key, "Sorry, something went wrong. Please send your message again.")
+
+
+register_handler(WHATSAPP_MESSAGE, deliver_plan, _give_up)
+
+
+def _twiml(text: Optional[str] = None) -> Response:
+    resp = MessagingResponse()
+    if text:
+        resp.message(text)
+    return Response(content=str(resp), media_type="text/xml")
+
+
 @router.post("/")
 async def whatsapp_webhook(request: Request):
-    global USER_PDF_STORE
-
+    """
+    Acknowledges Twilio at once with empty TwiML. The plan itself is built by
+    a job worker and sent out-of-band, so Twilio never times out and
+    retries — and a retry that does arrive is dropped by its MessageSid.
+    """
     try:
         form = await request.form()
         from_number = form.get("From", "").replace("whatsapp:", "")
         body = (form.get("Body") or "").strip()
 
+        # ——— LOCATION PIN ———
+        latitude, longitude = form.get("Latitude"), form.get("Longitude")
+        if from_number and latitude and longitude:
+            try:
+                pin = {"lat": float(latitude), "lon": float(longitude)}
+                await asyncio.to_thread(session_store.set, "location", from_number, pin, LOCATION_TTL_SECONDS)
+                logger.info(f"WhatsApp ← {from_number}: location pin")
+            except ValueError:
+                pass
+            if not body:
+                return _twiml("📍 Location saved. Tell me what you need (shelter, food, medical) and I'll find the nearest places.")
+
         if not from_number or not body:
             return "", 400
 
@@ -80,59 +196,34 @@ async def whatsapp_webhook(request: Request):
             return "", 200
 
         logger.info(f"WhatsApp ← {from_number}: {body[:60]}")
-        session_id = f"wa_{from_number}"
 
         # ——— AUTO SEND PDF ON "PDF" ———
-        if re.search(r"\bpdf\b", body, re.IGNORECASE):
-            pdf_url = USER_PDF_STORE.get(from_number)
+        if analyze_message(body).pdf:
+            session = await asyncio.to_thread(session_store.get, "session", f"wa_{from_number}")
+            pdf_url = (session or {}).get("pdf_url")
             if pdf_url:
-                send_proactive(from_number, f"Here is your complete guide:\n\n{pdf_url}")
-                resp = MessagingResponse()
-                resp.message("PDF sent!")
-                return Response(content=str(resp), media_type="text/xml")
-            else:
-                resp = MessagingResponse()
-                resp.message("No PDF available yet.")
-                return Response(content=str(resp), media_type="text/xml")
-
-        # ——— MAIN FLOW ———
-        response_obj, pdf_url = await process_message(session_id, body)
-
-        # Save PDF URL for later
-        public_pdf_url = None
-        if pdf_url:
-            public_pdf_url = make_public_url(pdf_url)
-            USER_PDF_STORE[from_number] = public_pdf_url
-
-        # ——— SEND ONE OR MULTIPLE MESSAGES ———
-        resp = MessagingResponse()
-
-        # Convert to list if single string
-        messages: List[str] = (
-            response_obj if isinstance(response_obj, list) else [response_obj]
+                asyncio.get_running_loop().run_in_executor(
+                    None, _send_best_effort, from_number, f"Here is your complete guide:\n\n{pdf_url}"
+                )
+                return _twiml("PDF sent!")
+            return _twiml("No PDF available yet.")
+
+        # ——— MAIN FLOW → job queue ———
+        outcome = submit_message(
+            WHATSAPP_MESSAGE, from_number, body,
+            {"location": await asyncio.to_thread(_recent_location, from_number)},
+            job_id=form.get("MessageSid", ""),
         )
-
-        for i, msg_text in enumerate(messages):
-            clean_msg = msg_text.strip().encode("utf-8", "ignore").decode("utf-8")
-
-            # Add PDF link only to first message
-            if i == 0 and public_pdf_url:
-                pdf_line = f"\n\nYour Full Guide (PDF + maps):\n{public_pdf_url}"
-                if len(clean_msg + pdf_line) <= MAX_CHARS:
-                    clean_msg += pdf_line
-                else:
-                    clean_msg += "\n\nReply “PDF” to get your full guide."
-
-            resp.message(clean_msg)
-
-        logger.info(f"WhatsApp → {from_number}: Sent {len(messages)} message(s)")
-        return Response(content=str(resp), media_type="text/xml")
+        if outcome == FULL:
+            logger.warning(f"WhatsApp queue full → asking {from_number} to retry")
+            return _twiml("We're helping many people right now. Please send your message again in a minute.")
+        if outcome == DUPLICATE:
+            logger.info(f"WhatsApp ← duplicate {form.get('MessageSid')} ignored")
+        return _twiml()
 
     except Exception as e:
         logger.error(f"Webhook error: {e}", exc_info=True)
-        resp = MessagingResponse()
-        resp.message("Sorry, something went wrong. Try again.")
-        return Response(content=str(resp), media_type="text/xml"), 200
+        return _twiml("Sorry, something went wrong. Try again.")
 
 
 @router.get("/")
@@ -140,6 +231,7 @@ async def status():
     return {
         "status": "LIVE – Split messages + Auto PDF",
         "number": config.TWILIO_WHATSAPP_NUMBER,
-        "active_users_with_pdf": len(USER_PDF_STORE),
+        "sessions": session_store.stats(),
+        "queue": job_queue.stats(),
         "ready": True
     }
\ No newline at end of file
@@ -1,22 +1,22 @@
 # backend/web/routes.py
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import asyncio                                 # ← THIS WAS MISSING!!!
-from .sockets import manager, process_message
+from .sockets import manager, submit
 
 router = APIRouter()
 
 @router.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    await manager.connect(websocket, session_id)
+async def websocket_endpoint(websocket: WebSocket, session_id: str, stream: bool = False):
+    # ?stream=1 → framed JSON with live tokens + status (see web/sockets.py)
+    await manager.connect(websocket, session_id, stream=stream)
     try:
         while True:
             data = await websocket.receive_text()   # ← raw text, correct
             if not data.strip():
                 continue
 
-            # This now works because asyncio is imported
-            asyncio.create_task(process_message(data, session_id))
+            # Queued, not run here — workers pick it by urgency, one message per session at a time
+            await submit(data, session_id)
 
     except WebSocketDisconnect:
         manager.disconnect(session_id)
@@ -1,26 +1,47 @@
 # backend/web/sockets.py
 
+import json
 import logging
-from typing import Dict
+import uuid
+from typing import Dict, Optional, Set, Tuple
 from fastapi import WebSocket, WebSocketDisconnect
 import asyncio
 
-from graph import create_graph
+from config import config
+from graph import get_graph, run_config, turn_input
+from jobs.base import DONE, FULL, Job
+from jobs.queue import job_queue, submit_message
+from jobs.worker import register_handler
 
-graph = create_graph()
 logger = logging.getLogger("websocket")
 
+# Framed protocol, opt-in with /ws/{session_id}?stream=1 — one JSON object per frame:
+#   {"type": "status", "text": "Creating your plan..."}
+#   {"type": "token",  "stage": "plan" | "native", "text": "..."}   ← LLM deltas as they arrive
+#   {"type": "final",  "text": "...", "pdf_url": "..." | null}     ← replaces the streamed draft
+#   {"type": "error",  "text": "..."}
+# Without ?stream=1 the socket keeps sending only the final answer as raw text.
+
+FALLBACK_TEXT = "I'm having trouble responding right now. Please try again in a moment."
+ERROR_TEXT = "Sorry, something went wrong. Please try again."
+BUSY_TEXT = "We're helping many people right now. Please send your message again in a minute."
+
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.streaming: Set[str] = set()  # sessions that speak the framed protocol
 
-    async def connect(self, websocket: WebSocket, session_id: str):
+    async def connect(self, websocket: WebSocket, session_id: str, stream: bool = False):
         await websocket.accept()
         self.active_connections[session_id] = websocket
-        logger.info(f"Web client connected → {session_id[:8]}")
+        if stream:
+            self.streaming.add(session_id)
+        logger.info(f"Web client connected → {session_id[:8]}{' (streaming)' if stream else ''}")
 
     def disconnect(self, session_id: str):
         self.active_connections.pop(session_id, None)
+        self.streaming.discard(session_id)
         logger.info(f"Web client disconnected → {session_id[:8]}")
 
     async def send_text(self, message: str, session_id: str):
@@ -31,31 +52,116 @@ class ConnectionManager:
             except:
                 self.disconnect(session_id)
 
+    async def send_frame(self, session_id: str, type: str, **fields):
+        await self.send_text(json.dumps({"type": type, **fields}, ensure_ascii=False), session_id)
+
 manager = ConnectionManager()
 
-async def process_message(raw_message: str, session_id: str):
-    """Fixed version — handles bool, None, and missing keys safely"""
-    try:
-        async for event in graph.astream_events(
-            input={"raw_message": raw_message, "session_id": session_id},
-            version="v2",
-        ):
-            # SAFELY extract final_response — this is the key fix
-            data_output = event.get("data", {}).get("output", {})
-            
-            # data_output can be bool, str, None, or dict — handle ALL cases
-            if isinstance(data_output, dict) and "final_response" in data_output:
-                response = data_output["final_response"]
-                if response and isinstance(response, str):
-                    await manager.send_text(response, session_id)
-                    return
-
-        # If no final_response found → send fallback
-        await manager.send_text(
-            "I'm having trouble responding right now. Please try again in a moment.",
-            session_id
-        )
-
-    except Exception as e:
-        logger.error(f"Graph error for {session_id[:8]}: {e}")
-        await manager.send_text("Sorry, something went wrong. Please try again.", session_id)
\ No newline at end of file
+
+def _as_text(response) -> str:
+    # final_node splits long plans into parts for WhatsApp; the web shows them as one
+    if isinstance(response, list):
+        return "\n\n".join(part for part in response if isinstance(part, str))
+    return response if isinstance(response, str) else ""
+
+
+async def send_final(session_id: str, text: str, pdf_url: Optional[str] = None):
+    if session_id in manager.streaming:
+        await manager.send_frame(session_id, "final", text=text, pdf_url=pdf_url)
+    else:
+        await manager.send_text(text, session_id)
+
+
+async def send_error(session_id: str, text: str = ERROR_TEXT):
+    if session_id in manager.streaming:
+        await manager.send_frame(session_id, "error", text=text)
+    else:
+        await manager.send_text(text, session_id)
+
+
+async def process_message(raw_message: str, session_id: str) -> Tuple[str, Optional[str]]:
+    """
+    Runs the graph for one web message; streams progress if the client asked
+    for it. Returns (answer, pdf_url). Graph errors propagate so the job is retried.
+    """
+    streaming = session_id in manager.streaming
+    async for event in get_graph().astream_events(
+        input=turn_input(raw_message, session_id),
+        config=run_config(session_id),
+        version="v2",
+    ):
+        kind = event["event"]
+
+        if streaming and kind == "on_custom_event" and event["name"] == "token":
+            await manager.send_frame(session_id, "token", **event["data"])
+            continue
+
+        # Node outputs only — not their internal writes, not the root graph's full state
+        if kind != "on_chain_end" or event.get("metadata", {}).get("langgraph_node") != event["name"]:
+            continue
+        # data_output can be bool, str, None, or dict — handle ALL cases
+        data_output = event.get("data", {}).get("output", {})
+        if not isinstance(data_output, dict):
+            continue
+
+        if streaming:
+            for status in data_output.get("status_updates") or []:
+                await manager.send_frame(session_id, "status", text=status)
+
+        response = _as_text(data_output.get("final_response"))
+        if response:
+            await send_final(session_id, response, data_output.get("pdf_url"))
+            return response, data_output.get("pdf_url")
+
+    # If no final_response found → send fallback
+    await send_error(session_id, FALLBACK_TEXT)
+    return FALLBACK_TEXT, None
+
+
+# ---- job queue glue ---------------------------------------------------------
+
+WEB_MESSAGE = "web_message"  # job kind
+
+# Any process sharing the queue may claim a web job — not only the one holding
+# its socket (`python -m jobs.worker`, other uvicorn workers on a sqlite queue).
+# The accepting process then relays the stored result; the claiming one still
+# streams and answers itself when the socket happens to be its own.
+SHARED_QUEUE = config.JOB_WORKERS == 0 or config.JOB_QUEUE_BACKEND == "sqlite"
+
+
+async def _run_job(job: Job) -> dict:
+    text, pdf_url = await process_message(job.payload["message"], job.key)
+    return {"text": text, "pdf_url": pdf_url, "delivered": job.key in manager.active_connections}
+
+
+async def _give_up(job: Job, error: str):
+    logger.error(f"Graph error for {job.key[:8]}: {error}")
+    if not job.payload.get("relayed"):  # else relay_result tells the user
+        await send_error(job.key)
+
+
+register_handler(WEB_MESSAGE, _run_job, _give_up)
+
+
+async def relay_result(job_id: str, session_id: str):
+    """
+    A job claimed by another process can't reach this socket: wait for the
+    stored result and deliver it here (final answer only, no tokens).
+    """
+    outcome = await job_queue.wait_result(job_id, timeout=config.JOB_RESULT_TIMEOUT_SECONDS)
+    if outcome and outcome["status"] == DONE and outcome["result"]:
+        if not outcome["result"].get("delivered"):
+            await send_final(session_id, outcome["result"]["text"], outcome["result"].get("pdf_url"))
+    else:
+        if outcome is None:
+            logger.error(f"No result for {session_id[:8]} after {config.JOB_RESULT_TIMEOUT_SECONDS}s")
+        await send_error(session_id)
+
+
+async def submit(raw_message: str, session_id: str):
+    job_id = uuid.uuid4().hex
+    outcome = submit_message(WEB_MESSAGE, session_id, raw_message, {"relayed": SHARED_QUEUE}, job_id=job_id)
+    if outcome == FULL:
+        await send_error(session_id, BUSY_TEXT)
+    elif SHARED_QUEUE:
+        asyncio.create_task(relay_result(job_id, session_id))